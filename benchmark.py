@@ -0,0 +1,221 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from heat_transfer.constant_t_source import ConstantTSource
+from heat_transfer.manifold import Mixer, Splitter
+from heat_transfer.pipe import Pipe
+from heat_transfer.pump import Pump
+from heat_transfer.simulation import Simulation
+from heat_transfer.solar import Solar
+from heat_transfer.stratified_tank import StratifiedTank
+from heat_transfer.tank import Tank
+from main import create_parser
+
+# default parameters of main.py
+SETUP = vars(create_parser().parse_args([]))
+
+
+def pipe_time_step(n: int, advection: str = "upwind"):
+    source = ConstantTSource(temp_init=SETUP["temp_init"], source_flow_rate=SETUP["flow_rate"])
+    pipe = Pipe(length=50, u=1000, n=n, **(SETUP | {"advection": advection}))
+    source.attach(pipe)
+    setup = argparse.Namespace(**SETUP)
+    return lambda: pipe.time_step(setup), 1
+
+
+def tank_time_step(ny: int):
+    source = ConstantTSource(temp_init=SETUP["temp_init"], source_flow_rate=SETUP["flow_rate"])
+    tank = Tank(tank_radius=0.2, tank_length=50, nx=30, ny=ny, **SETUP)
+    source.attach(tank)
+    setup = argparse.Namespace(**SETUP)
+    return lambda: tank.time_step(setup), 1
+
+
+def stratified_tank_time_step(nx: int, ny: int):
+    source = ConstantTSource(temp_init=SETUP["temp_init"], source_flow_rate=SETUP["flow_rate"])
+    tank = StratifiedTank(tank_radius=0.2, tank_length=50, nx=nx, ny=ny, **SETUP)
+    source.attach(tank)
+    setup = argparse.Namespace(**SETUP)
+    return lambda: tank.time_step(setup), 1
+
+
+def create_loop(pipes: int, n: int, ny: int, t_max: int = SETUP["t_max"], coupled: bool = False,
+                lumped_tolerance: float = None):
+    """
+    Create the loop of main.py with the given number of connecting pipes.
+    """
+    setup = SETUP | {"t_max": t_max, "coupled": coupled, "lumped_tolerance": lumped_tolerance}
+    # pipes are split between the segments after the solar panel, the pump and the tank
+    segments = [[Pipe(length=0.3, u=1000, n=n, **setup) for _ in range(i, pipes, 3)] for i in range(3)]
+    objects = [Solar(n=n, **setup), *segments[0], Pump(setup["flow_rate"], setup["temp_init"]), *segments[1],
+               Tank(tank_radius=0.2, tank_length=50, nx=30, ny=ny, **setup), *segments[2]]
+    return Simulation(objects, **setup)
+
+
+def create_manifold(branches: int, n: int, threads: int, t_max: int):
+    """
+    Create the loop with `branches` parallel solar panels between a splitter and a mixer.
+    """
+    setup = SETUP | {"t_max": t_max, "threads": threads}
+    pump = Pump(setup["flow_rate"], setup["temp_init"])
+    splitter = Splitter(setup["temp_init"], [1.0] * branches)
+    mixer = Mixer(setup["temp_init"])
+    tank = Tank(tank_radius=0.2, tank_length=50, nx=30, ny=100, **setup)
+    pump.attach(splitter)
+    panels = [Solar(n=n, **setup) for _ in range(branches)]
+    for panel in panels:
+        splitter.attach(panel)
+        panel.attach(mixer)
+    mixer.attach(tank)
+    tank.attach(pump)
+    return Simulation([pump, splitter, *panels, mixer, tank], **setup)
+
+
+def simulation_update(pipes: int):
+    sim = create_loop(pipes, 20, 100)
+    return lambda: sim.update(0), 1
+
+
+def simulation_simulate(pipes: int, n: int, ny: int, t_max: int, coupled: bool = False,
+                        lumped_tolerance: float = None):
+    sim = create_loop(pipes, n, ny, t_max, coupled, lumped_tolerance)
+    return lambda: sim.simulate(verbose=False), t_max
+
+
+def manifold_simulate(branches: int, n: int, threads: int, t_max: int):
+    sim = create_manifold(branches, n, threads, t_max)
+    return lambda: sim.simulate(verbose=False), t_max
+
+
+def main_startup(arguments: str):
+    """
+    Launch main.py in a new interpreter, to track the startup time of the command line runs.
+    """
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py"), *arguments.split()]
+    return lambda: subprocess.run(command, check=True, stdout=subprocess.DEVNULL), 1
+
+
+# benchmark name, function that prepares the benchmark, parameters, number of calls to time
+CASES = [
+    *[("main.py startup", main_startup, {"arguments": arguments}, 5)
+      for arguments in ["--help", "--no-plot --t_max 0", "--no-plot --t_max 0 --coupled"]],
+    *[("Pipe.time_step", pipe_time_step, {"n": n}, 2000) for n in [20, 100, 1000, 10000]],
+    *[("Pipe.time_step", pipe_time_step, {"n": n, "advection": advection}, 2000)
+      for advection in ["semi_lagrangian", "lumped"] for n in [20, 100, 1000]],
+    *[("Tank.time_step", tank_time_step, {"ny": ny}, 2000) for ny in [100, 1000, 10000]],
+    *[("StratifiedTank.time_step", stratified_tank_time_step, {"nx": nx, "ny": ny}, 200)
+      for nx, ny in [(30, 100), (100, 100), (100, 1000)]],
+    *[("Simulation.update", simulation_update, {"pipes": pipes}, 2000) for pipes in [3, 10, 100]],
+    *[("Simulation.simulate", simulation_simulate, {"pipes": 3, "n": 20, "ny": 100, "t_max": t_max}, 1)
+      for t_max in [100, 1000]],
+    *[("Simulation.simulate", simulation_simulate, {"pipes": pipes, "n": n, "ny": ny, "t_max": 200}, 1)
+      for pipes, n, ny in [(3, 500, 1000), (30, 20, 100), (30, 500, 1000)]],
+    *[("Simulation.simulate", simulation_simulate,
+       {"pipes": 300, "n": 20, "ny": 100, "t_max": 200, "lumped_tolerance": tolerance}, 1)
+      for tolerance in [None, 0.1]],
+    ("Simulation.simulate", simulation_simulate, {"pipes": 3, "n": 20, "ny": 100, "t_max": 1000, "coupled": True}, 1),
+    *[("Manifold.simulate", manifold_simulate, {"branches": 8, "n": n, "threads": threads, "t_max": 200}, 1)
+      for n in [20, 100000] for threads in [1, 4]],
+]
+
+
+def run_case(name: str, prepare, parameters: dict, calls: int, repeat: int):
+    """
+    Time the benchmark case and measure its peak memory.
+    :param name: name of the benchmark
+    :param prepare: function that creates the benchmarked callable and returns it with the number of steps per call
+    :param parameters: parameters passed to `prepare`
+    :param calls: number of calls in a single measurement
+    :param repeat: number of measurements, the fastest one is reported
+    :return: benchmark result
+    """
+    best = float("inf")
+    steps = 0
+    for _ in range(repeat):
+        run, steps_per_call = prepare(**parameters)
+        start = time.perf_counter()
+        for _ in range(calls):
+            run()
+        best = min(best, time.perf_counter() - start)
+        steps = calls * steps_per_call
+    # memory is measured in a separate run, since tracing slows the execution down
+    tracemalloc.start()
+    run, _ = prepare(**parameters)
+    for _ in range(calls):
+        run()
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "key": name + " " + " ".join(f"{k}={v}" for k, v in parameters.items()),
+        "name": name,
+        "parameters": parameters,
+        "steps": steps,
+        "seconds": best,
+        "steps_per_second": steps / best,
+        "peak_memory": peak_memory,
+    }
+
+
+def compare(results: list[dict], baseline: list[dict], threshold: float):
+    """
+    Compare benchmark results with the baseline.
+    :param results: current results
+    :param baseline: stored results
+    :param threshold: allowed relative slowdown or growth of the peak memory
+    :return: list of (result, speed ratio, memory ratio, regression flag), ratios are None for new benchmarks
+    """
+    stored = {result["key"]: result for result in baseline}
+    comparison = []
+    for result in results:
+        reference = stored.get(result["key"])
+        if reference is None:
+            comparison.append((result, None, None, False))
+            continue
+        speed = result["steps_per_second"] / reference["steps_per_second"]
+        memory = result["peak_memory"] / max(reference["peak_memory"], 1)
+        comparison.append((result, speed, memory, speed < 1.0 - threshold or memory > 1.0 + threshold))
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark solvers and the simulation loop.")
+    parser.add_argument("--repeat", default=3, type=int, help="number of measurements, the fastest one is reported")
+    parser.add_argument("--filter", default="", help="run only benchmarks whose name contains the given string")
+    parser.add_argument("--save", default=None, help="JSON file to save the results into")
+    parser.add_argument("--baseline", default=None, help="JSON file with the results to compare with")
+    parser.add_argument("--threshold", default=0.2, type=float,
+                        help="relative slowdown or memory growth reported as a regression")
+    args = parser.parse_args()
+
+    results = []
+    for name, prepare, parameters, calls in CASES:
+        if args.filter in name:
+            results.append(run_case(name, prepare, parameters, calls, args.repeat))
+            print(f"{results[-1]['key']:<65} {results[-1]['steps_per_second']:>14.1f} steps/s "
+                  f"{results[-1]['peak_memory'] / 2 ** 20:>9.3f} MiB", flush=True)
+    if args.save is not None:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline is None:
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = 0
+    print("\nComparison with the baseline:")
+    for result, speed, memory, regression in compare(results, baseline, args.threshold):
+        if speed is None:
+            print(f"{result['key']:<65} {'new':>8}")
+            continue
+        regressions += regression
+        print(f"{result['key']:<65} speed x{speed:6.3f} memory x{memory:6.3f}{'  REGRESSION' if regression else ''}")
+    if regressions:
+        sys.exit(f"{regressions} benchmarks regressed.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import argparse
+import json
+import math
+import time
+
+import numpy as np
+
+from main import create_simulation
+from sweep import point_parameters
+
+# discretization parameters of main.py that can be refined
+REFINED_PARAMETERS = ["solar_cells", "pipe_cells", "tank_layers", "dt"]
+
+
+def refine(parameters: dict, names: list[str], ratio: int, level: int) -> dict:
+    """
+    Refine the discretization of the simulation setup. The number of time steps grows with the refinement of the
+    time step, so every level simulates the same time.
+    :param parameters: simulation setup of the coarsest level
+    :param names: refined parameters, see REFINED_PARAMETERS
+    :param ratio: refinement ratio between the levels
+    :param level: refinement level, 0 for the coarsest one
+    :return: simulation setup of the level
+    """
+    factor = ratio ** level
+    refined = dict(parameters)
+    for name in names:
+        if name not in REFINED_PARAMETERS:
+            raise ValueError(f"Unknown refined parameter '{name}', expected one of {REFINED_PARAMETERS}.")
+        if name == "dt":
+            refined["dt"] = parameters["dt"] / factor
+            refined["t_max"] = parameters["t_max"] * factor
+        else:
+            refined[name] = parameters[name] * factor
+    return refined
+
+
+def run_level(parameters: dict) -> tuple[dict, float]:
+    """
+    Run single headless simulation and measure the key outputs at its end.
+    :param parameters: simulation setup
+    :return: outputs and the wall time of the run in seconds
+    """
+    start = time.perf_counter()
+    sim, solar, tank = create_simulation(parameters)
+    sim.simulate(verbose=False)
+    runtime = time.perf_counter() - start
+    setup = sim.setup
+    volume = np.sum(np.broadcast_to(tank.cell_volume, tank.temperature.shape))
+    outputs = {
+        "tank_temperature": float(tank.thermal_energy(setup) / (setup.rho * setup.Cp * volume)),
+        "outlet_temperature": float(solar.T_outlet),
+        "absorbed_energy": float(solar.energy.exchange),
+    }
+    return outputs, runtime
+
+
+def richardson(coarse: float, medium: float, fine: float, ratio: int, order: float) -> tuple[float, float]:
+    """
+    Richardson extrapolation of the values on three successively refined grids, f = f_exact + C h^p. The order p is
+    estimated from the values when they converge monotonically, otherwise the formal order of the scheme is used.
+    :param coarse: value on the coarsest grid
+    :param medium: value on the medium grid
+    :param fine: value on the finest grid
+    :param ratio: refinement ratio between the grids
+    :param order: formal order of the scheme
+    :return: extrapolated value and the observed order, None if it could not be estimated
+    """
+    observed = None
+    if fine != medium and (medium - coarse) / (fine - medium) > 1:
+        observed = math.log((medium - coarse) / (fine - medium)) / math.log(ratio)
+    p = order if observed is None else observed
+    return fine + (fine - medium) / (ratio ** p - 1), observed
+
+
+def study(parameters: dict, names: list[str], levels: int = 4, ratio: int = 2, tolerance: float = 1e-3,
+          order: float = 1.0, verbose: bool = True) -> dict:
+    """
+    Run the simulation on successively refined grids, estimate the discretization error of the key outputs of every
+    level with the Richardson extrapolation from the three finest levels and find the coarsest level whose errors are
+    all within the tolerance.
+    :param parameters: simulation setup of the coarsest level
+    :param names: refined parameters, see REFINED_PARAMETERS
+    :param levels: number of levels, at least three
+    :param ratio: refinement ratio between the levels
+    :param tolerance: relative tolerance of the error of the outputs
+    :param order: formal order of the scheme, used when the order can not be estimated from the values
+    :param verbose: print the results of every level
+    :return: dictionary with the levels, the extrapolated outputs with their observed orders and the index of the
+    coarsest level within the tolerance, None if even the finest level does not meet it
+    """
+    if levels < 3:
+        raise ValueError("Richardson extrapolation needs at least three levels.")
+    rows = []
+    for level in range(levels):
+        refined = refine(parameters, names, ratio, level)
+        outputs, runtime = run_level(refined)
+        rows.append({"level": level, "parameters": {name: refined[name] for name in names}, "outputs": outputs,
+                     "runtime": runtime})
+        if verbose:
+            print(f"Level {level}: {rows[-1]['parameters']}, {runtime:.2f} s")
+    extrapolated = {}
+    orders = {}
+    for output in rows[0]["outputs"]:
+        values = [row["outputs"][output] for row in rows[-3:]]
+        extrapolated[output], orders[output] = richardson(*values, ratio, order)
+    chosen = None
+    for row in rows:
+        row["errors"] = {output: abs(value - extrapolated[output]) / max(abs(extrapolated[output]), 1e-300)
+                         for output, value in row["outputs"].items()}
+        if chosen is None and max(row["errors"].values()) <= tolerance:
+            chosen = row["level"]
+    if verbose:
+        for output in extrapolated:
+            observed = "formal" if orders[output] is None else f"{orders[output]:.2f}"
+            print(f"{output}: extrapolated {extrapolated[output]:.6g}, order {observed}, relative errors "
+                  + ", ".join(f"{row['errors'][output]:.2e}" for row in rows))
+        if chosen is None:
+            print(f"No level meets the tolerance {tolerance:g}, add more levels.")
+        else:
+            print(f"Coarsest settings within the tolerance {tolerance:g}: {rows[chosen]['parameters']}, "
+                  f"{rows[chosen]['runtime']:.2f} s")
+    return {"levels": rows, "extrapolated": extrapolated, "orders": orders, "chosen": chosen}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate the discretization error of main.py simulations by "
+                                                 "successive grid refinement and Richardson extrapolation. Options "
+                                                 "not listed below are passed to every simulation.")
+    parser.add_argument("--refine", action="append", default=None, choices=REFINED_PARAMETERS,
+                        help="refined parameter, all of them by default")
+    parser.add_argument("--levels", default=4, type=int, help="number of refinement levels")
+    parser.add_argument("--ratio", default=2, type=int, help="refinement ratio between the levels")
+    parser.add_argument("--tolerance", default=1e-3, type=float, help="relative tolerance of the outputs")
+    parser.add_argument("--order", default=1.0, type=float,
+                        help="formal order of the schemes, used when the observed order can not be estimated")
+    parser.add_argument("--output", default=None, help="JSON file to save the results into")
+    args, base = parser.parse_known_args()
+    results = study(point_parameters({}, base), args.refine or REFINED_PARAMETERS, args.levels, args.ratio,
+                    args.tolerance, args.order)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
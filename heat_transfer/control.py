@@ -0,0 +1,169 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from heat_transfer.flow_object import FlowObject
+
+
+class Controller(ABC):
+    """
+    Sets the flow rate of a pump on every iteration of the simulation, see `Pump.control`. Controllers read the outlet
+    temperatures of the sensor objects from the last update, so they act with the delay of a single time step, as a
+    sampling controller would.
+    """
+
+    @abstractmethod
+    def flow_rate(self, time: float, dt: float):
+        """
+        :param time: time of the current iteration in seconds
+        :param dt: time step of the simulation
+        :return: flow rate of the pump for the next time step
+        """
+        pass
+
+    def get_state(self) -> dict:
+        """
+        :return: dictionary with the values that describe the internal state of the controller
+        """
+        return {}
+
+    def set_state(self, state: dict):
+        """
+        Restore the internal state of the controller.
+        :param state: dictionary created by `get_state`
+        """
+        pass
+
+
+class PiecewiseSchedule(Controller):
+    """
+    Piecewise constant flow rate: every flow rate is held from its time until the time of the next one.
+    """
+
+    def __init__(self, times, flow_rates, period: float = None):
+        """
+        :param times: increasing times in seconds at which the flow rates start, the first flow rate is also used
+        before the first time
+        :param flow_rates: flow rates of the intervals
+        :param period: period of the schedule in seconds, the last flow rate is held after the last time otherwise
+        """
+        self._times = np.asarray(times, dtype=float)
+        self._flow_rates = np.asarray(flow_rates, dtype=float)
+        if self._times.ndim != 1 or self._times.shape != self._flow_rates.shape:
+            raise ValueError("Schedule times and flow rates should be one-dimensional arrays of the same length.")
+        if np.any(np.diff(self._times) <= 0):
+            raise ValueError("Schedule times should be increasing.")
+        self._period = period
+
+    @property
+    def flow_rates(self):
+        return self._flow_rates
+
+    def flow_rate(self, time: float, dt: float):
+        if self._period is not None:
+            time = time % self._period
+        index = max(int(np.searchsorted(self._times, time, side="right")) - 1, 0)
+        return float(self._flow_rates[index])
+
+
+class Thermostat(Controller):
+    """
+    Differential on/off controller, as used for solar collectors: the pump is switched on when the sensor is hotter than
+    the reference by `on_difference` and switched off when the difference drops below `off_difference`. The gap between
+    the two thresholds keeps the pump from switching on every step.
+    """
+
+    def __init__(self, sensor: FlowObject, flow_rate: float, on_difference: float, off_difference: float,
+                 reference: FlowObject = None, off_flow_rate: float = 0.0):
+        """
+        :param sensor: object whose outlet temperature is measured, e.g. the solar panel
+        :param flow_rate: flow rate of the running pump
+        :param on_difference: temperature difference that switches the pump on
+        :param off_difference: temperature difference that switches the pump off, not above `on_difference`
+        :param reference: object whose outlet temperature is subtracted, e.g. the tank, differences are the sensor
+        temperatures themselves if not given
+        :param off_flow_rate: flow rate of the stopped pump
+        """
+        if off_difference > on_difference:
+            raise ValueError("Thermostat switches off at a larger temperature difference than it switches on.")
+        self._sensor = sensor
+        self._reference = reference
+        self._on_flow_rate = flow_rate
+        self._off_flow_rate = off_flow_rate
+        self._on_difference = on_difference
+        self._off_difference = off_difference
+        self._on = False
+
+    @property
+    def on(self):
+        return self._on
+
+    def flow_rate(self, time: float, dt: float):
+        difference = float(self._sensor.T_outlet)
+        if self._reference is not None:
+            difference -= float(self._reference.T_outlet)
+        if self._on and difference < self._off_difference:
+            self._on = False
+        elif not self._on and difference > self._on_difference:
+            self._on = True
+        return self._on_flow_rate if self._on else self._off_flow_rate
+
+    def get_state(self) -> dict:
+        return {"on": self._on}
+
+    def set_state(self, state: dict):
+        self._on = bool(state["on"])
+
+
+class PIDController(Controller):
+    """
+    Proportional-integral-derivative controller that keeps the outlet temperature of the sensor at the setpoint:
+        flow rate = gain (e + ∫e dt / integral_time + derivative_time de/dt),  e = T_sensor - setpoint
+    so with a positive gain the pump runs faster when the sensor is too hot, as for the outlet of the solar panel. The
+    flow rate is limited to the given range, and the integral is only accumulated while the flow rate is within the
+    range, so it does not wind up while the pump is saturated.
+    """
+
+    def __init__(self, sensor: FlowObject, setpoint: float, gain: float, integral_time: float = None,
+                 derivative_time: float = 0.0, min_flow_rate: float = 0.0, max_flow_rate: float = np.inf):
+        """
+        :param sensor: object whose outlet temperature is controlled
+        :param setpoint: target temperature
+        :param gain: proportional gain, flow rate per kelvin
+        :param integral_time: integral time in seconds, no integral action if not given
+        :param derivative_time: derivative time in seconds
+        :param min_flow_rate: minimal flow rate of the pump
+        :param max_flow_rate: maximal flow rate of the pump
+        """
+        self._sensor = sensor
+        self._setpoint = setpoint
+        self._gain = gain
+        self._integral_time = integral_time
+        self._derivative_time = derivative_time
+        self._min_flow_rate = min_flow_rate
+        self._max_flow_rate = max_flow_rate
+        self._integral = 0.0
+        self._error = None
+
+    def flow_rate(self, time: float, dt: float):
+        error = float(self._sensor.T_outlet) - self._setpoint
+        derivative = 0.0 if self._error is None else (error - self._error) / dt
+        self._error = error
+        integral = self._integral + error * dt
+        action = error + self._derivative_time * derivative
+        if self._integral_time is not None:
+            action += integral / self._integral_time
+        flow_rate = self._gain * action
+        if self._min_flow_rate <= flow_rate <= self._max_flow_rate:
+            self._integral = integral
+        return min(max(flow_rate, self._min_flow_rate), self._max_flow_rate)
+
+    def get_state(self) -> dict:
+        state = {"integral": self._integral}
+        if self._error is not None:
+            state["error"] = self._error
+        return state
+
+    def set_state(self, state: dict):
+        self._integral = float(state["integral"])
+        self._error = float(state["error"]) if "error" in state else None
@@ -0,0 +1,73 @@
+import numpy as np
+
+from heat_transfer.observer import Observer
+
+
+class ConvergenceMonitor(Observer):
+    """
+    Stops the simulation when the system has reached the steady state. Every `every` iterations the monitor compares
+    temperatures inside all objects with the previous check, and the steady state is declared once the maximal rate of
+    temperature change (and optionally the relative change of the stored energy) stays below the tolerance for
+    `window` iterations.
+    """
+
+    def __init__(self, tolerance: float = 1e-6, window: int = 100, every: int = 10, energy_tolerance: float = None):
+        """
+        :param tolerance: maximal temperature change per time step
+        :param window: number of iterations the tolerance has to hold
+        :param every: number of iterations between the checks
+        :param energy_tolerance: maximal relative change of the stored energy per time step, not checked if None
+        """
+        self._tolerance = tolerance
+        self._window = window
+        self._every = every
+        self._energy_tolerance = energy_tolerance
+        self._previous = None
+        self._energy = None
+        self._steady_since = None
+        self.converged_iteration = None
+        self.steps_saved = 0
+
+    def start(self, simulation):
+        self._previous = None
+        self._energy = None
+        self._steady_since = None
+        self.converged_iteration = None
+        self.steps_saved = 0
+
+    def notify(self, simulation, iteration: int):
+        if iteration % self._every != 0:
+            return
+        objects = [obj for obj in simulation.objects if hasattr(obj, "temperature")]
+        temperatures = [obj.temperature.copy() for obj in objects]
+        if self._previous is None:
+            self._previous = temperatures
+            self._energy = self._stored_energy(objects, simulation.setup)
+            return
+        change = max(np.max(np.abs(T - T_prev)) for T, T_prev in zip(temperatures, self._previous)) / self._every
+        steady = change <= self._tolerance
+        if self._energy_tolerance is not None:
+            energy = self._stored_energy(objects, simulation.setup)
+            steady = steady and np.max(np.abs(energy - self._energy) / np.abs(energy)) / self._every <= \
+                self._energy_tolerance
+            self._energy = energy
+        self._previous = temperatures
+        if not steady:
+            self._steady_since = None
+            return
+        if self._steady_since is None:
+            self._steady_since = iteration
+        if iteration - self._steady_since >= self._window:
+            self.converged_iteration = iteration
+            simulation.stop()
+
+    def finish(self, simulation):
+        if self.converged_iteration is not None:
+            self.steps_saved = simulation.setup.t_max - simulation.iteration
+
+    @staticmethod
+    def _stored_energy(objects, setup):
+        """
+        :return: thermal energy of the liquid inside the objects, counted from zero temperature
+        """
+        return sum(obj.thermal_energy(setup) for obj in objects)
@@ -0,0 +1,85 @@
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.linalg import splu
+
+from heat_transfer.flow_object import FlowObject
+
+
+class CoupledSystem(object):
+    """
+    Implicit scheme of the whole circulation loop assembled into a single sparse matrix.
+    The inlet ghost cell of every object is coupled to the outlet of the upstream object at the new time level, so
+    there is no lag between the objects. Objects without their own discretization (Pump) pass the temperature through:
+        T_pump - T_(upstream outlet) = 0
+    Factorization of the matrix is kept between time steps and recomputed only when coefficients of any object change.
+    """
+
+    def __init__(self, objects: list[FlowObject]):
+        """
+        :param objects: objects of the loop in the order of the flow, the last object feeds the first one
+        """
+        if any(getattr(obj, "members", None) is not None for obj in objects):
+            raise RuntimeError("Coupled time stepping does not support ensembles.")
+        if any(hasattr(obj, "temperature") and (not hasattr(obj, "implicit_coefficients")
+                                                or getattr(obj, "advection", "upwind") != "upwind") for obj in objects):
+            raise RuntimeError("Coupled time stepping supports only objects with the upwind implicit scheme.")
+        self._objects = objects
+        # every discretized object has the inlet ghost cell followed by its cells, pass-through objects have one value
+        sizes = [obj.temperature.shape[-1] + 1 if hasattr(obj, "implicit_coefficients") else 1 for obj in objects]
+        self._offsets = np.cumsum([0] + sizes[:-1])
+        self._outlets = np.cumsum(sizes) - 1
+        self._size = sum(sizes)
+        self._rhs = np.empty(self._size)
+        self._key = None
+        self._lu = None
+
+    def time_step(self, setup):
+        """
+        Advance all objects of the loop by one time step.
+        :param setup: simulation setup
+        """
+        coefficients = [obj.implicit_coefficients(setup) if hasattr(obj, "implicit_coefficients") else None
+                        for obj in self._objects]
+        key = tuple(None if c is None else c[:3] for c in coefficients)
+        if key != self._key:
+            self._factorize(coefficients)
+            self._key = key
+        for obj, c, offset in zip(self._objects, coefficients, self._offsets):
+            if c is None:
+                self._rhs[offset] = 0.0
+                continue
+            source = c[3]
+            self._rhs[offset] = source
+            np.add(obj.temperature, source, out=self._rhs[offset + 1:offset + 1 + obj.temperature.shape[-1]])
+        T = self._lu.solve(self._rhs)
+        for k, obj in enumerate(self._objects):
+            offset = self._offsets[k]
+            if coefficients[k] is not None:
+                obj.temperature[:] = T[offset + 1:self._outlets[k] + 1]
+            obj.T_inlet = T[self._outlets[k - 1]]
+            obj.T_outlet = T[self._outlets[k]]
+        for obj, c in zip(self._objects, coefficients):
+            if c is not None:
+                obj.account_energy(setup)
+
+    def _factorize(self, coefficients):
+        rows = []
+        columns = []
+        values = []
+        for k, (obj, c) in enumerate(zip(self._objects, coefficients)):
+            offset = self._offsets[k]
+            # inlet is coupled to the outlet of the upstream object
+            rows.append([offset, offset])
+            columns.append([offset, self._outlets[k - 1]])
+            if c is None:
+                values.append([1.0, -1.0])
+                continue
+            ghost_diagonal, diagonal, lower, _ = c
+            values.append([ghost_diagonal, -1.0])
+            cells = np.arange(offset + 1, self._outlets[k] + 1)
+            rows += [cells, cells]
+            columns += [cells, cells - 1]
+            values += [np.full(cells.shape, diagonal), np.full(cells.shape, lower)]
+        A = coo_matrix((np.concatenate(values), (np.concatenate(rows), np.concatenate(columns))),
+                       shape=(self._size, self._size))
+        self._lu = splu(A.tocsc())
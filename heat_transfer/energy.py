@@ -0,0 +1,89 @@
+class EnergyBalance(object):
+    """
+    Running sums of the energy fluxes of an object since the start of the simulation, in J counted from zero
+    temperature:
+      - inflow: energy carried in by the liquid entering through the inlet,
+      - outflow: energy carried out by the liquid leaving through the outlet,
+      - exchange: heat received from the surroundings, e.g. absorbed by the solar panel, negative for the heat lost to
+        T_env.
+    The sums are updated by the object on every time step, with the same discretization as its scheme, so for an
+    exactly conservative scheme the stored energy changes by inflow - outflow + exchange and the residual stays at the
+    rounding error. Sums of ensembles have shape (members,).
+    """
+
+    def __init__(self):
+        self._stored = None
+        self._inflow = 0.0
+        self._outflow = 0.0
+        self._exchange = 0.0
+
+    @property
+    def stored(self):
+        """
+        :return: stored energy at the start of the accounting
+        """
+        return self._stored
+
+    @property
+    def inflow(self):
+        return self._inflow
+
+    @property
+    def outflow(self):
+        return self._outflow
+
+    @property
+    def exchange(self):
+        return self._exchange
+
+    def reset(self, stored):
+        """
+        Start the accounting from the given stored energy.
+        :param stored: current stored energy of the object
+        """
+        self._stored = stored
+        self._inflow = 0.0
+        self._outflow = 0.0
+        self._exchange = 0.0
+
+    def add(self, inflow, outflow, exchange):
+        """
+        Add the energy fluxes of a time step.
+        :param inflow: energy entered through the inlet
+        :param outflow: energy left through the outlet
+        :param exchange: heat received from the surroundings
+        """
+        self._inflow = self._inflow + inflow
+        self._outflow = self._outflow + outflow
+        self._exchange = self._exchange + exchange
+
+    def residual(self, stored):
+        """
+        :param stored: current stored energy of the object
+        :return: energy created by the scheme since the start of the accounting, zero for a conservative scheme
+        """
+        if self._stored is None:
+            raise RuntimeError("Energy accounting has not been started.")
+        return stored - self._stored - (self._inflow - self._outflow + self._exchange)
+
+    def get_state(self) -> dict:
+        """
+        :return: running sums with the keys prefixed by "energy_", to be merged into the state of the object, empty if
+        the accounting has not been started
+        """
+        if self._stored is None:
+            return {}
+        return {"energy_stored": self._stored, "energy_inflow": self._inflow, "energy_outflow": self._outflow,
+                "energy_exchange": self._exchange}
+
+    def set_state(self, state: dict):
+        """
+        Restore the running sums from the state of the object, states without them leave the sums unchanged.
+        :param state: state of the object
+        """
+        if "energy_stored" not in state:
+            return
+        self._stored = state["energy_stored"]
+        self._inflow = state["energy_inflow"]
+        self._outflow = state["energy_outflow"]
+        self._exchange = state["energy_exchange"]
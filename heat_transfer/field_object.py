@@ -0,0 +1,43 @@
+import numpy as np
+
+
+class FieldObject(object):
+    """
+    Mixin of the objects that keep their temperature in cells, which the simulation binds to its state buffer.
+    """
+
+    @property
+    def temperature(self):
+        return self._T
+
+    def bind_temperature(self, T: np.ndarray):
+        """
+        Keep the temperature inside the object in the given array, the current temperature is copied into it.
+        :param T: view of the state buffer of the simulation with the shape of the temperature
+        """
+        T[...] = self._T
+        self._T = T
+
+
+class AxialFieldObject(FieldObject):
+    """
+    Mixin of the objects discretized along the flow only, the liquid leaves from the last cell. The temperature of an
+    ensemble of `_members` simulations has shape (members, cells).
+    """
+
+    @property
+    def outlet_cells(self):
+        """
+        :return: indices of the cells at the outlet in the flattened temperature, one for every ensemble member
+        """
+        n = self._T.shape[-1]
+        return n - 1 if self._members is None else np.arange(self._members) * n + n - 1
+
+    def _port_temperatures(self):
+        """
+        :return: inlet temperature and temperature of the last cell, arrays of shape (members,) for an ensemble
+        """
+        if self._members is None:
+            # arithmetic on scalars is much faster than on zero-dimensional arrays
+            return float(self._T_inlet), self._T[-1]
+        return self._T_inlet, self._T[:, -1]
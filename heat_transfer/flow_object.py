@@ -23,6 +23,9 @@ class FlowObject(ABC):
         self._inlet = None
         self._outlet = None
         self._flow_rate = None
+        # views into the state buffer of the simulation that hold the inlet and outlet temperatures, see `bind_ports`
+        self._inlet_port = None
+        self._outlet_port = None
 
     @property
     def inlet(self):
@@ -32,6 +35,20 @@ class FlowObject(ABC):
     def outlet(self):
         return self._outlet
 
+    @property
+    def inlets(self):
+        """
+        :return: all objects that feed this object
+        """
+        return [] if self._inlet is None else [self._inlet]
+
+    @property
+    def outlets(self):
+        """
+        :return: all objects fed by this object
+        """
+        return [] if self._outlet is None else [self._outlet]
+
     @property
     def T_init(self):
         return self._T_init
@@ -42,19 +59,30 @@ class FlowObject(ABC):
 
     @property
     def T_outlet(self):
-        return self._T_outlet
+        # copy the view of the state buffer, it is overwritten in place by the next update
+        bound = self._outlet_port is not None and self._T_outlet is self._outlet_port
+        return self._T_outlet.copy() if bound else self._T_outlet
 
     @T_outlet.setter
     def T_outlet(self, temp: float):
-        self._T_outlet = temp
+        if self._outlet_port is None:
+            self._T_outlet = temp
+        else:
+            self._outlet_port[...] = temp
+            self._T_outlet = self._outlet_port
 
     @property
     def T_inlet(self):
-        return self._T_inlet
+        bound = self._inlet_port is not None and self._T_inlet is self._inlet_port
+        return self._T_inlet.copy() if bound else self._T_inlet
 
     @T_inlet.setter
     def T_inlet(self, temp: float):
-        self._T_inlet = temp
+        if self._inlet_port is None:
+            self._T_inlet = temp
+        else:
+            self._inlet_port[...] = temp
+            self._T_inlet = self._inlet_port
 
     @property
     def flow_rate(self):
@@ -66,12 +94,61 @@ class FlowObject(ABC):
 
     def attach(self, port: Type[Self]):
         self._outlet = port
-        port._inlet = self
-        port.T_inlet = self._T_outlet
+        port.connect_inlet(self)
+
+    def connect_inlet(self, port: Type[Self]):
+        """
+        Register the object that feeds this object, called by `attach` of the upstream object.
+        :param port: upstream object
+        """
+        self._inlet = port
+        self.T_inlet = port.T_outlet
+
+    def bind_ports(self, T_inlet, T_outlet):
+        """
+        Keep the inlet and outlet temperatures in the given arrays, the current values are copied into them.
+        :param T_inlet: view of the state buffer for the inlet temperature
+        :param T_outlet: view of the state buffer for the outlet temperature
+        """
+        T_inlet[...] = self._T_outlet if self._T_inlet is None else self._T_inlet
+        T_outlet[...] = self._T_outlet
+        self._inlet_port, self._T_inlet = T_inlet, T_inlet
+        self._outlet_port, self._T_outlet = T_outlet, T_outlet
+
+    def outlet_flow_rate(self, port: Type[Self]):
+        """
+        :param port: downstream object
+        :return: flow rate from this object into the given downstream object
+        """
+        return self.flow_rate
+
+    def steady_state(self, setup, T_inlet):
+        """
+        Set the object into the steady state for the given inlet temperature.
+        :param setup: environment setup
+        :param T_inlet: inlet temperature
+        :return: outlet temperature
+        """
+        raise RuntimeError(f"{type(self).__name__} does not support the steady state solution.")
+
+    def get_state(self) -> dict:
+        """
+        :return: dictionary with the values that fully describe the current state of the object
+        """
+        return {"T_inlet": self._T_inlet, "T_outlet": self._T_outlet, "flow_rate": self._flow_rate}
+
+    def set_state(self, state: dict):
+        """
+        Restore state of the object.
+        :param state: dictionary created by `get_state`
+        """
+        self._T_inlet = state["T_inlet"]
+        self._T_outlet = state["T_outlet"]
+        self._flow_rate = state["flow_rate"]
 
     def update(self):
         self._T_inlet = self._inlet.T_outlet
-        self._flow_rate = self._inlet.flow_rate
+        self._flow_rate = self._inlet.outlet_flow_rate(self)
 
     def print(self):
         pass
@@ -0,0 +1,97 @@
+import numpy as np
+
+from heat_transfer.flow_object import FlowObject
+
+
+class Splitter(FlowObject):
+    """
+    Manifold that divides the flow between several outlets. It has no volume, so every outlet gets the inlet
+    temperature. Flow rates of the outlets are set by the flow network of the simulation, either from the given
+    fractions or from the pumps of the branches.
+    """
+
+    def time_step(self, setup):
+        pass
+
+    def __init__(self, temp_init: float, fractions: list[float] = None):
+        """
+        :param temp_init: initial temperature inside the splitter
+        :param fractions: relative flow rates of the outlets in the order of attachment, determined by the pumps of the
+        branches if not given
+        """
+        FlowObject.__init__(self, temp_init)
+        self.title = "Splitter"
+        self._outlets = []
+        self._fractions = fractions
+        self._outlet_flow_rates = []
+
+    @property
+    def outlets(self):
+        return self._outlets
+
+    @property
+    def fractions(self):
+        return self._fractions
+
+    @property
+    def outlet_flow_rates(self):
+        return self._outlet_flow_rates
+
+    @outlet_flow_rates.setter
+    def outlet_flow_rates(self, flow_rates: list):
+        self._outlet_flow_rates = flow_rates
+
+    def attach(self, port):
+        self._outlets.append(port)
+        port.connect_inlet(self)
+
+    def outlet_flow_rate(self, port):
+        for outlet, flow_rate in zip(self._outlets, self._outlet_flow_rates):
+            if outlet is port:
+                return flow_rate
+        raise ValueError("Object is not attached to the splitter outlet.")
+
+    def steady_state(self, setup, T_inlet):
+        self._T_inlet = T_inlet
+        self._T_outlet = T_inlet
+        return T_inlet
+
+    def update(self):
+        super().update()
+        self._T_outlet = self._T_inlet
+
+
+class Mixer(FlowObject):
+    """
+    Manifold that joins several inlets into a single outlet. The outlet temperature is the flow rate weighted average of
+    the inlet temperatures.
+    """
+
+    def time_step(self, setup):
+        pass
+
+    def __init__(self, temp_init: float):
+        """
+        :param temp_init: initial temperature inside the mixer
+        """
+        FlowObject.__init__(self, temp_init)
+        self.title = "Mixer"
+        self._inlets = []
+
+    @property
+    def inlets(self):
+        return self._inlets
+
+    def connect_inlet(self, port):
+        self._inlets.append(port)
+        self._inlet = port
+        self.T_inlet = port.T_outlet
+
+    def update(self):
+        flow_rates = [inlet.outlet_flow_rate(self) for inlet in self._inlets]
+        flow_rate = sum(flow_rates)
+        heat = sum(f * inlet.T_outlet for f, inlet in zip(flow_rates, self._inlets))
+        # without any flow the liquid inside the mixer keeps its temperature
+        self._T_outlet = np.where(flow_rate > 0, heat / np.where(flow_rate > 0, flow_rate, 1.0), self._T_outlet)[()]
+        self._T_inlet = self._T_outlet
+        self._flow_rate = flow_rate
@@ -0,0 +1,172 @@
+import heapq
+
+import numpy as np
+
+from heat_transfer.flow_object import FlowObject
+from heat_transfer.manifold import Splitter
+from heat_transfer.pump import Pump
+
+
+class FlowNetwork(object):
+    """
+    Graph of the flow objects connected with `attach`. The network provides
+      - the update schedule: objects in the topological order of the flow, where the connections leaving a pump are
+        cut, so every object reads the outlet temperature of its upstream objects and the pumps close the loops with
+        the temperature of the previous update, as in a single loop;
+      - branches: chains of objects between pumps and manifolds, that are advanced independently by the time step;
+      - flow rates of the splitter outlets from the mass conservation in every object, the flow rates of the pumps and
+        the fractions of the splitters.
+    """
+
+    def __init__(self, objects: list[FlowObject]):
+        """
+        :param objects: all objects of the network
+        """
+        index = {id(obj): i for i, obj in enumerate(objects)}
+        for obj in objects:
+            if not obj.inlets or not obj.outlets:
+                raise RuntimeError(f"{type(obj).__name__} is not connected into the loop.")
+            if any(id(port) not in index for port in obj.outlets):
+                raise RuntimeError(f"{type(obj).__name__} is attached to an object outside of the simulation.")
+        self._objects = objects
+        # connection between the outlet of the first object and the inlet of the second one
+        self._edges = [(i, index[id(port)]) for i, obj in enumerate(objects) for port in obj.outlets]
+        self._pumps = [i for i, obj in enumerate(objects) if isinstance(obj, Pump)]
+        if not self._pumps:
+            raise RuntimeError("No pump attached.")
+        self._order = self._sort()
+        self._schedule = [objects[i] for i in self._order]
+        self._branches = self._split()
+        self._loop = self._find_loop()
+        self._splitters = [(obj, [k for k, (i, _) in enumerate(self._edges) if i == j])
+                           for j, obj in enumerate(objects) if isinstance(obj, Splitter)]
+        # flow rates are only computed when they are not simply passed along the loop by the objects themselves
+        self._solve_flows = bool(self._splitters) or len(self._pumps) > 1
+        if self._solve_flows:
+            self._flow_map, self._flow_residual = self._flow_equations()
+            self.update_flows()
+
+    @property
+    def schedule(self):
+        return self._schedule
+
+    @property
+    def branches(self):
+        return self._branches
+
+    @property
+    def loop(self):
+        """
+        :return: objects in the order of the flow starting from the first object, if the network is a single loop
+        """
+        return self._loop
+
+    def update_flows(self):
+        """
+        Compute flow rates of all connections from the current flow rates of the pumps and pass them to the splitters.
+        """
+        if not self._solve_flows:
+            return
+        rates = np.array(np.broadcast_arrays(*(np.asarray(self._objects[i].flow_rate, dtype=float)
+                                               for i in self._pumps)))
+        if np.any(np.abs(self._flow_residual @ rates) > 1e-9 * max(np.max(np.abs(rates)), 1.0)):
+            raise RuntimeError("Flow rates of the pumps violate the mass conservation in the network.")
+        flows = self._flow_map @ rates
+        for splitter, edges in self._splitters:
+            splitter.outlet_flow_rates = [flows[k] for k in edges]
+
+    def _sort(self):
+        # Kahn's algorithm, ties are resolved by the position of the object in the simulation
+        count = [0] * len(self._objects)
+        downstream = [[] for _ in self._objects]
+        for i, j in self._edges:
+            if not isinstance(self._objects[i], Pump):
+                count[j] += 1
+                downstream[i].append(j)
+        for i in self._pumps:
+            downstream[i] = []
+        ready = [i for i, c in enumerate(count) if c == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            i = heapq.heappop(ready)
+            order.append(i)
+            for j in downstream[i]:
+                count[j] -= 1
+                if count[j] == 0:
+                    heapq.heappush(ready, j)
+        if len(order) != len(self._objects):
+            raise RuntimeError("Every loop of the network needs a pump.")
+        return order
+
+    def _split(self):
+        # objects joined by a plain connection, that does not leave a pump or touch a manifold, form a branch
+        parent = list(range(len(self._objects)))
+
+        def root(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, j in self._edges:
+            if (not isinstance(self._objects[i], Pump) and len(self._objects[i].outlets) == 1
+                    and len(self._objects[j].inlets) == 1):
+                parent[root(j)] = root(i)
+        branches = {}
+        for i in self._order:
+            branches.setdefault(root(i), []).append(self._objects[i])
+        return list(branches.values())
+
+    def _find_loop(self):
+        if any(len(obj.inlets) != 1 or len(obj.outlets) != 1 for obj in self._objects):
+            return None
+        loop = [self._objects[0]]
+        while loop[-1].outlet is not self._objects[0]:
+            loop.append(loop[-1].outlet)
+        return loop if len(loop) == len(self._objects) else None
+
+    def _flow_equations(self):
+        """
+        Linear equations for the flow rates of all connections:
+          - sum of inlet flow rates equals the sum of outlet flow rates in every object;
+          - flow rate leaving a pump equals the flow rate of the pump;
+          - flow rate of every splitter outlet is the given fraction of the inlet flow rate.
+        :return: map from the pump flow rates to the connection flow rates and the residual of the equations
+        """
+        rows = []
+        pumps = []
+        for j, obj in enumerate(self._objects):
+            row = np.zeros(len(self._edges))
+            for k, (source, target) in enumerate(self._edges):
+                row[k] += (target == j) - (source == j)
+            rows.append(row)
+            pumps.append(None)
+        for p, j in enumerate(self._pumps):
+            row = np.zeros(len(self._edges))
+            row[[k for k, (source, _) in enumerate(self._edges) if source == j]] = 1.0
+            rows.append(row)
+            pumps.append(p)
+        for j, obj in enumerate(self._objects):
+            if not isinstance(obj, Splitter) or obj.fractions is None:
+                continue
+            fractions = np.asarray(obj.fractions, dtype=float)
+            if len(fractions) != len(obj.outlets):
+                raise RuntimeError("Number of splitter fractions differs from the number of its outlets.")
+            inlets = [k for k, (_, target) in enumerate(self._edges) if target == j]
+            outlets = [k for k, (source, _) in enumerate(self._edges) if source == j]
+            for k, fraction in zip(outlets, fractions / fractions.sum()):
+                row = np.zeros(len(self._edges))
+                row[k] = 1.0
+                row[inlets] -= fraction
+                rows.append(row)
+                pumps.append(None)
+        A = np.array(rows)
+        B = np.zeros((len(rows), len(self._pumps)))
+        for r, p in enumerate(pumps):
+            if p is not None:
+                B[r, p] = 1.0
+        if np.linalg.matrix_rank(A) < len(self._edges):
+            raise RuntimeError("Flow rates in the network are not determined, set fractions of the splitters.")
+        flow_map = np.linalg.pinv(A) @ B
+        return flow_map, A @ flow_map - B
@@ -0,0 +1,31 @@
+from abc import ABC, abstractmethod
+
+
+class Observer(ABC):
+    """
+    Describes a general interface for objects that follow the simulation progress without taking part in the physics
+    (visualization, recording, monitoring).
+    """
+
+    def start(self, simulation):
+        """
+        Called once before the first time step.
+        :param simulation: simulation being observed
+        """
+        pass
+
+    @abstractmethod
+    def notify(self, simulation, iteration: int):
+        """
+        Called on every iteration after inlet and outlet temperatures have been matched and before the time step.
+        :param simulation: simulation being observed
+        :param iteration: current iteration
+        """
+        pass
+
+    def finish(self, simulation):
+        """
+        Called once after the last time step.
+        :param simulation: simulation being observed
+        """
+        pass
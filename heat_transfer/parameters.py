@@ -0,0 +1,20 @@
+import numpy as np
+
+
+def copy_parameters(values) -> tuple:
+    """
+    Copy the parameters a cached system has been built from, to detect when they change.
+    :param values: scalar or array parameters
+    :return: tuple of the copies
+    """
+    # keep a copy, parameter arrays can be modified in place between the steps
+    return tuple(np.copy(value) for value in values)
+
+
+def parameters_equal(values, reference) -> bool:
+    """
+    :param values: scalar or array parameters
+    :param reference: parameters returned by `copy_parameters`
+    :return: whether all parameters are equal element-wise
+    """
+    return all(np.array_equal(a, b) for a, b in zip(values, reference))
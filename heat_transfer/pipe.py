@@ -1,10 +1,19 @@
 import numpy as np
 
+from heat_transfer.characteristics import SemiLagrangianScheme
 from heat_transfer.dynamic_object import DynamicObject
+from heat_transfer.energy import EnergyBalance
+from heat_transfer.field_object import AxialFieldObject
 from heat_transfer.flow_object import FlowObject
+from heat_transfer.transport_delay import TransportDelay
+from heat_transfer.upwind_system import EnsembleUpwindSystem, UpwindSystem
 
 
-class Pipe(FlowObject, DynamicObject):
+# advection schemes of the discretized objects
+ADVECTION_SCHEMES = ["upwind", "semi_lagrangian"]
+
+
+class Pipe(FlowObject, DynamicObject, AxialFieldObject):
     """
     Describes an ideal pipe between two stacks.
     There is no friction in the pipe, and we assume that the pipe's radius is small enough such that there is no
@@ -24,6 +33,11 @@ class Pipe(FlowObject, DynamicObject):
         solve next step of the partial differential equation:
           ∂T/∂t = a ∂T/∂x + b(T_env - T)
         using finite differences implicit scheme, here T_env is the temperature of the environment.
+        Upwind discretization makes the system lower-bidiagonal, so it is solved in O(n) as a banded system.
+        The matrix is cached and rebuilt only when flow rate, time step or fluid properties change.
+        With the "semi_lagrangian" advection the temperature is transported along the characteristics instead, see
+        SemiLagrangianScheme, and the "lumped" pipe is the transport delay of TransportDelay.
+        Energy fluxes of the step are added to the energy balance, see `account_energy`.
 
         For heat transfer equation:
         a - v / ρ π r^2
@@ -34,30 +48,198 @@ class Pipe(FlowObject, DynamicObject):
         """
         if self._T_inlet is None:
             raise RuntimeError("Pipe is not connected to a source.")
+        self._update_system(setup)
+        if self._advection == "lumped":
+            self._entered = self._system.solve(self._T_inlet, self._T, self.rhs_temperature(setup))
+        elif self._advection != "upwind":
+            self._system.solve(self._T_inlet, self._T, self.rhs_temperature(setup))
+        else:
+            self._system.solve(self._T_inlet, self._T, self.rhs_temperature(setup) * self._b)
+        self.account_energy(setup)
+
+    def account_energy(self, setup):
+        """
+        Add the energy fluxes of the last time step to the energy balance. Summed over the cells, the upwind scheme is
+          ρ Cp V Σ(T_i - T_i_prev) = Cp v dt (T_0 - T_n) + ρ Cp V b Σ(T_env - T_i)
+        with the inlet ghost cell T_0 = T_inlet + b (T_env - T_inlet) / (1 + b), so the balance is exact. Along the
+        characteristics the liquid in every cell receives (exp(b) - 1)(T_env - T_i), which is exact except for the
+        liquid that has entered during the step, and the lumped pipe accounts the heat exchanged by the liquid over its
+        whole stay in the pipe when it leaves.
+        :param setup: environment setup
+        """
+        T_inlet, T_outlet = self._port_temperatures()
+        if self._advection == "lumped":
+            exchange = self._flow_energy * (T_outlet - self._entered)
+        else:
+            external_temperature = self.rhs_temperature(setup)
+            exchange = self._exchange_energy * (self._n * external_temperature - self._T.dot(self._cells))
+            if self._advection == "upwind":
+                exchange += self._ghost_energy * (external_temperature - T_inlet)
+        self._energy.add(self._flow_energy * T_inlet, self._flow_energy * T_outlet, exchange)
+
+    def _update_system(self, setup):
+        """
+        Rebuild the implicit scheme matrix if any of the parameters that define it have changed since the last step.
+        :param setup: environment setup
+        """
+        key = (self.flow_rate, self._dt, setup.rho, setup.Cp, self._heat_transfer)
+        if self._system.matches(key):
+            return
         area = 2 * np.pi * self._radius * self._dl
         volume = self._dl * np.pi * self._radius ** 2
-        temperature = np.zeros(self._n + 2)
         a = self.flow_rate / (setup.rho * np.pi * self._radius ** 2)
-        b = self._dt * self._heat_transfer * area / (setup.rho * setup.Cp * volume)
-        external_temperature = self.rhs_temperature(setup)
-        temperature[1:-1] = self._T[:] + external_temperature * b
-        temperature[0] = self.T_inlet + external_temperature * b
-        temperature[-1] = 0
-        # fill matrix for implicit scheme solution
-        A = np.zeros((self._n + 2, self._n + 2))
-        A[0, 0] = 1.0 + b
-        for i in range(1, self._n + 1):
-            A[i, i - 1] = -a * self._dt / self._dl
-            A[i, i] = 1.0 + a * self._dt / self._dl + b
-        A[-1, -1] = 1.0 + b
-        self._T[:] = np.linalg.solve(A, temperature)[1:-1]
-
-    def __init__(self, length: float = 50, n: int = 500, u: float = 0.0, **params):
+        self._b = self._dt * self._heat_transfer * area / (setup.rho * setup.Cp * volume)
+        self._c = a * self._dt / self._dl
+        # coefficients of the energy fluxes of a step, see `account_energy`
+        self._flow_energy = setup.Cp * self.flow_rate * self._dt
+        if self._advection != "upwind":
+            self._exchange_energy = setup.rho * setup.Cp * volume * np.expm1(self._b)
+            self._system.assemble(key, self._c, self._b)
+        else:
+            self._exchange_energy = setup.rho * setup.Cp * volume * self._b
+            self._ghost_energy = self._flow_energy * self._b / (1.0 + self._b)
+            self._system.assemble(key, 1.0 + self._b, 1.0 + self._c + self._b, -self._c)
+
+    def implicit_coefficients(self, setup):
+        """
+        Coefficients of the upwind implicit scheme, used by the coupled time stepping of the whole loop.
+        :param setup: environment setup
+        :return: diagonal element of the inlet ghost cell, diagonal and sub-diagonal elements of the inner cells of
+        the implicit scheme matrix, and the constant term of the right-hand side
+        """
+        self._update_system(setup)
+        return 1.0 + self._b, 1.0 + self._c + self._b, -self._c, self.rhs_temperature(setup) * self._b
+
+    def steady_state(self, setup, T_inlet):
+        """
+        Set the pipe into the steady state of the implicit scheme, that is the solution of
+          (c + b) T_i = c T_(i-1) + b T_env
+        with T_0 = (T_inlet + b T_env) / (1 + b) from the inlet ghost cell, which is
+          T_i = T_env + (c / (c + b))^i (T_0 - T_env)
+
+        :param setup: environment setup
+        :param T_inlet: inlet temperature
+        :return: outlet temperature
+        """
+        self._update_system(setup)
+        external_temperature = np.expand_dims(self.rhs_temperature(setup), -1)
+        b = np.expand_dims(self._b, -1)
+        c = np.expand_dims(self._c, -1)
+        if self._advection != "upwind":
+            # exact solution along the characteristic, T = T_env + exp(-λ x / a) (T_inlet - T_env)
+            travel = np.divide(np.arange(self._n) + 0.5, c, out=np.full(self._T.shape, np.inf), where=c > 0)
+            relaxation = np.exp(-b * np.where(b > 0, travel, 0.0))
+            self._T[:] = external_temperature + relaxation * (np.expand_dims(T_inlet, -1) - external_temperature)
+        else:
+            ghost = (np.expand_dims(T_inlet, -1) + b * external_temperature) / (1.0 + b)
+            self._T[:] = (external_temperature
+                          + (c / (c + b)) ** np.arange(1, self._n + 1) * (ghost - external_temperature))
+        if self._advection == "lumped":
+            self._system.reset(T_inlet, self._T)
+        self._T_inlet = T_inlet
+        self._T_outlet = self._T[..., -1].copy()
+        return self._T_outlet
+
+    def lump(self):
+        """
+        Replace the discretized pipe by the reduced-order transport delay model, starting from the current temperature
+        inside the pipe.
+        """
+        if self._members is not None:
+            raise RuntimeError("Lumped pipe does not support ensembles.")
+        # scheme the pipe returns to, see `unlump`
+        self._discretized = self._advection
+        self._advection = "lumped"
+        self._system = TransportDelay(self._n)
+        # reconstructed temperature of the cells, the temperature array keeps only the last cell up to date and may be
+        # a view of the state buffer
+        self._profile = self._T.copy()
+
+    def unlump(self):
+        """
+        Return the lumped pipe to the discretized scheme it had before `lump`, starting from the reconstructed
+        temperature of the cells.
+        """
+        self._T[...] = self.temperature
+        self._advection = self._discretized
+        self._system = self._create_system()
+        self._profile = None
+
+    def _create_system(self):
+        """
+        :return: cached implicit scheme matrix or interpolation stencil of the discretized pipe
+        """
+        if self._advection == "semi_lagrangian":
+            return SemiLagrangianScheme(self._n)
+        return UpwindSystem(self._n) if self._members is None else EnsembleUpwindSystem(self._members, self._n)
+
+    def lumped_error(self, setup) -> float:
+        """
+        Bound of the deviation of the outlet temperature of the lumped pipe (see `lump`) from the outlet temperature of
+        this pipe: maximal difference of their responses to a step change of the inlet temperature, as a fraction of
+        the step, at the current flow rate. Both models are linear in the difference of the temperature from T_env, so
+        the bound holds for a step between any two temperatures, including the difference of the heat losses. It does
+        not hold when the flow rate or T_env change in time.
+        The outlet of the upwind scheme responds to the step with the distribution function of the negative binomial
+        distribution, c^n / (1 + c + b)^(n + j) C(n - 1 + j, j) is its response to the inlet at the j-th previous step,
+        and the transport delay with a ramp over the step in which the liquid reaches the center of the last cell. Both
+        responses grow monotonically, so their largest difference is found at the steps around the ramp or in the
+        steady state, without simulating the responses. Responses of the semi-Lagrangian scheme are simulated.
+        :param setup: environment setup
+        :return: bound of the deviation
+        """
+        if self._members is not None:
+            raise RuntimeError("Lumped pipe does not support ensembles.")
+        self._update_system(setup)
+        b, c = float(self._b), float(self._c)
+        if c <= 0:
+            # without flow the inlet does not affect any of the models
+            return 0.0
+        if self._advection == "upwind":
+            # special functions are only needed to lump pipes
+            from scipy.special import betainc
+
+            n = self._n
+            steady = (c / (c + b)) ** n / (1.0 + b)
+            delayed = np.exp(-b * (n - 0.5) / c)
+            # last step before the liquid that entered with the step reaches the center of the last cell
+            arrival = int(np.floor((n - 0.5) / c))
+            steps = np.arange(max(arrival, 1), arrival + 3)
+            upwind = steady * betainc(n, steps, (c + b) / (1.0 + c + b))
+            delay = np.clip((steps * c - n + 0.5) / c, 0.0, 1.0) * delayed
+            return float(max(np.max(np.abs(upwind - delay)), abs(steady - delayed)))
+        # both responses settle within the mean residence time and a few widths of the upwind dispersion
+        steps = min(int(np.ceil((self._n + 10 * np.sqrt(self._n * (1 + c))) / c)) + 10, 100000)
+        key = (c, b)
+        delay = TransportDelay(self._n)
+        delay.assemble(key, c, b)
+        system = SemiLagrangianScheme(self._n)
+        system.assemble(key, c, b)
+        T = np.zeros(self._n)
+        T_delay = np.zeros(self._n)
+        delay.reset(0.0, T_delay)
+        error = 0.0
+        for _ in range(steps):
+            system.solve(1.0, T)
+            delay.solve(1.0, T_delay)
+            error = max(error, abs(T[-1] - T_delay[-1]))
+        return error
+
+    def __init__(self, length: float = 50, n: int = 500, u: float = 0.0, members: int = None,
+                 advection: str = "upwind", **params):
         """
         :param temp_init: initial temperature inside the pipe
         :param length: length of the pipe
         :param radius: radius of the pipe
+        :param members: number of ensemble members simulated at once, temperature inside the pipe then has shape
+        (members, n) and parameters that differ between the members are arrays of shape (members,)
+        :param advection: "upwind" implicit scheme or "semi_lagrangian" transport along the characteristics, which
+        keeps temperature fronts sharp on coarse grids and at Courant numbers above one, or "lumped" reduced-order
+        model of the pipe as a transport delay with the heat loss, see `lump`
         """
+        if advection not in ADVECTION_SCHEMES + ["lumped"]:
+            raise ValueError(f"Unknown advection scheme '{advection}', expected one of {ADVECTION_SCHEMES} or "
+                             f"'lumped'.")
         FlowObject.__init__(self, temp_init=params["temp_init"])
         DynamicObject.__init__(self, dt=params["dt"], t_max=params["t_max"])
         self.title = "Pipe"
@@ -67,13 +249,60 @@ class Pipe(FlowObject, DynamicObject):
         self._n = n  # number of discretization steps
         self._dl = self._length / n  # discretization step along the pipe
         self._x = np.linspace(self._dl / 2, self._length - self._dl / 2, n)  # center of each elementary cell
-        self._T = np.ones(n) * self.T_init  # initial temperature inside the pipe
-        self._dTdt = np.zeros(n)  # initialize temperature change rate to zero
+        self._members = members
+        shape = (n,) if members is None else (members, n)
+        self._T = np.ones(shape) * np.expand_dims(self.T_init, -1)  # initial temperature inside the pipe
+        self._dTdt = np.zeros(shape)  # initialize temperature change rate to zero
+        self._advection = "upwind" if advection == "lumped" else advection
+        self._system = self._create_system()
+        if advection == "lumped":
+            self.lump()
+        self._b = 0.0  # heat exchange coefficient of the cached matrix
+        self._c = 0.0  # advection coefficient of the cached matrix
+        self._energy = EnergyBalance()
+        self._flow_energy = 0.0
+        # sums the temperature of the cells with a dot product, which is faster than sum for short pipes
+        self._cells = np.ones(n)
+        self._exchange_energy = 0.0
+        self._ghost_energy = 0.0
+        # temperature the liquid leaving the lumped pipe had at the inlet
+        self._entered = 0.0
         self._ax = None
 
+    def thermal_energy(self, setup):
+        """
+        :param setup: environment setup
+        :return: thermal energy of the liquid inside the pipe, counted from zero temperature
+        """
+        return setup.rho * setup.Cp * self.cell_volume * np.sum(self.temperature, axis=-1)
+
+    def get_state(self) -> dict:
+        state = super().get_state() | {"T": self.temperature} | self._energy.get_state()
+        if self._advection == "lumped":
+            state |= {f"delay_{name}": value for name, value in self._system.get_state().items()}
+            # the restored delay keeps its parameters until the flow changes, and so does the energy accounting
+            state |= {"entered": self._entered, "flow_energy": self._flow_energy}
+        return state
+
+    def set_state(self, state: dict):
+        super().set_state(state)
+        self._T[:] = state["T"]
+        self._energy.set_state(state)
+        if self._advection == "lumped":
+            delay = {name[len("delay_"):]: value for name, value in state.items() if name.startswith("delay_")}
+            if delay:
+                self._system.set_state(delay)
+                if "entered" in state:
+                    self._entered = float(state["entered"])
+                    self._flow_energy = float(state["flow_energy"])
+            else:
+                # continue from the temperature of the discretized pipe
+                self._system = TransportDelay(self._n)
+
     def update(self):
         super().update()
-        self._T_outlet = self._T[-1]
+        # copy, the temperature array is overwritten in place by the next time step
+        self._T_outlet = self._T[..., -1].copy()
 
     @property
     def length(self):
@@ -83,14 +312,35 @@ class Pipe(FlowObject, DynamicObject):
     def radius(self):
         return self._radius
 
+    @property
+    def cell_volume(self):
+        return self._dl * np.pi * self._radius ** 2
+
+    @property
+    def advection(self):
+        return self._advection
+
+    @property
+    def energy(self):
+        return self._energy
+
+    @property
+    def members(self):
+        return self._members
+
     @property
     def temperature(self):
+        if self._advection == "lumped":
+            # the lumped pipe only keeps the temperature of the last cell up to date
+            self._profile[...] = self._T
+            self._system.profile(self._profile)
+            return self._profile
         return self._T
 
     def print(self):
         super().print()
         if self._ax is not None:
             self._ax.cla()
-            y = np.tile(self._T, (self._T.shape[0] // 10, 1))
+            y = np.tile(self.temperature, (self._T.shape[0] // 10, 1))
             self._ax.title.set_text(self.title)
             self._ax.imshow(y, cmap="plasma", vmin=self._ax.v_min, vmax=self._ax.v_max, aspect="equal")
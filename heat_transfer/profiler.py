@@ -0,0 +1,160 @@
+import json
+import time
+import tracemalloc
+
+from heat_transfer.observer import Observer
+
+
+class _Timing(object):
+    """
+    Accumulated statistics of the calls to a single method.
+    """
+    __slots__ = ["calls", "total", "min", "max", "allocated"]
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.allocated = 0
+
+
+class Profiler(Observer):
+    """
+    Collects wall time of `time_step`, `update` and `print` of every object, of the simulation update and time step
+    and of the other observers. Methods are wrapped when the simulation starts and restored when it finishes, so
+    a simulation without the profiler runs the original code. While profiled, the simulation walks over the objects
+    instead of propagating the temperatures through its state buffer (see LoopState), so `update` of every object is
+    timed.
+    """
+
+    # methods of simulated objects that are instrumented
+    OBJECT_METHODS = ["time_step", "update", "print"]
+
+    def __init__(self, memory: bool = False, trace: bool = False):
+        """
+        :param memory: measure memory allocated inside every object method with tracemalloc, slows the simulation down
+        :param trace: keep every call to export it in the trace event format
+        """
+        self._memory = memory
+        self._trace = trace
+        self._timings = {}
+        self._events = []
+        self._wrapped = []
+        self._propagate_ports = True
+        self._steps = _Timing()
+        self._last_step = None
+        self._wall = 0.0
+        self._started = 0.0
+
+    @property
+    def timings(self):
+        return self._timings
+
+    @property
+    def steps(self):
+        return self._steps
+
+    def start(self, simulation):
+        self._timings = {}
+        self._events = []
+        self._steps = _Timing()
+        self._last_step = None
+        if self._memory:
+            tracemalloc.start()
+        for i, obj in enumerate(simulation.objects):
+            title = getattr(obj, "title", type(obj).__name__)
+            for method in self.OBJECT_METHODS:
+                self._wrap(obj, method, f"{i}:{title}.{method}", self._memory)
+        self._propagate_ports = simulation.propagate_ports
+        simulation.propagate_ports = False
+        self._wrap(simulation, "update", "Simulation.update", False)
+        self._wrap(simulation, "time_step", "Simulation.time_step", False)
+        for observer in simulation.observers:
+            if observer is not self:
+                self._wrap(observer, "notify", f"{type(observer).__name__}.notify", False)
+        self._started = time.perf_counter()
+
+    def notify(self, simulation, iteration: int):
+        now = time.perf_counter()
+        if self._last_step is not None:
+            self._add(self._steps, now - self._last_step, 0)
+        self._last_step = now
+
+    def finish(self, simulation):
+        now = time.perf_counter()
+        if self._last_step is not None:
+            self._add(self._steps, now - self._last_step, 0)
+        self._wall = now - self._started
+        for owner, method, original in reversed(self._wrapped):
+            if original is None:
+                delattr(owner, method)
+            else:
+                setattr(owner, method, original)
+        self._wrapped = []
+        simulation.propagate_ports = self._propagate_ports
+        if self._memory:
+            tracemalloc.stop()
+
+    def summary(self) -> str:
+        """
+        :return: table with the statistics of all instrumented methods, sorted by the total time
+        """
+        lines = [f"{'method':<40} {'calls':>8} {'total, s':>10} {'mean, us':>10} {'max, us':>10} {'wall, %':>8}"
+                 + (f" {'alloc, B/call':>14}" if self._memory else "")]
+        wall = max(self._wall, 1e-12)
+        for name, timing in sorted(self._timings.items(), key=lambda item: -item[1].total):
+            if timing.calls == 0:
+                continue
+            line = (f"{name:<40} {timing.calls:>8} {timing.total:>10.4f} {1e6 * timing.total / timing.calls:>10.1f} "
+                    f"{1e6 * timing.max:>10.1f} {100 * timing.total / wall:>8.2f}")
+            if self._memory:
+                line += f" {timing.allocated / timing.calls:>14.0f}"
+            lines.append(line)
+        if self._steps.calls:
+            lines.append(f"{self._steps.calls} steps in {self._wall:.4f} s, step time mean "
+                         f"{1e6 * self._steps.total / self._steps.calls:.1f} us, min {1e6 * self._steps.min:.1f} us, "
+                         f"max {1e6 * self._steps.max:.1f} us")
+        return "\n".join(lines)
+
+    def export_trace(self, path: str):
+        """
+        Write recorded calls in the Chrome trace event format, that can be loaded into chrome://tracing, Perfetto or
+        speedscope to get a flame graph.
+        :param path: path to the output JSON file
+        """
+        if not self._trace:
+            raise RuntimeError("Profiler has been created without trace recording.")
+        events = [{"name": name, "ph": "X", "ts": 1e6 * start, "dur": 1e6 * duration, "pid": 0, "tid": 0}
+                  for name, start, duration in self._events]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def _add(self, timing: _Timing, duration: float, allocated: int):
+        timing.calls += 1
+        timing.total += duration
+        timing.min = min(timing.min, duration)
+        timing.max = max(timing.max, duration)
+        timing.allocated += allocated
+
+    def _wrap(self, owner, method: str, name: str, memory: bool):
+        # keep the instance attribute if there is one, otherwise the class method is restored by deleting the wrapper
+        original = owner.__dict__.get(method)
+        function = getattr(owner, method)
+        timing = self._timings.setdefault(name, _Timing())
+
+        def wrapper(*args, **kwargs):
+            if memory:
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            duration = time.perf_counter() - start
+            allocated = tracemalloc.get_traced_memory()[1] - before if memory else 0
+            self._add(timing, duration, allocated)
+            if self._trace:
+                self._events.append((name, start - self._started, duration))
+            return result
+
+        setattr(owner, method, wrapper)
+        self._wrapped.append((owner, method, original))
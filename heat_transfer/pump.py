@@ -1,3 +1,6 @@
+import numpy as np
+
+from heat_transfer.control import Controller
 from heat_transfer.flow_object import FlowObject
 
 
@@ -6,13 +9,19 @@ class Pump(FlowObject):
     def time_step(self, setup):
         pass
 
-    def __init__(self, flow_rate, temp_init: float):
+    def __init__(self, flow_rate, temp_init: float, controller: Controller = None, power_coefficient: float = 0.0):
         """
         :param flow_rate: flow rate of pump
         :param temp_init: initial temperature inside the pump
+        :param controller: controller that sets the flow rate on every iteration, the flow rate stays fixed if not given
+        :param power_coefficient: electric power of the pump per cubed flow rate, the power of a pump grows with the
+        cube of its flow rate
         """
         FlowObject.__init__(self, temp_init)
         self._flow_rate = flow_rate
+        self._controller = controller
+        self._power_coefficient = power_coefficient
+        self._pumping_energy = 0.0
 
     @property
     def flow_rate(self):
@@ -22,10 +31,65 @@ class Pump(FlowObject):
     def flow_rate(self, value):
         self._flow_rate = value
 
+    @property
+    def controller(self):
+        return self._controller
+
+    @controller.setter
+    def controller(self, value: Controller):
+        self._controller = value
+
+    @property
+    def power(self):
+        """
+        :return: electric power of the pump at the current flow rate
+        """
+        return self._power_coefficient * self._flow_rate ** 3
+
+    @property
+    def pumping_energy(self):
+        """
+        :return: electric energy used by the pump since the start of the simulation
+        """
+        return self._pumping_energy
+
+    def control(self, time: float, dt: float):
+        """
+        Let the controller set the flow rate for the next time step and count the energy used by the pump in it.
+        :param time: time of the current iteration in seconds
+        :param dt: time step of the simulation
+        """
+        if self._controller is not None:
+            if np.ndim(self._inlet.T_outlet):
+                raise RuntimeError("Controllers set a single flow rate from scalar temperatures, they can not control "
+                                   "the pump of an ensemble.")
+            self._flow_rate = self._controller.flow_rate(time, dt)
+        if self._power_coefficient:
+            self._pumping_energy = self._pumping_energy + self.power * dt
+
     def attach(self, port):
         self._outlet = port
-        port._inlet = self
-        port.T_inlet = self._T_outlet
+        port.connect_inlet(self)
+
+    def steady_state(self, setup, T_inlet):
+        self._T_inlet = T_inlet
+        self._T_outlet = T_inlet
+        return T_inlet
+
+    def get_state(self) -> dict:
+        state = super().get_state() | {"pumping_energy": self._pumping_energy}
+        if self._controller is not None:
+            state |= {f"controller_{name}": value for name, value in self._controller.get_state().items()}
+        return state
+
+    def set_state(self, state: dict):
+        super().set_state(state)
+        self._pumping_energy = state.get("pumping_energy", 0.0)
+        if self._controller is not None:
+            controller = {name[len("controller_"):]: value for name, value in state.items()
+                          if name.startswith("controller_")}
+            if controller:
+                self._controller.set_state(controller)
 
     def print(self):
         pass
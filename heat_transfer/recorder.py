@@ -0,0 +1,246 @@
+import json
+import math
+import os
+
+import numpy as np
+
+from heat_transfer.observer import Observer
+
+
+class Recorder(Observer):
+    """
+    Records the simulation state every `every` iterations: temperature inside every object, outlet temperatures and
+    flow rates. Records are written into memory-mapped .npy files of `chunk_size` records each, so the memory used
+    by the recorder does not depend on the length of the run. Directory layout:
+        index.json                      - description of the recorded run
+        iteration_<chunk>.npy           - iteration of every record
+        outlet_<chunk>.npy              - outlet temperatures of all objects
+        flow_rate_<chunk>.npy           - flow rates of all objects
+        temperature_<object>_<chunk>.npy - temperature inside the object
+    A simulation restarted from a checkpoint continues the recording of the same run in the directory: the records
+    before the iteration of the checkpoint are kept and the following ones are overwritten.
+    """
+
+    def __init__(self, directory: str, every: int = 1, chunk_size: int = 1000):
+        """
+        :param directory: output directory
+        :param every: record the state every `every` iterations
+        :param chunk_size: number of records in a single file
+        """
+        self._directory = directory
+        self._every = every
+        self._chunk_size = chunk_size
+        self._index = None
+        self._chunk = None
+        self._records = 0
+
+    def start(self, simulation):
+        os.makedirs(self._directory, exist_ok=True)
+        objects = simulation.objects
+        # pump keeps a scalar outlet temperature until the first update, so use the common shape of all objects
+        port_shape = np.broadcast_shapes(*(np.shape(obj.T_outlet) for obj in objects),
+                                         *(np.shape(obj.flow_rate) for obj in objects))
+        self._index = {
+            "every": self._every,
+            # restarted simulation does not begin from the iteration zero
+            "first": math.ceil(simulation.iteration / self._every) * self._every,
+            "chunk_size": self._chunk_size,
+            "dt": simulation.setup.dt,
+            # temperatures that define the color scale of the plots
+            "setup": {name: np.asarray(getattr(simulation.setup, name)).tolist()
+                      for name in ["T_env", "temp_init", "steady_temperature"] if hasattr(simulation.setup, name)},
+            "records": 0,
+            "port_shape": list(port_shape),
+            "objects": [{"title": obj.title if hasattr(obj, "title") else type(obj).__name__,
+                         "shape": list(np.shape(obj.temperature)) if hasattr(obj, "temperature") else None}
+                        for obj in objects],
+        }
+        self._records = 0
+        if simulation.iteration > 0 and os.path.exists(self._index_path):
+            self._resume(simulation.iteration)
+        self._write_index()
+
+    def _resume(self, iteration: int):
+        """
+        Continue the recording in the directory from the given iteration.
+        :param iteration: first iteration of the restarted simulation
+        """
+        with open(self._index_path) as f:
+            index = json.load(f)
+        if any(index[name] != self._index[name] for name in ["every", "chunk_size", "port_shape", "objects"]):
+            raise ValueError(f"Directory {self._directory} records a different simulation, the restarted simulation "
+                             f"can not continue it.")
+        if index["first"] >= iteration:
+            # the recording starts after the restart and is replaced
+            return
+        self._index["first"] = index["first"]
+        # records are only counted in the index when their chunk is closed, so the records written before the restart
+        # are found by their iterations
+        count = max(math.ceil((iteration - index["first"]) / self._every), 0)
+        expected = index["first"] + self._every * np.arange(count)
+        for chunk in range(math.ceil(count / self._chunk_size)):
+            path = os.path.join(self._directory, f"iteration_{chunk:05d}.npy")
+            if not os.path.exists(path):
+                break
+            part = expected[chunk * self._chunk_size:(chunk + 1) * self._chunk_size]
+            written = np.load(path, mmap_mode="r")[:part.size] == part
+            found = part.size if np.all(written) else int(np.argmin(written))
+            self._records += found
+            if found < part.size:
+                break
+        if self._records < count:
+            raise ValueError(f"Directory {self._directory} misses the records before the iteration {iteration}, the "
+                             f"restarted simulation can not continue them.")
+        self._index["records"] = self._records
+        if self._records % self._chunk_size != 0:
+            self._open_chunk(self._records // self._chunk_size, mode="r+")
+
+    @property
+    def _index_path(self):
+        return os.path.join(self._directory, "index.json")
+
+    def notify(self, simulation, iteration: int):
+        if iteration % self._every != 0:
+            return
+        position = self._records % self._chunk_size
+        if position == 0:
+            self._open_chunk(self._records // self._chunk_size)
+        self._chunk["iteration"][position] = iteration
+        for i, obj in enumerate(simulation.objects):
+            self._chunk["outlet"][position, i] = obj.T_outlet
+            self._chunk["flow_rate"][position, i] = obj.flow_rate
+            if i in self._chunk["temperature"]:
+                self._chunk["temperature"][i][position] = obj.temperature
+        self._records += 1
+        if self._records % self._chunk_size == 0:
+            self._close_chunk()
+
+    def finish(self, simulation):
+        self._close_chunk()
+
+    def _open_chunk(self, chunk: int, mode: str = "w+"):
+        def open_memmap(name, shape):
+            path = os.path.join(self._directory, f"{name}_{chunk:05d}.npy")
+            return np.lib.format.open_memmap(path, mode=mode, dtype=np.float64, shape=(self._chunk_size,) + shape)
+
+        objects = self._index["objects"]
+        port_shape = tuple(self._index["port_shape"])
+        self._chunk = {
+            "iteration": open_memmap("iteration", ()),
+            "outlet": open_memmap("outlet", (len(objects),) + port_shape),
+            "flow_rate": open_memmap("flow_rate", (len(objects),) + port_shape),
+            "temperature": {i: open_memmap(f"temperature_{i}", tuple(obj["shape"]))
+                            for i, obj in enumerate(objects) if obj["shape"] is not None},
+        }
+
+    def _close_chunk(self):
+        if self._chunk is None:
+            return
+        self._chunk["iteration"].flush()
+        self._chunk["outlet"].flush()
+        self._chunk["flow_rate"].flush()
+        for T in self._chunk["temperature"].values():
+            T.flush()
+        self._chunk = None
+        self._index["records"] = self._records
+        self._write_index()
+
+    def _write_index(self):
+        path = self._index_path
+        with open(path + ".tmp", "w") as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+
+class Trajectory(object):
+    """
+    Reader of the run recorded by the Recorder. Only the chunks that overlap the requested time window are accessed,
+    and they are memory-mapped rather than loaded.
+    """
+
+    def __init__(self, directory: str):
+        """
+        :param directory: directory with the recorded run
+        """
+        self._directory = directory
+        with open(os.path.join(directory, "index.json")) as f:
+            self._index = json.load(f)
+
+    @property
+    def records(self):
+        return self._index["records"]
+
+    @property
+    def every(self):
+        return self._index["every"]
+
+    @property
+    def dt(self):
+        return self._index["dt"]
+
+    @property
+    def setup(self):
+        return self._index.get("setup", {})
+
+    @property
+    def titles(self):
+        return [obj["title"] for obj in self._index["objects"]]
+
+    @property
+    def shapes(self):
+        """
+        :return: shape of the recorded temperature for every object, None for objects without the temperature
+        """
+        return [None if obj["shape"] is None else tuple(obj["shape"]) for obj in self._index["objects"]]
+
+    def iterations(self, start: int = 0, stop: int = None):
+        """
+        :param start: first iteration of the window
+        :param stop: iteration after the end of the window, end of the run by default
+        :return: iterations recorded in the window
+        """
+        return self._read("iteration", start, stop)
+
+    def temperature(self, obj: int, start: int = 0, stop: int = None):
+        """
+        :param obj: position of the object in the simulation
+        :param start: first iteration of the window
+        :param stop: iteration after the end of the window, end of the run by default
+        :return: temperature inside the object for every record in the window
+        """
+        if self._index["objects"][obj]["shape"] is None:
+            raise ValueError(f"Temperature of the object {obj} has not been recorded.")
+        return self._read(f"temperature_{obj}", start, stop)
+
+    def outlet_temperature(self, obj: int, start: int = 0, stop: int = None):
+        """
+        :param obj: position of the object in the simulation
+        :param start: first iteration of the window
+        :param stop: iteration after the end of the window, end of the run by default
+        :return: outlet temperature of the object for every record in the window
+        """
+        return self._read("outlet", start, stop, obj)
+
+    def flow_rate(self, obj: int, start: int = 0, stop: int = None):
+        """
+        :param obj: position of the object in the simulation
+        :param start: first iteration of the window
+        :param stop: iteration after the end of the window, end of the run by default
+        :return: flow rate through the object for every record in the window
+        """
+        return self._read("flow_rate", start, stop, obj)
+
+    def _read(self, name: str, start: int, stop: int, column: int = None):
+        chunk_size = self._index["chunk_size"]
+        offset = self._index["first"]
+        first = min(max(math.ceil((start - offset) / self.every), 0), self.records)
+        last = self.records if stop is None else min(max(math.ceil((stop - offset) / self.every), 0), self.records)
+        parts = []
+        for chunk in range(first // chunk_size, math.ceil(last / chunk_size)):
+            data = np.load(os.path.join(self._directory, f"{name}_{chunk:05d}.npy"), mmap_mode="r")
+            begin = max(first - chunk * chunk_size, 0)
+            end = min(last - chunk * chunk_size, chunk_size)
+            parts.append(data[begin:end] if column is None else data[begin:end, column])
+        if not parts:
+            return np.empty((0,))
+        return np.concatenate(parts)
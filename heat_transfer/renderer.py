@@ -0,0 +1,130 @@
+import multiprocessing
+import queue
+import time
+
+import numpy as np
+
+from heat_transfer.observer import Observer
+
+
+def tile(T):
+    """
+    :param T: temperature inside the object, or temperatures of all ensemble members
+    :return: image of the object, single temperature profile is repeated to keep the image readable
+    """
+    T = np.asarray(T)
+    if T.ndim > 1:
+        return T
+    return np.tile(T, (max(T.shape[0] // 10, 1), 1))
+
+
+def render(frames, titles: list[str], limits: dict, fps: float):
+    """
+    Renderer process: draws the latest received frame at most `fps` times per second. Images are created on the first
+    frame and afterwards only their data is replaced. Rendering stops when `None` is received.
+    :param frames: queue with (iteration, list of temperatures) frames
+    :param titles: titles of the plotted objects
+    :param limits: setup values used to choose the color scale
+    :param fps: maximal number of redraws per second
+    """
+    import matplotlib.pyplot as plt
+    from argparse import Namespace
+
+    from heat_transfer.visualization import add_colorbar, color_limits
+
+    v_min, v_max = color_limits(Namespace(**limits))
+    fig, axs = plt.subplots(len(titles), 1, layout='constrained', figsize=(10, 8), squeeze=False)
+    axs = axs[:, 0]
+    add_colorbar(fig, axs[0], v_min, v_max)
+    images = None
+    running = True
+    while running:
+        frame = frames.get()
+        # skip frames that arrived while the previous one was drawn, only the latest state is shown
+        while frame is not None:
+            try:
+                newer = frames.get_nowait()
+            except queue.Empty:
+                break
+            if newer is None:
+                running = False
+                break
+            frame = newer
+        if frame is None:
+            break
+        iteration, temperatures = frame
+        if images is None:
+            images = [ax.imshow(tile(T), cmap="plasma", vmin=v_min, vmax=v_max) for ax, T in zip(axs, temperatures)]
+            for ax, title in zip(axs, titles):
+                ax.set_title(title)
+                ax.set_yticks([])
+        else:
+            for image, T in zip(images, temperatures):
+                image.set_data(tile(T))
+        fig.suptitle(f"Iteration {iteration}")
+        plt.pause(1.0 / fps)
+    plt.show()
+
+
+class AsyncPlotter(Observer):
+    """
+    Live visualization drawn by a separate process, so the simulation does not wait for matplotlib. Snapshots are sent
+    at most `fps` times per second through a bounded queue, and frames that do not fit into the queue are dropped.
+    """
+
+    def __init__(self, fps: float = 10.0, queue_size: int = 2, wait: bool = True):
+        """
+        :param fps: maximal number of frames per second sent to the renderer
+        :param queue_size: maximal number of frames waiting for the renderer
+        :param wait: wait for the plot window to be closed when the simulation finishes
+        """
+        self._fps = fps
+        self._queue_size = queue_size
+        self._wait = wait
+        self._frames = None
+        self._process = None
+        self._objects = []
+        self._last_frame = 0.0
+        self.sent = 0
+        self.dropped = 0
+
+    def start(self, simulation):
+        # pumps and manifolds are point objects without the temperature inside, there is nothing to be visualized
+        self._objects = [obj for obj in simulation.objects if hasattr(obj, "temperature")]
+        setup = simulation.setup
+        limits = {"T_env": setup.T_env, "temp_init": setup.temp_init, "steady_temperature": setup.steady_temperature}
+        # spawned renderer does not inherit the state of the simulation process
+        context = multiprocessing.get_context("spawn")
+        self._frames = context.Queue(self._queue_size)
+        self._process = context.Process(target=render, daemon=True,
+                                        args=(self._frames, [obj.title for obj in self._objects], limits, self._fps))
+        self._process.start()
+        self._last_frame = 0.0
+        self.sent = 0
+        self.dropped = 0
+
+    def notify(self, simulation, iteration: int):
+        now = time.perf_counter()
+        if now - self._last_frame < 1.0 / self._fps:
+            return
+        self._last_frame = now
+        try:
+            self._frames.put_nowait((iteration, [obj.temperature.copy() for obj in self._objects]))
+            self.sent += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def finish(self, simulation):
+        # renderer that has died does not empty the queue, so the end of the frames is only sent while it runs
+        while self._process.is_alive():
+            try:
+                self._frames.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        if self._wait:
+            self._process.join()
+        if not self._wait or self._process.exitcode != 0:
+            # daemon renderer is terminated together with the simulation and the renderer that has died does not read
+            # the queued frames, do not wait for them
+            self._frames.cancel_join_thread()
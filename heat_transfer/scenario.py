@@ -0,0 +1,54 @@
+import json
+import os
+from functools import lru_cache
+from types import MappingProxyType
+
+# object types of the scenario files with the parameters they accept on top of the simulation setup
+SCENARIO_TYPES = {
+    "Solar": {"length", "n", "u", "advection", "steady_temperature", "heat_transfer", "subcycled"},
+    "Pipe": {"length", "n", "u", "advection", "subcycled"},
+    "Pump": set(),
+    "Tank": {"tank_radius", "tank_length", "nx", "ny", "advection"},
+}
+# types of the parameters that are not real numbers
+PARAMETER_TYPES = {"type": str, "advection": str, "subcycled": bool, "n": int, "nx": int, "ny": int}
+
+
+def load_scenario(path: str) -> tuple:
+    """
+    Read the loop layout from the JSON scenario file: the "objects" list describes the objects in the order of the flow,
+    the last one flowing back into the first, each of them with its "type" (one of SCENARIO_TYPES) and constructor
+    parameters. The parsed and validated scenario is cached until the file changes, so the repeated simulations of the
+    sweeps and the optimizer do not read it again.
+    :param path: path to the scenario file
+    :return: read-only object definitions
+    """
+    stat = os.stat(path)
+    return _load_scenario(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=16)
+def _load_scenario(path: str, mtime: int, size: int) -> tuple:
+    with open(path) as f:
+        scenario = json.load(f)
+    objects = scenario.get("objects") if isinstance(scenario, dict) else None
+    if not isinstance(objects, list) or not objects:
+        raise ValueError(f"Scenario {path} should be an object with the non-empty 'objects' list.")
+    definitions = []
+    for i, definition in enumerate(objects):
+        kind = definition.get("type") if isinstance(definition, dict) else None
+        if kind not in SCENARIO_TYPES:
+            raise ValueError(f"Object {i} of the scenario {path} should have the type one of {list(SCENARIO_TYPES)}.")
+        unknown = set(definition) - SCENARIO_TYPES[kind] - {"type"}
+        if unknown:
+            raise ValueError(f"Object {i} of the scenario {path} has unknown parameters {sorted(unknown)}, {kind} "
+                             f"accepts {sorted(SCENARIO_TYPES[kind])}.")
+        for name, value in definition.items():
+            expected = PARAMETER_TYPES.get(name, (int, float))
+            if not isinstance(value, expected) or (expected != bool and isinstance(value, bool)):
+                raise ValueError(f"Parameter '{name}' of the object {i} of the scenario {path} has invalid value "
+                                 f"{value!r}.")
+        definitions.append(MappingProxyType(definition))
+    if sum(definition["type"] == "Pump" for definition in definitions) != 1:
+        raise ValueError(f"Scenario {path} should have exactly one pump.")
+    return tuple(definitions)
@@ -0,0 +1,97 @@
+import csv
+
+import numpy as np
+
+
+class Schedule(object):
+    """
+    Time-dependent value of a boundary condition, such as the environment temperature, the temperature of the solar
+    panel or the flow rate of a pump. Values given at arbitrary times are linearly interpolated onto the time grid of
+    the simulation once, before it starts, so the value of every step is looked up in the precomputed table.
+    Periodic schedules, e.g. daily profiles, are tabulated over a single period.
+    """
+
+    def __init__(self, times, values, period: float = None):
+        """
+        :param times: increasing times of the values in seconds
+        :param values: values of the schedule
+        :param period: period of the schedule in seconds, values are held constant after the last time otherwise
+        """
+        self._times = np.asarray(times, dtype=float)
+        self._values = np.asarray(values, dtype=float)
+        if self._times.ndim != 1 or self._times.shape != self._values.shape:
+            raise ValueError("Schedule times and values should be one-dimensional arrays of the same length.")
+        if np.any(np.diff(self._times) <= 0):
+            raise ValueError("Schedule times should be increasing.")
+        self._period = period
+        self._table = None
+        self._changed = None
+        self._steps = 0
+        # whether the table covers a single period
+        self._periodic = False
+
+    @staticmethod
+    def from_csv(path: str, column: str, time_column: str = "time", period: float = None):
+        """
+        Read the schedule from the CSV file with the header.
+        :param path: path to the CSV file
+        :param column: name of the column with the values
+        :param time_column: name of the column with the times in seconds
+        :param period: period of the schedule in seconds
+        :return: schedule
+        """
+        with open(path, newline="") as f:
+            reader = csv.reader(f)
+            header = [name.strip() for name in next(reader)]
+            for name in [time_column, column]:
+                if name not in header:
+                    raise ValueError(f"Column '{name}' is not found in {path}.")
+            data = np.array([[float(value) for value in row] for row in reader if row])
+        return Schedule(data[:, header.index(time_column)], data[:, header.index(column)], period)
+
+    @property
+    def period(self):
+        return self._period
+
+    def prepare(self, dt: float, steps: int):
+        """
+        Tabulate the schedule on the time grid of the simulation.
+        :param dt: time step
+        :param steps: number of time steps of the simulation
+        """
+        self._periodic = False
+        if self._period is not None:
+            # a period that is not a multiple of the time step is tabulated over the whole simulation
+            period_steps = self._period / dt
+            if abs(period_steps - round(period_steps)) < 1e-9 * period_steps:
+                steps = int(round(period_steps))
+                self._periodic = True
+        steps = max(steps, 1)
+        t = np.arange(steps) * dt
+        if self._period is None:
+            self._table = np.interp(t, self._times, self._values)
+        else:
+            self._table = np.interp(t, self._times, self._values, period=self._period)
+        self._changed = np.empty(steps, dtype=bool)
+        self._changed[1:] = self._table[1:] != self._table[:-1]
+        # the first step of the next period follows the last step of the previous one
+        self._changed[0] = self._periodic and self._table[0] != self._table[-1]
+        self._steps = steps
+
+    def value(self, iteration: int) -> float:
+        """
+        :param iteration: iteration of the simulation
+        :return: value of the schedule at the iteration
+        """
+        if self._periodic:
+            return self._table[iteration % self._steps]
+        return self._table[min(iteration, self._steps - 1)]
+
+    def changed(self, iteration: int) -> bool:
+        """
+        :param iteration: iteration of the simulation
+        :return: whether the value differs from the one of the previous iteration
+        """
+        if self._periodic:
+            return self._changed[iteration % self._steps]
+        return iteration < self._steps and self._changed[iteration]
@@ -1,89 +1,471 @@
+import json
+import os
 from argparse import Namespace
+from concurrent.futures import ThreadPoolExecutor
 
-import matplotlib.pyplot as plt
-from matplotlib import cm, colors
+import numpy as np
 
 from heat_transfer.flow_object import FlowObject
+from heat_transfer.network import FlowNetwork
+from heat_transfer.observer import Observer
+from heat_transfer.parameters import copy_parameters, parameters_equal
 from heat_transfer.pump import Pump
+from heat_transfer.schedule import Schedule
+from heat_transfer.state import LoopState
 
 
 class Simulation(object):
     """
     Class to control the heat transfer simulation.
+    Simulation itself is headless, visualization and other output are provided by attached observers.
+    With the `coupled` setup parameter set, all objects are advanced together by a single implicit solve of the whole
+    loop instead of one after another with inlet temperatures from the previous step.
+    Objects created with the same number of ensemble `members` are simulated as an ensemble: inlet and outlet
+    temperatures, flow rates and setup parameters like T_env are then arrays of shape (members,).
+    Objects that are not connected yet are connected into a single loop in the order of the list. Networks with several
+    pumps, splitters and mixers are connected with `attach` before the simulation is created; with the `threads` setup
+    parameter greater than one, independent branches of the network are advanced concurrently on a thread pool.
+    Objects created with a time step `dt` that is a fraction of the simulation time step are sub-cycled: they take
+    several short steps per simulation step with the inlet temperature interpolated linearly between the values of the
+    previous and the current step, so only fast components pay for short time steps.
+    With the `lumped_tolerance` setup parameter, pipes whose outlet temperature as a transport delay deviates from the
+    discretized pipe by less than the given fraction of an inlet temperature step are replaced by the reduced-order
+    model, see `Pipe.lump`. The bound only holds for constant flow rates and surrounding temperatures, so pipes are not
+    lumped when the pumps have controllers or schedules are attached.
+    Temperatures of all objects are kept in a single contiguous buffer owned by the simulation, see LoopState.
+    Discretized objects account their energy fluxes on every time step, see EnergyBalance. With the `energy_balance`
+    setup parameter the simulation also checks the global balance of every step: the change of the energy stored in all
+    objects minus the heat they have exchanged with the surroundings, which is the energy created by the numerical
+    schemes and by the lag between the objects. In a closed network the lag does not accumulate, the sum of the
+    residuals stays bounded by the energy carried by the flow in a single step, and with the `coupled` time stepping the
+    residual is at the rounding error.
     """
 
     def __init__(self, objects: list[FlowObject], **setup):
-        self.pump = None
-        # setup visualization
-        # since Pump is a point object and there is no flow through it, there is nothing to be visualized
-        count = 0
-        for i, obj in enumerate(objects):
-            if isinstance(obj, Pump):
-                continue
-            count += 1
-        fig, axs = plt.subplots(count, 1, layout='constrained', figsize=(10, 8))
-        v_max = max(setup["T_env"], setup["temp_init"], setup["steady_temperature"]) + 20
-        v_min = min(setup["T_env"], setup["temp_init"], setup["steady_temperature"]) - 20
-
-        fig.colorbar(cm.ScalarMappable(norm=colors.Normalize(v_min, v_max), cmap=cm.get_cmap("plasma")), ax=axs[0])
-        plt.xlim(100)
-        count = 0
-        for i, obj in enumerate(objects):
-            if not isinstance(obj, Pump):
-                obj._ax = axs[count]
-                obj._ax.v_min = v_min
-                obj._ax.v_max = v_max
-                count += 1
-
-        # find pump object
-        for i, obj in enumerate(objects):
-            if isinstance(obj, Pump) and self.pump is None:
-                self.pump = obj
-            elif isinstance(obj, Pump) and self.pump is not None:
-                raise RuntimeError("Only single pump allowed.")
-
-        # connect all objects together
-        current = objects[0]
-        for i, obj in enumerate(objects[1:]):
-            # attach the outlet port of the current object into the inlet port of the next object in list
-            current.attach(obj)
-            current = obj
-        if self.pump is None:
-            raise RuntimeError("No pump attached.")
-        current.attach(objects[0])
-        self._root = objects[0]
+        self._observers = []
+        self._iteration = 0
+        self._stop = False
+        self._pool = None
+        self._schedules = []
+
+        if all(not obj.outlets for obj in objects):
+            # connect all objects together
+            current = objects[0]
+            for i, obj in enumerate(objects[1:]):
+                # attach the outlet port of the current object into the inlet port of the next object in list
+                current.attach(obj)
+                current = obj
+            current.attach(objects[0])
+        self._network = FlowNetwork(objects)
+        self.pump = next(obj for obj in objects if isinstance(obj, Pump))
         self._objects = objects
         self._setup = Namespace(**setup)
+        self._substeps = self._find_substeps()
+        # inlet temperatures of the sub-cycled objects at the previous step, views of the state buffer
+        self._previous_inlets = {}
+        self._pumps = [obj for obj in objects if isinstance(obj, Pump)]
+        # flow rates of the pumps the flow rates of the other objects have been propagated from
+        self._pump_rates = None
+        self._scalar_rates = False
+        self._coupled = None
+        if getattr(self._setup, "coupled", False):
+            if self._network.loop is None:
+                raise RuntimeError("Coupled time stepping supports only a single loop.")
+            if any(substeps > 1 for substeps in self._substeps.values()):
+                raise RuntimeError("Coupled time stepping does not support sub-cycling.")
+            # the sparse solver is only imported for the coupled simulations
+            from heat_transfer.coupled_system import CoupledSystem
+            self._coupled = CoupledSystem(self._network.loop)
         # update flow rate in all objects
-        obj = self.pump.outlet
-        while not isinstance(obj, Pump) and obj.outlet is not None:
-            obj.update()
-            obj = obj.outlet
+        for obj in self._network.schedule:
+            if not isinstance(obj, Pump):
+                obj.update()
+        # lumped pipes with the bounds of their deviation
+        self._lumped = []
+        tolerance = getattr(self._setup, "lumped_tolerance", None)
+        if tolerance is not None and self._coupled is None and all(pump.controller is None for pump in self._pumps):
+            for obj in objects:
+                # objects that can be replaced by the reduced-order model report the bound of its deviation
+                if hasattr(obj, "lumped_error") and obj.advection != "lumped" and obj.members is None:
+                    error = obj.lumped_error(self._setup)
+                    if error <= tolerance:
+                        obj.lump()
+                        self._lumped.append((obj, error))
+        self._state = LoopState(objects, self._network.schedule)
+        # pass the temperatures along the flow by the gathers of the state buffer when it supports them, the walk over
+        # the objects gives the same results and is used by the profiler to time the update of every object
+        self.propagate_ports = True
+        self._energy_balance = getattr(self._setup, "energy_balance", False)
+        # stored energy and the heat exchanged by all objects after the last step, for the global balance
+        self._stored_energy = None
+        self._exchanged_energy = None
+        self._energy_residual = None
+        self._start_energy_accounting()
+
+    def _find_substeps(self):
+        """
+        :return: number of steps of every object per simulation step, by the id of the object
+        """
+        substeps = {}
+        for obj in self._objects:
+            dt = getattr(obj, "dt", None)
+            if dt is None or not hasattr(self._setup, "dt"):
+                substeps[id(obj)] = 1
+                continue
+            ratio = self._setup.dt / dt
+            count = round(ratio)
+            if count < 1 or abs(ratio - count) > 1e-9 * ratio:
+                raise ValueError(f"Time step of {type(obj).__name__} should be the simulation time step divided by an "
+                                 f"integer, got {dt} and {self._setup.dt}.")
+            substeps[id(obj)] = count
+        return substeps
+
+    @property
+    def objects(self):
+        return self._objects
+
+    @property
+    def setup(self):
+        return self._setup
+
+    @property
+    def iteration(self):
+        return self._iteration
+
+    @property
+    def network(self):
+        return self._network
+
+    @property
+    def lumped(self):
+        """
+        :return: pipes replaced by the lumped model and the bounds of the deviation of their outlet temperature, as a
+        fraction of an inlet temperature step
+        """
+        return self._lumped
+
+    @property
+    def state(self):
+        """
+        :return: contiguous state of all objects
+        """
+        return self._state
+
+    @property
+    def energy_residual(self):
+        """
+        :return: energy created during the last time step, see the `energy_balance` setup parameter, None if the
+        global balance is not checked
+        """
+        return self._energy_residual
+
+    @property
+    def observers(self):
+        return self._observers
+
+    def add_observer(self, observer: Observer):
+        """
+        Attach an observer that will be notified on every iteration.
+        :param observer: observer to attach
+        """
+        self._observers.append(observer)
+
+    def add_schedule(self, target, attribute: str, schedule: Schedule):
+        """
+        Set the attribute of the target from the schedule before every iteration. The schedule is tabulated when the
+        simulation starts and the attribute is only assigned when its value changes.
+        :param target: simulated object or the simulation setup
+        :param attribute: name of the attribute, e.g. "T_env" of the setup or "flow_rate" of a pump
+        :param schedule: values of the attribute in time
+        """
+        self._schedules.append((target, attribute, schedule))
+        self._unlump()
+
+    def _unlump(self):
+        """
+        Return the pipes lumped by the simulation to their discretized schemes, the bounds of their deviation do not
+        hold when the flow rates or the surrounding temperatures change in time.
+        """
+        for obj, _ in self._lumped:
+            obj.unlump()
+        self._lumped = []
+
+    def stop(self):
+        """
+        Request the simulation to stop after the current iteration.
+        """
+        self._stop = True
 
     def update(self, iter: int):
         """
         Iterate over the objects and update the heat transfer state (we need to match outlet an inlet temperatures along the fluid flow).
+        When the state buffer supports it, the temperatures are gathered along the flow with precomputed indices and
+        the flow rates are only passed along when the flow rates of the pumps change. Controllers of the pumps set
+        their flow rates first, from the temperatures of the previous step.
         """
-        obj = self.pump.outlet
-        while not isinstance(obj, Pump) and obj.outlet is not None:
+        dt = self._setup.dt
+        for pump in self._pumps:
+            pump.control(iter * dt, dt)
+        if self._state.propagates and self.propagate_ports:
+            self._update_flow_rates()
+            self._state.propagate()
+            return
+        # flow rates are passed along below, the pump flow rates have to be compared again after the walk
+        self._pump_rates = None
+        self._network.update_flows()
+        for obj in self._network.schedule:
             obj.update()
-            if iter % 2 == 0:
-                obj.print()
-            obj = obj.outlet
-            plt.pause(0.1)
-        self.pump.update()
-
-    def simulate(self):
-        """
-        Simulate the heat transfer for the given number of time steps.
-        """
-        for i in range(self._setup.t_max):
-            if i % 20 == 0:
-                print(f"Iteration {i} out of {self._setup.t_max}")
-            self.update(i)
-            self._root.time_step(self._setup)
-            obj = self._root.outlet
-            while obj is not self._root:
-                obj.time_step(self._setup)
+
+    def _update_flow_rates(self):
+        rates = [pump.flow_rate for pump in self._pumps]
+        if self._pump_rates is not None:
+            # scalar flow rates are compared directly, that is much faster than comparing arrays
+            if self._scalar_rates and rates == self._pump_rates:
+                return
+            if parameters_equal(rates, self._pump_rates):
+                return
+        self._network.update_flows()
+        for obj in self._network.schedule:
+            if not isinstance(obj, Pump):
+                obj.flow_rate = obj.inlet.outlet_flow_rate(obj)
+        self._scalar_rates = all(isinstance(rate, (int, float)) for rate in rates)
+        self._pump_rates = rates if self._scalar_rates else copy_parameters(rates)
+
+    def _start_energy_accounting(self):
+        """
+        Start the energy balances of all objects from their current stored energy.
+        """
+        objects = [obj for obj in self._objects if hasattr(obj, "energy")]
+        for obj in objects:
+            obj.energy.reset(obj.thermal_energy(self._setup))
+        if self._energy_balance:
+            self._stored_energy = sum(obj.energy.stored for obj in objects)
+            self._exchanged_energy = 0.0
+            self._energy_residual = 0.0
+
+    def _check_energy_balance(self):
+        objects = [obj for obj in self._objects if hasattr(obj, "energy")]
+        stored = sum(obj.thermal_energy(self._setup) for obj in objects)
+        exchanged = sum(obj.energy.exchange for obj in objects)
+        self._energy_residual = stored - self._stored_energy - (exchanged - self._exchanged_energy)
+        self._stored_energy = stored
+        self._exchanged_energy = exchanged
+
+    def time_step(self):
+        """
+        Advance all objects by one time step.
+        """
+        self._advance()
+        if self._energy_balance:
+            self._check_energy_balance()
+
+    def _advance(self):
+        if self._coupled is not None:
+            self._coupled.time_step(self._setup)
+            return
+        branches = self._network.branches
+        if getattr(self._setup, "threads", 1) > 1 and len(branches) > 1:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(min(self._setup.threads, len(branches)))
+            # objects only read their own inlet temperature, so the branches do not depend on each other
+            for _ in self._pool.map(self._branch_time_step, branches):
+                pass
+            return
+        for obj in self._objects:
+            self._object_time_step(obj)
+
+    def _branch_time_step(self, branch: list[FlowObject]):
+        for obj in branch:
+            self._object_time_step(obj)
+
+    def _object_time_step(self, obj: FlowObject):
+        """
+        Advance the object by one simulation step, sub-cycled objects take several short steps.
+        """
+        substeps = self._substeps[id(obj)]
+        if substeps == 1:
+            obj.time_step(self._setup)
+            return
+        T_inlet = obj.T_inlet
+        # without the previous step, e.g. on the first step, the inlet temperature is held constant
+        previous = self._previous_inlets.get(id(obj), T_inlet)
+        for j in range(1, substeps + 1):
+            obj.T_inlet = previous + (T_inlet - previous) * (j / substeps)
+            obj.time_step(self._setup)
+        obj.T_inlet = T_inlet
+        previous = self._state.previous_inlet(obj)
+        previous[...] = T_inlet
+        self._previous_inlets[id(obj)] = previous
+
+    def solve_steady_state(self, tolerance: float = 1e-9, max_iterations: int = 20):
+        """
+        Find the steady state of the circulation loop directly, without time marching.
+        For a given temperature at the pump outlet every object along the loop is set into its steady state, which
+        gives the temperature returned to the pump. The loop is closed by the secant iteration on the pump temperature.
+        All the objects are linear in the inlet temperature, so the iteration converges after a single secant step.
+        :param tolerance: tolerance of the loop closure temperature
+        :param max_iterations: maximal number of secant iterations
+        :return: steady state temperature at the pump outlet
+        """
+        if self._network.loop is None:
+            raise RuntimeError("Steady state solver supports only a single loop.")
+
+        def residual(temperature):
+            T = temperature
+            obj = self.pump.outlet
+            while obj is not self.pump:
+                T = obj.steady_state(self._setup, T)
                 obj = obj.outlet
-        plt.show()
+            return T - temperature
+
+        x0 = np.array(self.pump.T_outlet, dtype=float)
+        try:
+            x1 = x0 + 1.0
+            r0 = residual(x0)
+            r1 = residual(x1)
+            for i in range(max_iterations):
+                if np.any(r1 == r0):
+                    raise RuntimeError("Loop has no unique steady state, there is no heat exchange with the "
+                                       "environment.")
+                x0, x1, r0 = x1, x1 - r1 * (x1 - x0) / (r1 - r0), r1
+                r1 = residual(x1)
+                if np.all(np.abs(r1) <= tolerance * np.maximum(np.abs(x1), 1.0)):
+                    self.pump.steady_state(self._setup, x1 + r1)
+                    return self.pump.T_outlet
+            raise RuntimeError("Steady state solver did not converge.")
+        finally:
+            # objects have replaced their temperatures, move them back into the state buffer
+            self._state.bind()
+            self._start_energy_accounting()
+
+    def snapshot(self) -> dict:
+        """
+        Copy the state of all objects and the current iteration in memory, like `save_checkpoint` without the file.
+        :return: snapshot to pass to `restore`
+        """
+        data = {"iteration": np.asarray(self._iteration)}
+        if self._energy_balance:
+            data["energy_residual"] = np.asarray(self._energy_residual)
+        for i, obj in enumerate(self._objects):
+            for name, value in obj.get_state().items():
+                # copy, the states of the objects are views of the arrays that keep changing
+                data[f"{i}/{name}"] = np.array(value)
+            if id(obj) in self._previous_inlets:
+                data[f"inlet/{i}"] = np.array(self._previous_inlets[id(obj)])
+        return data
+
+    def restore(self, snapshot):
+        """
+        Return to the state of the snapshot or of the checkpoint taken from a simulation with the same objects and
+        setup: temperatures, flow rates, energy balances, histories of the lumped pipes and the iteration.
+        :param snapshot: dictionary returned by `snapshot` or an opened checkpoint file
+        """
+        names = list(snapshot.keys())
+        self._iteration = int(snapshot["iteration"])
+        for i, obj in enumerate(self._objects):
+            prefix = f"{i}/"
+            # zero-dimensional arrays are restored as scalars
+            obj.set_state({name[len(prefix):]: snapshot[name][()] for name in names if name.startswith(prefix)})
+            if f"inlet/{i}" in names:
+                previous = self._state.previous_inlet(obj)
+                previous[...] = snapshot[f"inlet/{i}"]
+                self._previous_inlets[id(obj)] = previous
+        self._state.bind()
+        # flow rates are propagated again from the restored flow rates of the pumps
+        self._pump_rates = None
+        if self._energy_balance:
+            # energy balances of the objects are restored, the global balance continues from the restored state
+            objects = [obj for obj in self._objects if hasattr(obj, "energy")]
+            self._stored_energy = sum(obj.thermal_energy(self._setup) for obj in objects)
+            self._exchanged_energy = sum(obj.energy.exchange for obj in objects)
+            self._energy_residual = float(snapshot["energy_residual"]) if "energy_residual" in names else 0.0
+
+    def save_checkpoint(self, path: str):
+        """
+        Write the state of all objects, the current iteration and the simulation setup into a binary checkpoint file.
+        The file is written under a temporary name and then renamed, so an interrupted write never damages the
+        previous checkpoint.
+        :param path: path to the checkpoint file
+        """
+        data = self.snapshot()
+        setup = {}
+        for name, value in vars(self._setup).items():
+            if isinstance(value, np.ndarray):
+                data[f"setup/{name}"] = value
+            else:
+                setup[name] = value
+        data["setup"] = np.asarray(json.dumps(setup))
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, **data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    def load_checkpoint(self, path: str):
+        """
+        Restore the state of all objects and the current iteration from the checkpoint file. Simulation has to be
+        created with the same objects and setup as the one that has written the checkpoint.
+        :param path: path to the checkpoint file
+        """
+        with np.load(path) as data:
+            self.restore(data)
+
+    @staticmethod
+    def read_setup(path: str) -> dict:
+        """
+        Read simulation setup stored in the checkpoint file.
+        :param path: path to the checkpoint file
+        :return: simulation setup
+        """
+        with np.load(path) as data:
+            setup = json.loads(str(data["setup"]))
+            for name in data.files:
+                if name.startswith("setup/"):
+                    setup[name[len("setup/"):]] = data[name]
+        return setup
+
+    def simulate(self, verbose: bool = True, checkpoint: str = None, checkpoint_every: int = 1000):
+        """
+        Simulate the heat transfer for the given number of time steps, starting from the current iteration.
+        Observers can end the simulation earlier with `stop`.
+        :param verbose: print the simulation progress
+        :param checkpoint: path to the checkpoint file, the checkpoint is overwritten every `checkpoint_every` steps
+        :param checkpoint_every: number of steps between the checkpoints
+        """
+        self._stop = False
+        if any(pump.controller is not None for pump in self._pumps):
+            # controllers may be assigned after the simulation has been created
+            self._unlump()
+        for target, attribute, _ in self._schedules:
+            if attribute == "flow_rate" and getattr(target, "controller", None) is not None:
+                raise ValueError("Flow rate of a pump with a controller can not be scheduled, the controller would "
+                                 "override the schedule.")
+        for _, _, schedule in self._schedules:
+            schedule.prepare(self._setup.dt, self._setup.t_max)
+        # values of the first iteration are always assigned, the simulation may continue from a checkpoint
+        for target, attribute, schedule in self._schedules:
+            setattr(target, attribute, schedule.value(self._iteration))
+        for observer in self._observers:
+            observer.start(self)
+        # observers are finished also when a step fails, the profiler restores the instrumented methods
+        try:
+            while self._iteration < self._setup.t_max and not self._stop:
+                i = self._iteration
+                if verbose and i % 20 == 0:
+                    print(f"Iteration {i} out of {self._setup.t_max}")
+                for target, attribute, schedule in self._schedules:
+                    if schedule.changed(i):
+                        setattr(target, attribute, schedule.value(i))
+                self.update(i)
+                for observer in self._observers:
+                    observer.notify(self, i)
+                self.time_step()
+                self._iteration += 1
+                if checkpoint is not None and self._iteration % checkpoint_every == 0:
+                    self.save_checkpoint(checkpoint)
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+            for observer in self._observers:
+                observer.finish(self)
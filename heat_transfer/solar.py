@@ -18,3 +18,11 @@ class Solar(Pipe):
         self.title = "Solar panel"
         self._steady_temperature = steady_temperature
         self._heat_transfer = heat_transfer
+
+    @property
+    def steady_temperature(self):
+        return self._steady_temperature
+
+    @steady_temperature.setter
+    def steady_temperature(self, temperature):
+        self._steady_temperature = temperature
@@ -0,0 +1,136 @@
+import numpy as np
+
+from heat_transfer.manifold import Splitter
+from heat_transfer.pump import Pump
+
+
+class LoopState(object):
+    """
+    Contiguous state of all objects of the simulation. A single preallocated buffer holds one after another
+      - temperatures of the cells of all discretized objects,
+      - outlet temperatures of the pumps from the previous update,
+      - outlet and inlet temperatures of all objects,
+      - inlet temperatures of the objects at the previous step, used by sub-cycling,
+    and the objects keep zero-copy views into it.
+    When the outlet of every object is either its last cell or its inlet (pipes, tanks, pumps and splitters), the update
+    of the inlet and outlet temperatures along the flow is three gathers with precomputed index arrays instead of a walk
+    over the objects. As in the walk, objects downstream of a pump get the pump outlet temperature of the previous
+    update, unless the pump comes earlier in the update schedule. Other networks keep the temperatures in the buffer
+    and are updated by the objects themselves.
+    """
+
+    def __init__(self, objects: list, schedule: list):
+        """
+        :param objects: all objects of the simulation
+        :param schedule: objects in the order of the update, see FlowNetwork
+        """
+        self._objects = objects
+        self._fields = [obj for obj in objects if hasattr(obj, "bind_temperature")]
+        members = {obj.members for obj in objects if getattr(obj, "members", None) is not None}
+        if len(members) > 1:
+            raise RuntimeError("All objects of the ensemble should have the same number of members.")
+        self._port_shape = (members.pop(),) if members else ()
+        width = int(np.prod(self._port_shape, dtype=int))
+        sizes = [obj.temperature.size for obj in self._fields]
+        pumps = [i for i, obj in enumerate(objects) if isinstance(obj, Pump)]
+        self._propagates = all(hasattr(obj, "outlet_cells") or isinstance(obj, (Pump, Splitter)) for obj in objects)
+        field_size = sum(sizes)
+        lagged_size = len(pumps) * width if self._propagates else 0
+        port_size = len(objects) * width
+        self._data = np.zeros(field_size + lagged_size + 3 * port_size)
+        self._temperatures = self._data[:field_size]
+        offsets = np.cumsum([0] + sizes)
+        self._field_views = [self._temperatures[offsets[k]:offsets[k + 1]].reshape(obj.temperature.shape)
+                             for k, obj in enumerate(self._fields)]
+        start = field_size + lagged_size
+        self._lagged = self._data[field_size:start]
+        self._outlets = self._data[start:start + port_size]
+        self._inlets = self._data[start + port_size:start + 2 * port_size]
+        self._previous_inlets = self._data[start + 2 * port_size:]
+        # the gathers read from the temperatures followed by the lagged outlets, or also followed by the outlets
+        self._sources = self._data[:start]
+        self._ports = self._data[:start + port_size]
+
+        def port_views(section):
+            return [section[i * width:(i + 1) * width].reshape(self._port_shape) for i in range(len(objects))]
+
+        self._outlet_views = port_views(self._outlets)
+        self._inlet_views = port_views(self._inlets)
+        self._previous_views = {id(obj): view for obj, view in zip(objects, port_views(self._previous_inlets))}
+        if self._propagates:
+            self._index_arrays(schedule, offsets, pumps, width, start)
+        self.bind()
+
+    def _index_arrays(self, schedule: list, offsets, pumps: list[int], width: int, start: int):
+        """
+        Follow the update schedule and resolve the outlet of every object to a cell or to a lagged pump outlet, and its
+        inlet to the outlet of the upstream object.
+        """
+        index = {id(obj): i for i, obj in enumerate(self._objects)}
+        fields = {id(obj): k for k, obj in enumerate(self._fields)}
+        field_size = len(self._temperatures)
+        lagged = {i: field_size + p * width + np.arange(width) for p, i in enumerate(pumps)}
+        outlet_sources = [None] * len(self._objects)
+        inlet_sources = [None] * len(self._objects)
+        for obj in schedule:
+            i = index[id(obj)]
+            j = index[id(obj.inlet)]
+            if outlet_sources[j] is None:
+                # pump that has not been updated yet, its outlet temperature is the one of the previous update
+                inlet_sources[i] = lagged[j]
+            else:
+                inlet_sources[i] = start + j * width + np.arange(width)
+            if hasattr(obj, "outlet_cells"):
+                outlet_sources[i] = offsets[fields[id(obj)]] + np.broadcast_to(obj.outlet_cells, (width,))
+            else:
+                outlet_sources[i] = lagged[j] if outlet_sources[j] is None else outlet_sources[j]
+        self._pump_slots = np.concatenate([i * width + np.arange(width) for i in pumps]).astype(np.intp)
+        self._outlet_index = np.concatenate(outlet_sources).astype(np.intp)
+        self._inlet_index = np.concatenate(inlet_sources).astype(np.intp)
+
+    @property
+    def data(self):
+        return self._data
+
+    @property
+    def temperatures(self):
+        """
+        :return: temperatures of all cells of all discretized objects, one after another
+        """
+        return self._temperatures
+
+    @property
+    def propagates(self):
+        """
+        :return: whether the inlet and outlet temperatures are updated by `propagate`
+        """
+        return self._propagates
+
+    def previous_inlet(self, obj):
+        """
+        :param obj: simulated object
+        :return: view of the inlet temperature of the object at the previous step
+        """
+        return self._previous_views[id(obj)]
+
+    def bind(self):
+        """
+        Copy the current state of the objects into the buffer and give the objects views into it. Has to be called
+        after the objects have replaced their state, e.g. when restored from a checkpoint.
+        """
+        for obj, view in zip(self._fields, self._field_views):
+            obj.bind_temperature(view)
+        if not self._propagates:
+            return
+        for obj, inlet, outlet in zip(self._objects, self._inlet_views, self._outlet_views):
+            obj.bind_ports(inlet, outlet)
+        self._outlets.take(self._pump_slots, out=self._lagged, mode="clip")
+
+    def propagate(self):
+        """
+        Update inlet and outlet temperatures of all objects along the flow.
+        """
+        # the indices are valid by construction, without the bounds check take writes into the output directly
+        self._outlets.take(self._pump_slots, out=self._lagged, mode="clip")
+        self._sources.take(self._outlet_index, out=self._outlets, mode="clip")
+        self._ports.take(self._inlet_index, out=self._inlets, mode="clip")
@@ -0,0 +1,221 @@
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.linalg import splu
+
+from heat_transfer.dynamic_object import DynamicObject
+from heat_transfer.energy import EnergyBalance
+from heat_transfer.field_object import FieldObject
+from heat_transfer.flow_object import FlowObject
+
+
+class StratifiedTank(FlowObject, DynamicObject, FieldObject):
+    """
+    Describes an axisymmetric tank discretized into `nx` rings across and `ny` layers along the tank. The liquid enters
+    through the port in the center of the top of the tank and leaves through the port in the center of the bottom.
+    Near the ports the flow is concentrated under the port and it spreads over the whole cross-section within
+    `jet_length` from them; the radial flow between the rings follows from the mass conservation in every cell.
+    Heat is advected with the implicit upwind finite volume scheme and conducted with the thermal `diffusivity`, so
+    the thermocline between the hot and the cold liquid is resolved instead of being smeared by the plug flow. There is
+    no heat loss through the walls.
+    The temperature has shape (nx, ny): rings from the axis to the wall and layers from the inlet to the outlet.
+    """
+
+    def time_step(self, setup):
+        """
+        solve next step of the advection-diffusion equation
+          ∂T/∂t + ∇·(uT) = D ∇²T
+        with the velocity field u of the jet from the inlet port. The sparse matrix of the implicit scheme is factorized
+        once and the factorization is reused until flow rate, time step or fluid density change.
+
+        :param setup: environment setup
+        """
+        if self._T_inlet is None:
+            raise RuntimeError("Tank is not connected to a source.")
+        self._update_system(setup)
+        self._rhs[:] = self._T.ravel()
+        self._rhs *= self._storage
+        self._rhs += self._inflow * self._T_inlet
+        self._T[:] = self._lu.solve(self._rhs).reshape(self._T.shape)
+        self.account_energy(setup)
+
+    def account_energy(self, setup):
+        """
+        Add the energy fluxes of the last time step to the energy balance. Fluxes between the cells cancel in the sum
+        over the tank, so the liquid only carries the energy in through the inlet port and out through the outlet port.
+        :param setup: environment setup
+        """
+        flow = setup.Cp * self.flow_rate * self._dt
+        self._energy.add(flow * self._T_inlet, flow * (self._profile[-1] @ self._T[:, -1]), 0.0)
+
+    def _update_system(self, setup):
+        """
+        Assemble and factorize the implicit scheme matrix if any of the parameters that define it have changed since
+        the last step.
+        :param setup: environment setup
+        """
+        key = (self.flow_rate, self._dt, setup.rho)
+        if key == self._key:
+            return
+        nx, ny = self._nx, self._ny
+        cell = np.arange(nx * ny).reshape(nx, ny)
+        # volumetric flow rates through the faces between the layers and between the rings
+        axial = self.flow_rate / setup.rho * self._profile
+        radial = np.zeros((ny, nx + 1))
+        radial[:, 1:nx] = np.cumsum(axial[:-1] - axial[1:], axis=1)[:, :-1]
+        rows = [cell.ravel()]
+        columns = [cell.ravel()]
+        values = [np.repeat(self._volume / self._dt, ny)]
+
+        def connect(donor, receiver, q):
+            # upwind flux q from the donor cell into the receiver cell
+            rows.extend([donor, receiver])
+            columns.extend([donor, donor])
+            values.extend([q, -q])
+
+        def conduct(first, second, k):
+            rows.extend([first, second, first, second])
+            columns.extend([first, second, second, first])
+            values.extend([k, k, -k, -k])
+
+        connect(cell[:, :-1].ravel(), cell[:, 1:].ravel(), axial[1:-1].T.ravel())
+        outward = radial[:, 1:nx].T >= 0
+        q = np.abs(radial[:, 1:nx].T)
+        connect(np.where(outward, cell[:-1], cell[1:]).ravel(), np.where(outward, cell[1:], cell[:-1]).ravel(),
+                q.ravel())
+        # liquid leaving through the outlet port
+        rows.append(cell[:, -1])
+        columns.append(cell[:, -1])
+        values.append(axial[-1])
+        if self._diffusivity > 0:
+            conduct(cell[:, :-1].ravel(), cell[:, 1:].ravel(),
+                    np.repeat(self._diffusivity * self._area / self._dy, ny - 1))
+            centers = 0.5 * (self._faces[1:] + self._faces[:-1])
+            k = self._diffusivity * 2 * np.pi * self._faces[1:nx] * self._dy / np.diff(centers)
+            conduct(cell[:-1].ravel(), cell[1:].ravel(), np.repeat(k, ny))
+        matrix = coo_matrix((np.concatenate(values), (np.concatenate(rows), np.concatenate(columns))),
+                            shape=(nx * ny, nx * ny))
+        # the conduction makes the sparsity pattern symmetric, so the ordering of A^T + A keeps the fill-in low
+        self._lu = splu(matrix.tocsc(), permc_spec="MMD_AT_PLUS_A")
+        self._storage = np.repeat(self._volume / self._dt, ny)
+        self._inflow = np.zeros(nx * ny)
+        self._inflow[cell[:, 0]] = axial[0]
+        self._key = key
+
+    def steady_state(self, setup, T_inlet):
+        """
+        Set the tank into the steady state, without heat loss the whole tank has the inlet temperature.
+        :param setup: environment setup
+        :param T_inlet: inlet temperature
+        :return: outlet temperature
+        """
+        self._T[:] = T_inlet
+        self._T_inlet = T_inlet
+        self._T_outlet = float(T_inlet)
+        return self._T_outlet
+
+    def __init__(self, tank_radius, tank_length, nx, ny, port_radius=None, jet_length=None, diffusivity=1.4e-7,
+                 members: int = None, advection: str = "upwind", **params):
+        """
+        :param tank_radius: radius of the tank
+        :param tank_length: height of the tank
+        :param nx: number of rings across the tank
+        :param ny: number of layers along the tank
+        :param port_radius: radius of the inlet and outlet ports
+        :param jet_length: distance from the port at which the flow spreads over the cross-section, tank radius by
+        default
+        :param diffusivity: thermal diffusivity of the liquid, including the turbulent mixing
+        :param members: ensembles are not supported
+        :param advection: only the "upwind" scheme is supported
+        """
+        if members is not None:
+            raise RuntimeError("Stratified tank does not support ensembles.")
+        if advection != "upwind":
+            raise RuntimeError("Stratified tank supports only the upwind advection.")
+        FlowObject.__init__(self, temp_init=params["temp_init"])
+        DynamicObject.__init__(self, dt=params["dt"], t_max=params["t_max"])
+        self.title = "Storage tank"
+        self._tank_radius = tank_radius
+        self._tank_length = tank_length
+        self._nx = nx
+        self._ny = ny
+        self._dy = tank_length / ny
+        self._diffusivity = diffusivity
+        self._faces = np.linspace(0.0, tank_radius, nx + 1)
+        self._area = np.pi * np.diff(self._faces ** 2)
+        self._volume = self._area * self._dy
+        self._profile = self._flow_profile(tank_radius if port_radius is None else port_radius,
+                                           tank_radius if jet_length is None else jet_length)
+        self._T = np.full((nx, ny), float(self._T_init))
+        self._T_outlet = float(self._T_init)
+        # cached factorization of the implicit scheme matrix
+        self._key = None
+        self._lu = None
+        self._rhs = np.empty(nx * ny)
+        self._ax = None
+        self._energy = EnergyBalance()
+
+    def _flow_profile(self, port_radius: float, jet_length: float):
+        """
+        :return: fractions of the flow rate through every ring at the faces between the layers, shape (ny + 1, nx)
+        """
+        port = np.pi * np.diff(np.minimum(self._faces, port_radius) ** 2)
+        port /= port.sum()
+        uniform = self._area / self._area.sum()
+        y = np.linspace(0.0, self._tank_length, self._ny + 1)[:, None]
+        jet = np.minimum(np.exp(-y / jet_length) + np.exp((y - self._tank_length) / jet_length), 1.0)
+        profile = jet * port + (1.0 - jet) * uniform
+        return profile / profile.sum(axis=1, keepdims=True)
+
+    @property
+    def tank_radius(self):
+        return self._tank_radius
+
+    @property
+    def tank_length(self):
+        return self._tank_length
+
+    @property
+    def cell_volume(self):
+        """
+        :return: volume of the cells of every ring, shape (nx, 1)
+        """
+        return self._volume[:, None]
+
+    @property
+    def advection(self):
+        return "upwind"
+
+    @property
+    def energy(self):
+        return self._energy
+
+    @property
+    def members(self):
+        return None
+
+    def thermal_energy(self, setup):
+        """
+        :param setup: environment setup
+        :return: thermal energy of the liquid inside the tank, counted from zero temperature
+        """
+        return setup.rho * setup.Cp * np.sum(self.cell_volume * self._T)
+
+    def get_state(self) -> dict:
+        return super().get_state() | {"T": self._T} | self._energy.get_state()
+
+    def set_state(self, state: dict):
+        super().set_state(state)
+        self._T[:] = state["T"]
+        self._energy.set_state(state)
+
+    def update(self):
+        super().update()
+        # liquid leaving the tank is mixed in the outlet port
+        self._T_outlet = float(self._profile[-1] @ self._T[:, -1])
+
+    def print(self):
+        super().print()
+        if self._ax is not None:
+            self._ax.cla()
+            self._ax.title.set_text(self.title)
+            self._ax.imshow(self._T, cmap="plasma", vmin=self._ax.v_min, vmax=self._ax.v_max, aspect="auto")
@@ -1,40 +1,98 @@
 import numpy as np
 
+from heat_transfer.characteristics import SemiLagrangianScheme
 from heat_transfer.dynamic_object import DynamicObject
+from heat_transfer.energy import EnergyBalance
+from heat_transfer.field_object import AxialFieldObject
 from heat_transfer.flow_object import FlowObject
+from heat_transfer.pipe import ADVECTION_SCHEMES
+from heat_transfer.upwind_system import EnsembleUpwindSystem, UpwindSystem
 
 
-class Tank(FlowObject, DynamicObject):
+class Tank(FlowObject, DynamicObject, AxialFieldObject):
     """
     Describes an ideal tank that has uniform flow distribution and no heat loss.
     """
 
     def time_step(self, setup):
+        """
+        solve next step of the advection equation
+          ∂T/∂t = a ∂T/∂y
+        using finite differences implicit upwind scheme, with a = v / ρ π R^2.
+        The matrix is cached and rebuilt only when flow rate, time step or fluid density change.
+        With the "semi_lagrangian" advection the temperature is transported along the characteristics instead, see
+        SemiLagrangianScheme.
+        Energy fluxes of the step are added to the energy balance, see `account_energy`.
+
+        :param setup: environment setup
+        """
         if self._T_inlet is None:
             raise RuntimeError("Tank is not connected to a source.")
-        grad_T = (self._T[:-1] - self._T[1:]) / self._dy
-        v_grad_T = grad_T * self._flow_rate
-        volume = np.pi * self._dy * self._tank_radius ** 2
-        self._dTdt[1:] = (setup.Cp * v_grad_T[:] * self._dy) / (setup.rho * setup.Cp * volume)
-        # Boundary condition
-        self._dTdt[0] = ((self.flow_rate * setup.Cp * (self._T_inlet - self._T[0])) / (setup.rho * setup.Cp * volume))
-        # self._T = self._T + self._dTdt * self._dt
-        T = np.zeros(self._ny + 2)
+        self._update_system(setup)
+        self._system.solve(self._T_inlet, self._T)
+        self.account_energy(setup)
+
+    def account_energy(self, setup):
+        """
+        Add the energy fluxes of the last time step to the energy balance, the tank has no heat loss, so the liquid
+        only carries the energy in and out.
+        :param setup: environment setup
+        """
+        flow = setup.Cp * self.flow_rate * self._dt
+        T_inlet, T_outlet = self._port_temperatures()
+        self._energy.add(flow * T_inlet, flow * T_outlet, 0.0)
+
+    def _update_system(self, setup):
+        """
+        Rebuild the implicit scheme matrix if any of the parameters that define it have changed since the last step.
+        :param setup: environment setup
+        """
+        key = (self.flow_rate, self._dt, setup.rho)
+        if self._system.matches(key):
+            return
         a = self.flow_rate / (setup.rho * np.pi * self._tank_radius ** 2)
-        T[1:-1] = self._T
-        T[0] = self.T_inlet
-        T[-1] = 0
-        A = np.zeros((self._ny + 2, self._ny + 2))
-        A[0, 0] = 1.0
-        for i in range(1, self._ny + 1):
-            A[i, i - 1] = -a * self._dt / (self._dy)
-            A[i, i] = 1.0 + a * self._dt / (self._dy)
-        # A[-2,-1] = -a * dt / (2 * dx)
-        A[-1, -1] = 1.0
-        # print(A)
-        self._T[:] = np.linalg.solve(A, T)[1:-1]
-
-    def __init__(self, tank_radius, tank_length, nx, ny, **params):
+        self._c = a * self._dt / self._dy
+        if self._advection == "semi_lagrangian":
+            self._system.assemble(key, self._c, 0.0)
+        else:
+            self._system.assemble(key, 1.0, 1.0 + self._c, -self._c)
+
+    def implicit_coefficients(self, setup):
+        """
+        Coefficients of the upwind implicit scheme, used by the coupled time stepping of the whole loop.
+        :param setup: environment setup
+        :return: diagonal element of the inlet ghost cell, diagonal and sub-diagonal elements of the inner cells of
+        the implicit scheme matrix, and the constant term of the right-hand side
+        """
+        self._update_system(setup)
+        return 1.0, 1.0 + self._c, -self._c, 0.0
+
+    def steady_state(self, setup, T_inlet):
+        """
+        Set the tank into the steady state, without heat loss the whole tank has the inlet temperature.
+        :param setup: environment setup
+        :param T_inlet: inlet temperature
+        :return: outlet temperature
+        """
+        self._T[:] = np.expand_dims(T_inlet, -1)
+        self._T_inlet = T_inlet
+        self._T_outlet = self._T[..., -1].copy()
+        return self._T_outlet
+
+    def __init__(self, tank_radius, tank_length, nx, ny, members: int = None, advection: str = "upwind", **params):
+        """
+        :param tank_radius: radius of the tank
+        :param tank_length: height of the tank
+        :param nx: number of discretization steps across the tank, not used by the one-dimensional model, see
+        StratifiedTank
+        :param ny: number of discretization steps along the tank
+        :param members: number of ensemble members simulated at once, temperature inside the tank then has shape
+        (members, ny) and parameters that differ between the members are arrays of shape (members,)
+        :param advection: "upwind" implicit scheme or "semi_lagrangian" transport along the characteristics, which
+        keeps the thermocline sharp on coarse grids and at Courant numbers above one
+        """
+        if advection not in ADVECTION_SCHEMES:
+            raise ValueError(f"Unknown advection scheme '{advection}', expected one of {ADVECTION_SCHEMES}.")
         FlowObject.__init__(self, temp_init=params["temp_init"])
         DynamicObject.__init__(self, dt=params["dt"], t_max=params["t_max"])
         self.title = "Storage tank"
@@ -42,8 +100,18 @@ class Tank(FlowObject, DynamicObject):
         self._tank_length = tank_length
         self._ny = ny
         self._dy = tank_length / ny
-        self._T = np.ones(ny) * self._T_init
-        self._dTdt = np.zeros(ny)
+        self._members = members
+        shape = (ny,) if members is None else (members, ny)
+        self._T = np.ones(shape) * np.expand_dims(self._T_init, -1)
+        self._dTdt = np.zeros(shape)
+        self._advection = advection
+        # cached implicit scheme matrix or interpolation stencil
+        if advection == "semi_lagrangian":
+            self._system = SemiLagrangianScheme(ny)
+        else:
+            self._system = UpwindSystem(ny) if members is None else EnsembleUpwindSystem(members, ny)
+        self._c = 0.0  # advection coefficient of the cached matrix
+        self._energy = EnergyBalance()
         self._ax = None
 
     @property
@@ -55,12 +123,40 @@ class Tank(FlowObject, DynamicObject):
         return self._tank_length
 
     @property
-    def temperature(self):
-        return self._T
+    def cell_volume(self):
+        return np.pi * self._dy * self._tank_radius ** 2
+
+    @property
+    def advection(self):
+        return self._advection
+
+    @property
+    def energy(self):
+        return self._energy
+
+    @property
+    def members(self):
+        return self._members
+
+    def thermal_energy(self, setup):
+        """
+        :param setup: environment setup
+        :return: thermal energy of the liquid inside the tank, counted from zero temperature
+        """
+        return setup.rho * setup.Cp * self.cell_volume * np.sum(self._T, axis=-1)
+
+    def get_state(self) -> dict:
+        return super().get_state() | {"T": self._T} | self._energy.get_state()
+
+    def set_state(self, state: dict):
+        super().set_state(state)
+        self._T[:] = state["T"]
+        self._energy.set_state(state)
 
     def update(self):
         super().update()
-        self._T_outlet = self._T[-1]
+        # copy, the temperature array is overwritten in place by the next time step
+        self._T_outlet = self._T[..., -1].copy()
 
     def print(self):
         super().print()
@@ -0,0 +1,164 @@
+import math
+
+import numpy as np
+
+
+class TransportDelay(object):
+    """
+    Reduced-order model of a pipe with plug flow: the liquid keeps the temperature it entered with, only relaxed to
+    T_env with the exact factor exp(-λ t) over its residence time t. Instead of the temperature of every cell the model
+    keeps the history of the inlet: position of the liquid that entered at the end of every step, the step and its
+    temperature, linearly interpolated in between. The history is kept in a ring buffer that only holds the liquid
+    still inside the pipe, so a time step costs a constant amount of work independent of the number of cells, and the
+    temperature of the cells is only reconstructed when it is requested.
+    Positions are measured in cells and times in steps, so the parameters are the same as of SemiLagrangianScheme.
+    """
+
+    def __init__(self, n: int):
+        """
+        :param n: number of cells
+        """
+        self._n = n
+        self._key = None
+        self._courant = 0.0
+        self._decay = 0.0
+        self._T_env = 0.0
+        # inflow position and number of steps since the start
+        self._position = 0.0
+        self._step = 0.0
+        # ring buffer of the inflow history: position, step and temperature of the liquid, plain lists of floats are
+        # faster than arrays for the few values touched per step
+        self._positions = [0.0] * (2 * n + 4)
+        self._steps = [0.0] * (2 * n + 4)
+        self._temperatures = [0.0] * (2 * n + 4)
+        self._start = 0
+        self._count = 0
+
+    @property
+    def key(self):
+        return self._key
+
+    def matches(self, key) -> bool:
+        """
+        Check if the stored parameters are the given ones.
+        :param key: parameters of the model
+        """
+        return key == self._key
+
+    def assemble(self, key, courant: float, decay: float):
+        """
+        Store new parameters, the history stays valid when they change.
+        :param key: parameters of the model
+        :param courant: distance travelled by the liquid during the time step in cells, a dt / dx
+        :param decay: relaxation to the environment temperature during the time step, λ dt
+        """
+        self._courant = float(courant)
+        self._decay = float(decay)
+        self._key = key
+
+    def reset(self, T_inlet: float, T: np.ndarray):
+        """
+        Start the history from the given temperature of the cells, the liquid in every cell is treated as if it has
+        just entered.
+        :param T_inlet: inlet temperature
+        :param T: temperature of the cells
+        """
+        self._start = 0
+        self._count = 0
+        for i in range(self._n - 1, -1, -1):
+            self._append(self._position - i - 0.5, self._step, T[i])
+        self._append(self._position, self._step, T_inlet)
+
+    def _append(self, position: float, step: float, temperature: float):
+        capacity = len(self._positions)
+        if self._count == capacity:
+            # keep the order of the entries in the larger buffer
+            self._positions, self._steps, self._temperatures = (list(row) + [0.0] * capacity
+                                                                for row in self._entries())
+            self._start = 0
+            capacity *= 2
+        i = (self._start + self._count) % capacity
+        self._positions[i] = float(position)
+        self._steps[i] = float(step)
+        self._temperatures[i] = float(temperature)
+        self._count += 1
+
+    def _entries(self):
+        """
+        :return: history entries in the order of the inflow, rows are the position, the step and the temperature
+        """
+        order = (self._start + np.arange(self._count)) % len(self._positions)
+        return np.array([self._positions, self._steps, self._temperatures])[:, order]
+
+    def solve(self, T_inlet: float, T: np.ndarray, T_env: float = 0.0):
+        """
+        Advance the model by one time step and store the temperature of the last cell.
+        :param T_inlet: inlet temperature during the step
+        :param T: temperature of the cells, only the last cell is updated
+        :param T_env: temperature the liquid relaxes to
+        :return: temperature the liquid at the center of the last cell had when it entered
+        """
+        if self._count == 0:
+            # the liquid that is entering now follows the liquid in the first cell
+            self.reset(T[0], T)
+        self._step += 1.0
+        self._T_env = T_env
+        if self._courant > 0:
+            self._position += self._courant
+            self._append(self._position, self._step, T_inlet)
+        # forget the liquid that has passed the center of the last cell, except the entry just before it
+        outlet = self._position - self._n + 0.5
+        capacity = len(self._positions)
+        start = self._start
+        following = (start + 1) % capacity
+        while self._count > 2 and self._positions[following] <= outlet:
+            start = following
+            following = (start + 1) % capacity
+            self._count -= 1
+        self._start = start
+        w = (outlet - self._positions[start]) / (self._positions[following] - self._positions[start])
+        entered = self._steps[start] + w * (self._steps[following] - self._steps[start])
+        initial = self._temperatures[start] + w * (self._temperatures[following] - self._temperatures[start])
+        T[-1] = T_env + (initial - T_env) * math.exp(-self._decay * (self._step - entered))
+        return initial
+
+    def _temperature(self, positions: np.ndarray) -> np.ndarray:
+        """
+        :param positions: positions of the liquid
+        :return: temperature of the liquid at the positions
+        """
+        position, step, temperature = self._entries()
+        entered = np.interp(positions, position, step)
+        initial = np.interp(positions, position, temperature)
+        return self._T_env + (initial - self._T_env) * np.exp(-self._decay * (self._step - entered))
+
+    def profile(self, T: np.ndarray):
+        """
+        Reconstruct the temperature of all cells.
+        :param T: temperature of the cells, overwritten
+        """
+        if self._count > 0:
+            T[:] = self._temperature(self._position - np.arange(self._n) - 0.5)
+
+    def get_state(self) -> dict:
+        state = {"history": self._entries().copy(), "position": self._position, "step": self._step,
+                 "T_env": self._T_env, "courant": self._courant, "decay": self._decay}
+        if self._key is not None:
+            state["key"] = np.asarray(self._key, dtype=float)
+        return state
+
+    def set_state(self, state: dict):
+        history = np.asarray(state["history"], dtype=float)
+        padding = [0.0] * max(history.shape[1], 2 * self._n + 4)
+        self._positions, self._steps, self._temperatures = (row.tolist() + padding for row in history)
+        self._start = 0
+        self._count = history.shape[1]
+        self._position = float(state["position"])
+        self._step = float(state["step"])
+        self._T_env = float(state["T_env"])
+        # parameters the history has been advanced with, the profile is reconstructed with them until the next step
+        if "courant" in state:
+            self._courant = float(state["courant"])
+            self._decay = float(state["decay"])
+        if "key" in state:
+            self._key = tuple(float(value) for value in state["key"])
@@ -0,0 +1,113 @@
+import numpy as np
+from scipy.linalg.lapack import dtbtrs
+
+from heat_transfer.parameters import copy_parameters, parameters_equal
+
+
+class UpwindSystem(object):
+    """
+    Lower-bidiagonal system of the implicit first-order upwind scheme:
+        d_0 T_0 = rhs_0
+        -c T_(i-1) + d T_i = rhs_i,  i = 1..n
+    where T_0 is the inlet ghost cell.
+    The matrix is kept in the banded form between time steps and is rebuilt only when the parameters that define it
+    change, so a time step costs a right-hand-side update and a forward substitution.
+    """
+
+    def __init__(self, n: int):
+        """
+        :param n: number of cells (without the inlet ghost cell)
+        """
+        self._key = None
+        self._A = np.empty((2, n + 1))
+        self._rhs = np.empty(n + 1)
+
+    @property
+    def key(self):
+        return self._key
+
+    def matches(self, key) -> bool:
+        """
+        Check if the stored matrix has been built from the given parameters.
+        :param key: parameters that define the matrix
+        """
+        return key == self._key
+
+    def assemble(self, key, ghost_diagonal: float, diagonal: float, lower: float):
+        """
+        Store new matrix coefficients.
+        :param key: parameters the matrix has been built from
+        :param ghost_diagonal: diagonal element of the inlet ghost cell
+        :param diagonal: diagonal element of the inner cells
+        :param lower: sub-diagonal element
+        """
+        self._A[0, 0] = ghost_diagonal
+        self._A[0, 1:] = diagonal
+        self._A[1, :] = lower
+        self._key = key
+
+    def solve(self, T_inlet: float, T: np.ndarray, source: float = 0.0):
+        """
+        Solve the system in place.
+        :param T_inlet: inlet temperature
+        :param T: temperature from the previous time step, overwritten by the solution
+        :param source: constant term added to the right-hand side of every row
+        """
+        self._rhs[0] = T_inlet + source
+        np.add(T, source, out=self._rhs[1:])
+        x, info = dtbtrs(self._A, self._rhs, uplo="L", overwrite_b=1)
+        if info != 0:
+            raise RuntimeError(f"Implicit scheme matrix is singular (info={info}).")
+        T[:] = x[1:]
+
+
+class EnsembleUpwindSystem(UpwindSystem):
+    """
+    Batch of upwind systems for an ensemble of simulations. All members share the grid, but every member has its own
+    coefficients, so the parameters and the temperatures have an extra leading dimension of size `members`.
+    The forward substitution goes along the cells and advances all members at once.
+    """
+
+    def __init__(self, members: int, n: int):
+        """
+        :param members: number of ensemble members
+        :param n: number of cells (without the inlet ghost cell)
+        """
+        self._key = None
+        self._ghost_diagonal = np.empty(members)
+        # the substitution step is x_i = alpha * rhs_i + beta * x_(i-1)
+        self._alpha = np.empty(members)
+        self._beta = np.empty(members)
+        # work buffers, the right-hand side is transposed so that every cell is a contiguous row over the members
+        self._rhs = np.empty((n, members))
+        self._x = np.empty(members)
+        self._tmp = np.empty(members)
+
+    def matches(self, key) -> bool:
+        return self._key is not None and parameters_equal(key, self._key)
+
+    def assemble(self, key, ghost_diagonal, diagonal, lower):
+        self._ghost_diagonal[:] = ghost_diagonal
+        self._alpha[:] = 1.0 / diagonal
+        self._beta[:] = -lower * self._alpha
+        self._key = copy_parameters(key)
+
+    def solve(self, T_inlet, T: np.ndarray, source=0.0):
+        """
+        Solve the systems of all members in place.
+        :param T_inlet: inlet temperature, scalar or array of shape (members,)
+        :param T: temperatures of shape (members, n) from the previous time step, overwritten by the solution
+        :param source: constant term added to the right-hand side, scalar or array of shape (members,)
+        """
+        rhs = self._rhs
+        rhs[:] = T.T
+        rhs += source
+        x = self._x
+        np.add(T_inlet, source, out=x)
+        x /= self._ghost_diagonal
+        for row in rhs:
+            row *= self._alpha
+            np.multiply(self._beta, x, out=self._tmp)
+            row += self._tmp
+            x = row
+        T[:] = rhs.T
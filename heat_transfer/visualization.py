@@ -0,0 +1,61 @@
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib import cm, colors
+
+from heat_transfer.observer import Observer
+
+
+def color_limits(setup):
+    """
+    :param setup: simulation setup
+    :return: minimal and maximal temperatures of the color scale shared by all plots
+    """
+    temperatures = [np.min(setup.T_env), np.min(setup.temp_init), np.min(setup.steady_temperature),
+                    np.max(setup.T_env), np.max(setup.temp_init), np.max(setup.steady_temperature)]
+    return min(temperatures) - 20, max(temperatures) + 20
+
+
+def add_colorbar(fig, ax, v_min: float, v_max: float):
+    """
+    Add the temperature color scale to the figure.
+    """
+    fig.colorbar(cm.ScalarMappable(norm=colors.Normalize(v_min, v_max), cmap=plt.get_cmap("plasma")), ax=ax)
+
+
+class Plotter(Observer):
+    """
+    Live visualization of the temperature inside every simulated object.
+    """
+
+    def __init__(self, every: int = 2, pause: float = 0.1):
+        """
+        :param every: redraw plots every `every` iterations
+        :param pause: time in seconds given to the GUI event loop after each redraw
+        """
+        self._every = every
+        self._pause = pause
+        self._objects = []
+
+    def start(self, simulation):
+        # pumps and manifolds are point objects without the temperature inside, there is nothing to be visualized
+        objects = [obj for obj in simulation.objects if hasattr(obj, "temperature")]
+        self._objects = objects
+        fig, axs = plt.subplots(len(objects), 1, layout='constrained', figsize=(10, 8), squeeze=False)
+        axs = axs[:, 0]
+        v_min, v_max = color_limits(simulation.setup)
+        add_colorbar(fig, axs[0], v_min, v_max)
+        plt.xlim(100)
+        for obj, ax in zip(objects, axs):
+            obj._ax = ax
+            obj._ax.v_min = v_min
+            obj._ax.v_max = v_max
+
+    def notify(self, simulation, iteration: int):
+        if iteration % self._every != 0:
+            return
+        for obj in self._objects:
+            obj.print()
+        plt.pause(self._pause)
+
+    def finish(self, simulation):
+        plt.show()
@@ -1,13 +1,17 @@
 import argparse
+import os
+from typing import TYPE_CHECKING
 
-from heat_transfer.pipe import Pipe
-from heat_transfer.pump import Pump
-from heat_transfer.simulation import Simulation
-from heat_transfer.solar import Solar
-from heat_transfer.tank import Tank
+from heat_transfer.scenario import load_scenario
 
+if TYPE_CHECKING:
+    from heat_transfer.simulation import Simulation
 
-def main():
+# loop of the solar panel and the tank simulated by default
+DEFAULT_SCENARIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenarios", "solar_loop.json")
+
+
+def create_parser():
     parser = argparse.ArgumentParser()
     # simulation parameters
     parser.add_argument("--Cp", default=4180.0, type=float, help="heat capacity")
@@ -15,18 +19,70 @@ def main():
     parser.add_argument("--T_env", default=280, type=float, help="environment temperature")
     parser.add_argument("--port_radius", default=0.1, type=float, help="radius of pipes in the simulation")
     parser.add_argument("--dt", default=1, type=float, help="time discretization step")
-    parser.add_argument("--t_max", default=800, type=int, help="number of time steps")
+    parser.add_argument("--t_max", default=800, type=int,
+                        help="number of time steps, restarted simulations keep the one of the checkpoint by default")
+    parser.add_argument("--scenario", default=DEFAULT_SCENARIO, type=str,
+                        help="JSON file with the loop layout, see scenarios/solar_loop.json")
+    parser.add_argument("--solar_cells", default=500, type=int, help="number of cells of the solar panel")
+    parser.add_argument("--pipe_cells", default=20, type=int, help="number of cells of the connecting pipes")
+    parser.add_argument("--tank_layers", default=100, type=int, help="number of layers along the tank")
     parser.add_argument("--steady_temperature", default=600, type=float, help="internal temperature of the solar panel")
     parser.add_argument("--temp_init", default=400, type=float, help="initial temperature of the liquid in the system")
     parser.add_argument("--flow_rate", default=20, type=float, help="flow rate in the pump")
+    parser.add_argument("--thermostat", default=None, type=float, nargs=2, metavar=("ON", "OFF"),
+                        help="run the pump only while the solar outlet is hotter than the tank outlet, switching it on "
+                             "above the ON and off below the OFF temperature difference, can not be combined with a "
+                             "flow_rate schedule")
+    parser.add_argument("--pump_power", default=0.0, type=float,
+                        help="electric power of the pump per cubed flow rate, to count the pumping energy")
+    parser.add_argument("--schedule", action="append", default=[], metavar="NAME=FILE[:COLUMN]",
+                        help="read T_env, steady_temperature or flow_rate in time from the CSV file with the time "
+                             "column in seconds, the column is named after the parameter by default")
+    parser.add_argument("--schedule-period", default=None, type=float,
+                        help="repeat the schedules with the given period in seconds, e.g. 86400 for daily profiles")
+    parser.add_argument("--stratified", action="store_true",
+                        help="simulate the tank in two dimensions, with the inlet jet and the stratification")
+    parser.add_argument("--substeps", default=1, type=int,
+                        help="number of steps of the solar panel and the short pipes per time step of the tank")
+    parser.add_argument("--lumped-tolerance", default=None, type=float,
+                        help="replace pipes by transport delays when their outlet temperature deviates by less than "
+                             "the given fraction of an inlet temperature step, e.g. 0.1")
+    parser.add_argument("--advection", default="upwind", choices=["upwind", "semi_lagrangian"],
+                        help="advection scheme of the pipes and the tank, semi-Lagrangian keeps temperature fronts "
+                             "sharp on coarse grids and long time steps")
+    parser.add_argument("--coupled", action="store_true",
+                        help="advance the whole loop with a single implicit solve per time step")
+    parser.add_argument("--steady", action="store_true",
+                        help="solve for the steady state of the loop directly instead of time marching")
+    parser.add_argument("--steady-tolerance", default=None, type=float,
+                        help="stop the simulation when temperatures change slower than the tolerance per step")
+    parser.add_argument("--steady-window", default=100, type=int,
+                        help="number of steps the steady state tolerance has to hold")
+    # output parameters
+    parser.add_argument("--no-plot", action="store_true", help="run headless, without the live visualization")
+    parser.add_argument("--async-plot", action="store_true",
+                        help="draw the live visualization in a separate process, dropping frames it can not keep up "
+                             "with")
+    parser.add_argument("--fps", default=10.0, type=float, help="maximal frame rate of the asynchronous visualization")
+    parser.add_argument("--record", default=None, type=str, help="directory to record the simulation trajectory into")
+    parser.add_argument("--record-every", default=1, type=int, help="record the trajectory every given number of steps")
+    parser.add_argument("--checkpoint", default=None, type=str, help="file to periodically write the checkpoint into")
+    parser.add_argument("--checkpoint-every", default=1000, type=int, help="number of steps between the checkpoints")
+    parser.add_argument("--restart", default=None, type=str, help="checkpoint file to continue the simulation from")
+    parser.add_argument("--profile", action="store_true", help="print time spent in every object after the run")
+    parser.add_argument("--energy-balance", action="store_true",
+                        help="check the global energy balance on every step and print the energy balance of every "
+                             "object after the run")
+    parser.add_argument("--profile-trace", default=None, type=str,
+                        help="write profiled calls into the given file in the Chrome trace event format")
+    return parser
 
-    args = parser.parse_args()
-    v = vars(args)
 
+def create_objects(v: dict):
     """
-    The task is to simulate the behaviour of the system below 
-    
-    
+    Create the objects of the loop described by the scenario file, by default the system below
+
+
         Solar
 Sun     panel
 light   ______   Pipe 1    Pump   Pipe 2    ______________
@@ -37,18 +93,149 @@ light   ______   Pipe 1    Pump   Pipe 2    ______________
                                ║            |            |
                                ╚════════════|            |
                                             ¯¯¯¯¯¯¯¯¯¯¯¯¯¯
+
+    Parameters missing in the scenario are taken from the setup, solar panels have `solar_cells` cells, pipes
+    `pipe_cells` cells and tanks `tank_layers` layers unless the scenario sets them.
+    """
+    # objects are imported here, so the command line help does not wait for numpy and scipy
+    from heat_transfer.control import Thermostat
+    from heat_transfer.pipe import Pipe
+    from heat_transfer.pump import Pump
+    from heat_transfer.solar import Solar
+    if v.get("stratified"):
+        from heat_transfer.stratified_tank import StratifiedTank as Tank
+    else:
+        from heat_transfer.tank import Tank
+
+    # fast components are sub-cycled with a shorter time step
+    fast = v | {"dt": v["dt"] / v.get("substeps", 1)}
+    objects = []
+    for definition in load_scenario(v.get("scenario", DEFAULT_SCENARIO)):
+        params = dict(definition)
+        kind = params.pop("type")
+        setup = fast if params.pop("subcycled", True) else v
+        if kind == "Solar":
+            objects.append(Solar(**(setup | {"n": v.get("solar_cells", 500)} | params)))
+        elif kind == "Pipe":
+            objects.append(Pipe(**(setup | {"n": v.get("pipe_cells", 20)} | params)))
+        elif kind == "Tank":
+            objects.append(Tank(**(v | {"ny": v.get("tank_layers", 100)} | params)))
+        else:
+            objects.append(Pump(v["flow_rate"], v["temp_init"], power_coefficient=v.get("pump_power", 0.0)))
+    if v.get("thermostat"):
+        solar = next((obj for obj in objects if isinstance(obj, Solar)), None)
+        tank = next((obj for obj in objects if isinstance(obj, Tank)), None)
+        if solar is None or tank is None:
+            raise ValueError("Thermostat needs a solar panel and a tank in the scenario.")
+        pump = next(obj for obj in objects if isinstance(obj, Pump))
+        pump.controller = Thermostat(solar, v["flow_rate"], *v["thermostat"], reference=tank)
+    return objects
+
+
+def add_schedules(sim: "Simulation", schedules: list[str], period: float = None):
+    """
+    Attach schedules given on the command line to the simulation of `create_objects`.
+    :param sim: simulation
+    :param schedules: list of "NAME=FILE[:COLUMN]" strings
+    :param period: period of the schedules in seconds
     """
+    if not schedules:
+        return
+    from heat_transfer.schedule import Schedule
+    from heat_transfer.solar import Solar
+
+    targets = {
+        "T_env": sim.setup,
+        "steady_temperature": next((obj for obj in sim.objects if isinstance(obj, Solar)), None),
+        "flow_rate": sim.pump,
+    }
+    for item in schedules:
+        name, _, source = item.partition("=")
+        if name not in targets or not source:
+            raise ValueError(f"Schedule should have the NAME=FILE[:COLUMN] form with NAME one of {list(targets)}, "
+                             f"got '{item}'.")
+        if targets[name] is None:
+            raise ValueError(f"Schedule of {name} needs a solar panel in the scenario.")
+        path, _, column = source.partition(":")
+        sim.add_schedule(targets[name], name, Schedule.from_csv(path, column or name, period=period))
+
+
+def create_simulation(v: dict) -> tuple["Simulation", "Solar", "Tank"]:
+    """
+    Create the simulation of the loop of `create_objects` with the schedules of the setup attached.
+    :param v: simulation setup
+    :return: simulation, its solar panel and its tank, None if the scenario has no such object
+    """
+    from heat_transfer.simulation import Simulation
+
+    objects = create_objects(v)
+    kinds = [definition["type"] for definition in load_scenario(v.get("scenario", DEFAULT_SCENARIO))]
+    solar, tank = (objects[kinds.index(kind)] if kind in kinds else None for kind in ["Solar", "Tank"])
+    sim = Simulation(objects, **v)
+    add_schedules(sim, v.get("schedule", []), v.get("schedule_period"))
+    return sim, solar, tank
+
+
+# command line options that do not change the simulated physics
+OUTPUT_OPTIONS = ["no_plot", "async_plot", "fps", "record", "record_every", "checkpoint", "checkpoint_every", "restart",
+                  "steady_tolerance", "steady_window", "profile", "profile_trace", "energy_balance"]
+
+
+def main():
+    parser = create_parser()
+    # t_max stays None when it is not given, then a restarted simulation keeps the number of steps of the checkpoint
+    args = parser.parse_args(namespace=argparse.Namespace(t_max=None))
+    from heat_transfer.simulation import Simulation
 
-    # initialize objects used in the simulation
-    solar = Solar(**v)
-    pipe_1 = Pipe(length=0.3, u=1000, n=20, **v)
-    pipe_2 = Pipe(length=0.3, u=1000, n=20, **v)
-    tank = Tank(tank_radius=0.2, tank_length=50, nx=30, ny=100, **v)
-    pipe_3 = Pipe(length=0.3, u=1000, n=20, **v)
-    pump = Pump(args.flow_rate, args.temp_init)
+    v = vars(args) | {"t_max": parser.get_default("t_max") if args.t_max is None else args.t_max}
+    if args.restart is not None:
+        # physical setup is taken from the checkpoint and the output options from the command line
+        v = Simulation.read_setup(args.restart) | {name: v[name] for name in OUTPUT_OPTIONS}
+        if args.t_max is not None:
+            v["t_max"] = args.t_max
 
-    sim = Simulation([solar, pipe_1, pump, pipe_2, tank, pipe_3], **vars(args))
-    sim.simulate()
+    sim, _, _ = create_simulation(v)
+    for obj, error in sim.lumped:
+        print(f"{obj.title} is lumped, outlet deviation is below {error:.1%} of an inlet temperature step")
+    if args.restart is not None:
+        sim.load_checkpoint(args.restart)
+    if args.steady:
+        print(f"Steady state temperature at the pump outlet: {sim.solve_steady_state()}")
+        return
+    if not args.no_plot and args.async_plot:
+        from heat_transfer.renderer import AsyncPlotter
+        sim.add_observer(AsyncPlotter(fps=args.fps))
+    elif not args.no_plot:
+        # import visualization only when it is needed, headless runs do not depend on matplotlib
+        from heat_transfer.visualization import Plotter
+        sim.add_observer(Plotter())
+    if args.record is not None:
+        from heat_transfer.recorder import Recorder
+        sim.add_observer(Recorder(args.record, every=args.record_every))
+    monitor = None
+    if args.steady_tolerance is not None:
+        from heat_transfer.convergence import ConvergenceMonitor
+        monitor = ConvergenceMonitor(tolerance=args.steady_tolerance, window=args.steady_window)
+        sim.add_observer(monitor)
+    profiler = None
+    if args.profile or args.profile_trace is not None:
+        from heat_transfer.profiler import Profiler
+        profiler = Profiler(trace=args.profile_trace is not None)
+        sim.add_observer(profiler)
+    sim.simulate(checkpoint=args.checkpoint, checkpoint_every=args.checkpoint_every)
+    if profiler is not None:
+        print(profiler.summary())
+        if args.profile_trace is not None:
+            profiler.export_trace(args.profile_trace)
+    if monitor is not None and monitor.converged_iteration is not None:
+        print(f"Steady state reached at iteration {monitor.converged_iteration}, {monitor.steps_saved} steps saved")
+    if args.energy_balance:
+        for obj in sim.objects:
+            if hasattr(obj, "energy"):
+                print(f"{obj.title}: {obj.energy.exchange:.4g} J received from the surroundings, "
+                      f"{obj.energy.inflow - obj.energy.outflow:.4g} J carried in by the liquid, "
+                      f"residual {obj.energy.residual(obj.thermal_energy(sim.setup)):.3g} J")
+        print(f"Energy created by the last time step: {sim.energy_residual:.3g} J")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from heat_transfer.control import PiecewiseSchedule
+from heat_transfer.observer import Observer
+from heat_transfer.simulation import Simulation
+from main import create_simulation
+from sweep import point_parameters
+
+
+class StopAt(Observer):
+    """
+    Stops the simulation when it reaches the given iteration.
+    """
+
+    def __init__(self, iteration: int):
+        self.iteration = iteration
+
+    def notify(self, simulation, iteration: int):
+        if iteration + 1 >= self.iteration:
+            simulation.stop()
+
+
+class ScheduleEvaluator(object):
+    """
+    Evaluates piecewise constant pump schedules by the tank energy gain minus the weighted pumping energy over the
+    horizon after a warm-up. The warm-up is simulated once with the fixed flow rate of the setup, and every evaluation
+    continues from checkpoints instead of replaying the simulation from the initial temperature: a checkpoint is kept
+    at the start of every interval for every distinct schedule of the preceding intervals, so an evaluation only
+    simulates the intervals after the longest prefix it shares with an already evaluated schedule.
+    """
+
+    def __init__(self, parameters: dict, intervals: int, warmup: int, directory: str, cost_factor: float = 1.0):
+        """
+        :param parameters: simulation setup of main.py
+        :param intervals: number of intervals of the schedules, of equal length
+        :param warmup: number of steps simulated before the optimized horizon
+        :param directory: directory to write the checkpoints into
+        :param cost_factor: weight of the pumping energy against the heat, e.g. the price ratio of electricity and heat
+        """
+        if not 0 <= warmup <= parameters["t_max"] - intervals:
+            raise ValueError(f"Warm-up of {warmup} steps leaves less than a step per interval of the horizon.")
+        self._parameters = parameters
+        self._directory = directory
+        self._cost_factor = cost_factor
+        self._boundaries = np.linspace(warmup, parameters["t_max"], intervals + 1).round().astype(int)
+        self._checkpoints = {}
+        self._values = {}
+        self.evaluations = 0
+        self.simulated_steps = 0
+        sim, tank = self._create()
+        self._run(sim, warmup)
+        self._start_energy = tank.thermal_energy(sim.setup)
+        self._start_pumping_energy = sim.pump.pumping_energy
+        self._save(sim, ())
+
+    @property
+    def times(self):
+        """
+        :return: start times of the intervals in seconds
+        """
+        return self._boundaries[:-1] * self._parameters["dt"]
+
+    @property
+    def replayed_steps(self):
+        """
+        :return: number of steps the evaluations would have simulated starting from the initial temperature
+        """
+        return self.evaluations * self._parameters["t_max"]
+
+    def _create(self):
+        sim, _, tank = create_simulation(self._parameters)
+        return sim, tank
+
+    def _run(self, sim: Simulation, iteration: int):
+        start = sim.iteration
+        if iteration > start:
+            sim.add_observer(StopAt(iteration))
+            sim.simulate(verbose=False)
+            sim.observers.pop()
+        self.simulated_steps += sim.iteration - start
+
+    def _save(self, sim: Simulation, prefix: tuple):
+        path = os.path.join(self._directory, f"{len(self._checkpoints)}.npz")
+        sim.save_checkpoint(path)
+        self._checkpoints[prefix] = path
+
+    def evaluate(self, flow_rates) -> float:
+        """
+        :param flow_rates: flow rates of the intervals
+        :return: tank energy gain minus the weighted pumping energy over the horizon
+        """
+        flow_rates = tuple(float(rate) for rate in flow_rates)
+        if len(flow_rates) != len(self._boundaries) - 1:
+            raise ValueError(f"Schedule should have {len(self._boundaries) - 1} intervals, got {len(flow_rates)}.")
+        if flow_rates in self._values:
+            return self._values[flow_rates]
+        start = max(j for j in range(len(flow_rates)) if flow_rates[:j] in self._checkpoints)
+        sim, tank = self._create()
+        sim.pump.controller = PiecewiseSchedule(self.times, flow_rates)
+        sim.load_checkpoint(self._checkpoints[flow_rates[:start]])
+        for j in range(start, len(flow_rates)):
+            self._run(sim, self._boundaries[j + 1])
+            if j + 1 < len(flow_rates):
+                self._save(sim, flow_rates[:j + 1])
+        gain = tank.thermal_energy(sim.setup) - self._start_energy
+        pumping = sim.pump.pumping_energy - self._start_pumping_energy
+        self._values[flow_rates] = float(gain - self._cost_factor * pumping)
+        self.evaluations += 1
+        return self._values[flow_rates]
+
+
+def optimize(evaluator: ScheduleEvaluator, levels: list[float], initial: list[float], passes: int = 2,
+             verbose: bool = True) -> tuple[list[float], float]:
+    """
+    Coordinate search over the schedules: intervals are visited from the first one and each of them tries all flow rate
+    levels with the other intervals fixed, keeping the best schedule. Visiting the intervals in the order of time lets
+    the evaluations of an interval share the checkpoint at its start.
+    :param evaluator: evaluator of the schedules
+    :param levels: candidate flow rates
+    :param initial: initial schedule
+    :param passes: maximal number of passes over the intervals, the search stops earlier when a pass does not improve
+    :param verbose: print every improvement
+    :return: best schedule and its objective
+    """
+    best = list(initial)
+    value = evaluator.evaluate(best)
+    for _ in range(passes):
+        improved = False
+        for j in range(len(best)):
+            for level in levels:
+                candidate = best[:j] + [level] + best[j + 1:]
+                candidate_value = evaluator.evaluate(candidate)
+                if candidate_value > value:
+                    best, value, improved = candidate, candidate_value, True
+                    if verbose:
+                        print(f"Schedule {best}: {value:.6g}")
+        if not improved:
+            break
+    return best, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the piecewise constant pump schedule of main.py simulations "
+                                                 "that maximizes the tank energy gain minus the pumping energy. "
+                                                 "Options not listed below are passed to every simulation, set "
+                                                 "--pump_power to count the pumping energy.")
+    parser.add_argument("--intervals", default=4, type=int, help="number of intervals of the schedule")
+    parser.add_argument("--levels", default="0,10,20,30", help="comma separated candidate flow rates")
+    parser.add_argument("--warmup", default=0, type=int, help="number of steps before the optimized horizon")
+    parser.add_argument("--cost-factor", default=1.0, type=float, help="weight of the pumping energy against the heat")
+    parser.add_argument("--passes", default=2, type=int, help="maximal number of passes over the intervals")
+    parser.add_argument("--output", default=None, help="JSON file to save the results into")
+    args, base = parser.parse_known_args()
+    parameters = point_parameters({}, base)
+    levels = [float(level) for level in args.levels.split(",")]
+    with tempfile.TemporaryDirectory() as directory:
+        evaluator = ScheduleEvaluator(parameters, args.intervals, args.warmup, directory, args.cost_factor)
+        best, value = optimize(evaluator, levels, [parameters["flow_rate"]] * args.intervals, args.passes)
+    print(f"Best schedule: flow rates {best} from {evaluator.times.tolist()} s, objective {value:.6g}")
+    print(f"{evaluator.evaluations} evaluations simulated {evaluator.simulated_steps} steps instead of "
+          f"{evaluator.replayed_steps}")
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump({"times": evaluator.times.tolist(), "flow_rates": best, "objective": value,
+                       "evaluations": evaluator.evaluations, "simulated_steps": evaluator.simulated_steps,
+                       "replayed_steps": evaluator.replayed_steps}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+import argparse
+import os
+import shutil
+import subprocess
+from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+
+from heat_transfer.recorder import Trajectory
+from heat_transfer.renderer import tile
+from heat_transfer.visualization import add_colorbar, color_limits
+
+
+def frame_iterations(trajectory: Trajectory, start: int = 0, stop: int = None, stride: int = 1):
+    """
+    :param trajectory: recorded run
+    :param start: first iteration to render
+    :param stop: iteration after the last rendered one, end of the run by default
+    :param stride: render every `stride` record
+    :return: iterations of all rendered frames
+    """
+    return trajectory.iterations(start, stop)[::stride].astype(int)
+
+
+def render_frames(directory: str, output: str, iterations: list[int], first_frame: int, limits: tuple, dpi: int):
+    """
+    Render frames of a contiguous block of iterations into PNG files. The figure is laid out and drawn once, and only
+    the images and the title are redrawn over its copy for every frame.
+    :param directory: directory with the recorded run
+    :param output: output directory
+    :param iterations: iterations to render
+    :param first_frame: number of the first frame, used in the file names
+    :param limits: minimal and maximal temperatures of the color scale
+    :param dpi: resolution of the frames
+    :return: number of rendered frames
+    """
+    # frames are only written to files, so no display is needed
+    matplotlib.use("Agg")
+    trajectory = Trajectory(directory)
+    objects = [i for i, shape in enumerate(trajectory.shapes) if shape is not None]
+    # read the whole block from the memory-mapped chunks at once, records between the rendered ones are skipped
+    recorded = trajectory.iterations(iterations[0], iterations[-1] + 1).astype(int)
+    selected = np.searchsorted(recorded, iterations)
+    temperatures = [trajectory.temperature(i, iterations[0], iterations[-1] + 1)[selected] for i in objects]
+
+    v_min, v_max = limits
+    fig, axs = plt.subplots(len(objects), 1, layout='constrained', figsize=(10, 8), dpi=dpi, squeeze=False)
+    axs = axs[:, 0]
+    add_colorbar(fig, axs[0], v_min, v_max)
+    # changing artists are animated, so they are excluded from the static background drawn once
+    images = []
+    for ax, i, T in zip(axs, objects, temperatures):
+        images.append(ax.imshow(tile(T[0]), cmap="plasma", vmin=v_min, vmax=v_max, animated=True))
+        ax.set_title(trajectory.titles[i])
+        ax.set_yticks([])
+    # layout is computed once, so it uses the longest title
+    title = fig.suptitle(f"Iteration {iterations[-1]}, t = {iterations[-1] * trajectory.dt:g}", animated=True)
+    fig.canvas.draw()
+    fig.set_layout_engine("none")
+    background = fig.canvas.copy_from_bbox(fig.bbox)
+    for k, iteration in enumerate(iterations):
+        fig.canvas.restore_region(background)
+        for image, T in zip(images, temperatures):
+            image.set_data(tile(T[k]))
+            image.axes.draw_artist(image)
+        title.set_text(f"Iteration {iteration}, t = {iteration * trajectory.dt:g}")
+        fig.draw_artist(title)
+        plt.imsave(os.path.join(output, f"frame_{first_frame + k:06d}.png"), np.asarray(fig.canvas.buffer_rgba()),
+                   pil_kwargs={"compress_level": 1})
+    plt.close(fig)
+    return len(iterations)
+
+
+def render(directory: str, output: str, start: int = 0, stop: int = None, stride: int = 1, workers: int = None,
+           frames_per_task: int = 50, dpi: int = 100, limits: tuple = None):
+    """
+    Render the recorded run into a sequence of PNG frames on a process pool.
+    :param directory: directory with the recorded run
+    :param output: output directory for the frames
+    :param start: first iteration to render
+    :param stop: iteration after the last rendered one, end of the run by default
+    :param stride: render every `stride` record
+    :param workers: number of worker processes, all cores by default
+    :param frames_per_task: number of consecutive frames rendered by a single task
+    :param dpi: resolution of the frames
+    :param limits: minimal and maximal temperatures of the color scale, taken from the recorded setup by default
+    :return: number of rendered frames
+    """
+    trajectory = Trajectory(directory)
+    if limits is None:
+        if not trajectory.setup:
+            raise ValueError("Recorded run does not contain the setup, the color scale limits have to be given.")
+        limits = color_limits(Namespace(**trajectory.setup))
+    iterations = frame_iterations(trajectory, start, stop, stride).tolist()
+    os.makedirs(output, exist_ok=True)
+    blocks = range(0, len(iterations), frames_per_task)
+    with ProcessPoolExecutor(workers or os.cpu_count()) as pool:
+        futures = [pool.submit(render_frames, directory, output, iterations[first:first + frames_per_task], first,
+                               limits, dpi) for first in blocks]
+        return sum(future.result() for future in futures)
+
+
+def encode_video(frames: str, video: str, fps: float):
+    """
+    Encode PNG frames into a video with ffmpeg.
+    :param frames: directory with the frames
+    :param video: path to the output video
+    :param fps: frame rate of the video
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg is required to encode the video.")
+    subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-framerate", str(fps),
+                    "-i", os.path.join(frames, "frame_%06d.png"), "-pix_fmt", "yuv420p",
+                    "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", video], check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the run recorded with main.py --record into image frames.")
+    parser.add_argument("record", help="directory with the recorded run")
+    parser.add_argument("--output", default="frames", help="output directory for the PNG frames")
+    parser.add_argument("--video", default=None, help="encode the frames into the given video file with ffmpeg")
+    parser.add_argument("--fps", default=25.0, type=float, help="frame rate of the video")
+    parser.add_argument("--start", default=0, type=int, help="first iteration to render")
+    parser.add_argument("--stop", default=None, type=int, help="iteration after the last rendered one")
+    parser.add_argument("--stride", default=1, type=int, help="render every given record")
+    parser.add_argument("--workers", default=None, type=int, help="number of worker processes, all cores by default")
+    parser.add_argument("--dpi", default=100, type=int, help="resolution of the frames")
+    parser.add_argument("--v_min", default=None, type=float, help="lower limit of the color scale")
+    parser.add_argument("--v_max", default=None, type=float, help="upper limit of the color scale")
+    args = parser.parse_args()
+    if (args.v_min is None) != (args.v_max is None):
+        parser.error("--v_min and --v_max have to be given together.")
+    limits = None if args.v_min is None else (args.v_min, args.v_max)
+    frames = render(args.record, args.output, args.start, args.stop, args.stride, args.workers, dpi=args.dpi,
+                    limits=limits)
+    print(f"Rendered {frames} frames into {args.output}")
+    if args.video is not None:
+        encode_video(args.output, args.video, args.fps)
+
+
+if __name__ == '__main__':
+    main()
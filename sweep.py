@@ -0,0 +1,165 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from heat_transfer.observer import Observer
+from heat_transfer.solar import Solar
+from main import create_parser, create_simulation
+
+
+class SweepSummary(Observer):
+    """
+    Collects summary metrics of a single sweep run: outlet temperature of the solar panel on every iteration and
+    the energy collected by the panel.
+    """
+
+    def __init__(self, solar: Solar):
+        self._solar = solar
+        self.outlet_temperature = []
+        self.collected_energy = 0.0
+
+    def notify(self, simulation, iteration: int):
+        setup = simulation.setup
+        self.outlet_temperature.append(float(self._solar.T_outlet))
+        # the temperatures hold for the whole simulation step, the panel may take several shorter steps in it
+        self.collected_energy += (self._solar.flow_rate * setup.Cp * (self._solar.T_outlet - self._solar.T_inlet)
+                                  * setup.dt)
+
+
+def grid_points(grid: list[str]):
+    """
+    Generate parameter sets for all combinations of the grid values.
+    :param grid: list of "NAME=V1,V2,..." strings
+    :return: iterator over dictionaries that map parameter names to their values
+    """
+    names = []
+    values = []
+    for item in grid:
+        name, _, items = item.partition("=")
+        if not items:
+            raise ValueError(f"Grid entry should have the NAME=V1,V2,... form, got '{item}'.")
+        names.append(name)
+        values.append(items.split(","))
+    for point in itertools.product(*values):
+        yield dict(zip(names, point))
+
+
+def csv_points(path: str):
+    """
+    Read parameter sets from the CSV file, one set per row with parameter names in the header.
+    :param path: path to the CSV file
+    :return: iterator over dictionaries that map parameter names to their values
+    """
+    with open(path, newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def point_parameters(point: dict, base: list[str]):
+    """
+    Convert parameter set into the full simulation setup using the main.py command line parser.
+    :param point: dictionary that maps parameter names to their values
+    :param base: command line arguments shared by all points
+    :return: simulation setup
+    """
+    arguments = list(base)
+    for name, value in point.items():
+        arguments += [f"--{name}", str(value)]
+    return vars(create_parser().parse_args(arguments))
+
+
+def run_point(index: int, point: dict, parameters: dict):
+    """
+    Run single headless simulation, or solve for its steady state if the `steady` parameter is set.
+    :param index: index of the point in the sweep
+    :param point: swept parameter set
+    :param parameters: full simulation setup
+    :return: table row with summary metrics
+    """
+    sim, solar, tank = create_simulation(parameters)
+    if parameters["steady"]:
+        sim.solve_steady_state()
+        return {
+            "index": index,
+            "parameters": {name: parameters[name] for name in point},
+            "tank_temperature": np.asarray(tank.temperature).tolist(),
+            "outlet_temperature": [float(solar.T_outlet)],
+            "collected_power": float(solar.flow_rate * parameters["Cp"] * (solar.T_outlet - solar.T_inlet)),
+        }
+    summary = SweepSummary(solar)
+    sim.add_observer(summary)
+    sim.simulate(verbose=False)
+    return {
+        "index": index,
+        "parameters": {name: parameters[name] for name in point},
+        "tank_temperature": np.asarray(tank.temperature).tolist(),
+        "outlet_temperature": summary.outlet_temperature,
+        "collected_energy": float(summary.collected_energy),
+    }
+
+
+def run_sweep(points, base: list[str], output: str, workers: int = None):
+    """
+    Run simulations for all parameter sets on a process pool and append the results to the JSON lines file as soon as
+    each of them finishes. Only a bounded number of runs is in flight, so the memory does not grow with the sweep size.
+    Failed runs are written as rows with the error instead of the summary metrics.
+    :param points: iterable over parameter sets
+    :param base: command line arguments shared by all points
+    :param output: path to the output file
+    :param workers: number of worker processes, all cores by default
+    :return: number of finished runs, including the failed ones
+    """
+    workers = workers or os.cpu_count()
+    finished = 0
+    # index and swept parameters of the runs in flight, for the rows of the failed runs
+    runs = {}
+    with open(output, "a") as f, ProcessPoolExecutor(workers) as pool:
+        def write(done):
+            nonlocal finished
+            for future in done:
+                index, parameters = runs.pop(future)
+                try:
+                    row = future.result()
+                except Exception as e:
+                    # a single diverging or invalid run does not abandon the rest of the sweep
+                    row = {"index": index, "parameters": parameters, "error": f"{type(e).__name__}: {e}"}
+                f.write(json.dumps(row) + "\n")
+                finished += 1
+            f.flush()
+            print(f"Finished {finished} runs")
+
+        pending = set()
+        for index, point in enumerate(points):
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                write(done)
+            parameters = point_parameters(point, base)
+            future = pool.submit(run_point, index, point, parameters)
+            runs[future] = index, {name: parameters[name] for name in point}
+            pending.add(future)
+        if pending:
+            write(wait(pending)[0])
+    return finished
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless main.py simulations for a set of parameters. "
+                                                 "Options not listed below are passed to every simulation.")
+    parser.add_argument("--grid", action="append", default=[], metavar="NAME=V1,V2,...",
+                        help="values of the swept parameter, all combinations of the grid values are simulated")
+    parser.add_argument("--points", help="CSV file with one parameter set per row and parameter names in the header")
+    parser.add_argument("--workers", default=None, type=int, help="number of worker processes, all cores by default")
+    parser.add_argument("--output", default="sweep.jsonl", help="output file with one JSON line per run")
+    args, base = parser.parse_known_args()
+    if args.points is not None and args.grid:
+        parser.error("--grid and --points can not be used together.")
+    points = csv_points(args.points) if args.points is not None else grid_points(args.grid)
+    run_sweep(points, base, args.output, args.workers)
+
+
+if __name__ == '__main__':
+    main()
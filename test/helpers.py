@@ -0,0 +1,18 @@
+from heat_transfer.pipe import Pipe
+from heat_transfer.pump import Pump
+from heat_transfer.solar import Solar
+from heat_transfer.tank import Tank
+
+
+def create_loop(setup: dict, members: int = None, substeps: int = 1, **pump):
+    """
+    Create the small loop of the tests: solar panel, pipe, pump and tank.
+    :param setup: simulation setup
+    :param members: number of ensemble members of the panel, the pipe and the tank
+    :param substeps: number of steps of the panel and the pipe per simulation step
+    :param pump: additional parameters of the pump
+    :return: objects of the loop
+    """
+    fast = setup | {"dt": setup["dt"] / substeps}
+    return [Solar(n=10, members=members, **fast), Pipe(n=10, u=0.5, members=members, **fast),
+            Pump(setup["flow_rate"], setup["temp_init"], **pump), Tank(0.5, 2, 1, 10, members=members, **setup)]
@@ -0,0 +1,28 @@
+import unittest
+
+from benchmark import compare, pipe_time_step, run_case
+
+
+class BenchmarkTestCase(unittest.TestCase):
+    def test_run_case(self):
+        result = run_case("Pipe.time_step", pipe_time_step, {"n": 10}, 5, 1)
+        self.assertEqual(result["key"], "Pipe.time_step n=10")
+        self.assertEqual(result["steps"], 5)
+        self.assertGreater(result["steps_per_second"], 0)
+        self.assertGreater(result["peak_memory"], 0)
+
+    def test_compare(self):
+        baseline = [{"key": "a", "steps_per_second": 100.0, "peak_memory": 1000},
+                    {"key": "b", "steps_per_second": 100.0, "peak_memory": 1000}]
+        results = [{"key": "a", "steps_per_second": 90.0, "peak_memory": 1100},
+                   {"key": "b", "steps_per_second": 70.0, "peak_memory": 1000},
+                   {"key": "c", "steps_per_second": 70.0, "peak_memory": 1000}]
+        comparison = compare(results, baseline, 0.2)
+        self.assertEqual([regression for _, _, _, regression in comparison], [False, True, False])
+        self.assertAlmostEqual(comparison[0][1], 0.9)
+        self.assertAlmostEqual(comparison[0][2], 1.1)
+        self.assertIsNone(comparison[2][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
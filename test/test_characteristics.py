@@ -0,0 +1,103 @@
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from heat_transfer.characteristics import SemiLagrangianScheme
+from heat_transfer.constant_t_source import ConstantTSource
+from heat_transfer.coupled_system import CoupledSystem
+from heat_transfer.pipe import Pipe
+from heat_transfer.tank import Tank
+
+
+class SemiLagrangianTestCase(unittest.TestCase):
+    def test_integer_courant_shifts_exactly(self):
+        scheme = SemiLagrangianScheme(10)
+        scheme.assemble((2.0,), 2.0, 0.0)
+        T = np.arange(10, dtype=float)
+        scheme.solve(-1.0, T)
+        np.testing.assert_array_equal(T, [-1, -1, 0, 1, 2, 3, 4, 5, 6, 7])
+
+    def test_no_new_extrema(self):
+        scheme = SemiLagrangianScheme(50)
+        scheme.assemble((0.37,), 0.37, 0.0)
+        T = np.where(np.arange(50) % 7 < 3, 10.0, 0.0)
+        for _ in range(20):
+            scheme.solve(0.0, T)
+            self.assertTrue(np.all(T >= 0.0) and np.all(T <= 10.0))
+
+    def test_front_is_sharper_than_upwind(self):
+        """
+        Coarse semi-Lagrangian pipe with long time steps is closer to the exact solution than the ten times finer
+        upwind pipe.
+        """
+        radius = 1 / np.sqrt(np.pi)
+        heat_loss = 0.01 * 2 / radius
+        t_end = 5.0
+        errors = {}
+        for advection, n, steps in [("upwind", 1000, 1000), ("semi_lagrangian", 100, 13)]:
+            source = ConstantTSource(temp_init=150)
+            p = Pipe(temp_init=50, length=10, port_radius=radius, n=n, dt=t_end / steps, t_max=100, u=0.01,
+                     advection=advection)
+            source.attach(p)
+            p.flow_rate = 1.0
+            for _ in range(steps):
+                p.time_step(self.setup)
+            x = (np.arange(n) + 0.5) * 10 / n
+            exact = np.where(x < t_end, 100 + 50 * np.exp(-heat_loss * x), 100 - 50 * np.exp(-heat_loss * t_end))
+            errors[advection] = np.mean(np.abs(p.temperature - exact))
+        self.assertLess(errors["semi_lagrangian"], 0.5 * errors["upwind"])
+
+    def test_steady_state(self):
+        source = ConstantTSource(temp_init=150)
+        p = Pipe(temp_init=50, length=10, port_radius=0.2, n=40, dt=0.7, t_max=100, u=0.01,
+                 advection="semi_lagrangian")
+        source.attach(p)
+        p.flow_rate = 0.1
+        for _ in range(200):
+            p.time_step(self.setup)
+        T = p.temperature.copy()
+        # steady state is the exact profile, the time stepping keeps it up to the interpolation error
+        p.steady_state(self.setup, 150)
+        np.testing.assert_allclose(p.temperature, T, rtol=1e-3)
+
+    def test_ensemble(self):
+        flow_rates = np.array([0.05, 0.2])
+        source = ConstantTSource(temp_init=150)
+        ensemble = Tank(tank_radius=0.2, tank_length=5, nx=1, ny=30, temp_init=50, dt=1.0, t_max=100, members=2,
+                        advection="semi_lagrangian")
+        source.attach(ensemble)
+        ensemble.flow_rate = flow_rates
+        tanks = []
+        for flow_rate in flow_rates:
+            tank = Tank(tank_radius=0.2, tank_length=5, nx=1, ny=30, temp_init=50, dt=1.0, t_max=100,
+                        advection="semi_lagrangian")
+            source.attach(tank)
+            tank.flow_rate = flow_rate
+            tanks.append(tank)
+        for _ in range(10):
+            for tank in [ensemble] + tanks:
+                tank.time_step(self.setup)
+        for m, tank in enumerate(tanks):
+            np.testing.assert_allclose(ensemble.temperature[m], tank.temperature, rtol=1e-12)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, Pipe, temp_init=50, length=10, port_radius=0.2, n=10, dt=1.0, t_max=100,
+                          advection="central")
+        p = Pipe(temp_init=50, length=10, port_radius=0.2, n=10, dt=1.0, t_max=100, advection="semi_lagrangian")
+        self.assertRaises(RuntimeError, CoupledSystem, [p])
+
+    def setUp(self):
+        """
+        Initialize test setup environment
+        """
+        setup = SimpleNamespace()
+        setup.Cp = 1.0
+        setup.rho = 1.0
+        setup.T_env = 100
+        setup.port_radius = 0.1
+        self.setup = setup
+
+
+if __name__ == '__main__':
+    unittest.main()
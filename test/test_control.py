@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from heat_transfer.control import PIDController, PiecewiseSchedule, Thermostat
+from heat_transfer.schedule import Schedule
+from heat_transfer.simulation import Simulation
+from heat_transfer.solar import Solar
+from test.helpers import create_loop
+
+
+class ControlTestCase(unittest.TestCase):
+    def test_piecewise_schedule(self):
+        schedule = PiecewiseSchedule([10.0, 20.0, 30.0], [1.0, 2.0, 3.0])
+        self.assertEqual([schedule.flow_rate(t, 1.0) for t in [0.0, 10.0, 19.5, 20.0, 100.0]], [1, 1, 1, 2, 3])
+        periodic = PiecewiseSchedule([0.0, 5.0], [1.0, 2.0], period=10.0)
+        self.assertEqual([periodic.flow_rate(t, 1.0) for t in [4.0, 5.0, 10.0, 16.0]], [1, 2, 1, 2])
+        self.assertRaises(ValueError, PiecewiseSchedule, [1.0, 1.0], [1.0, 2.0])
+        self.assertRaises(ValueError, PiecewiseSchedule, [1.0], [1.0, 2.0])
+
+    def test_thermostat(self):
+        sensor = SimpleNamespace(T_outlet=300.0)
+        reference = SimpleNamespace(T_outlet=300.0)
+        thermostat = Thermostat(sensor, 5.0, on_difference=6.0, off_difference=2.0, reference=reference)
+        rates = []
+        # the pump stays on between the thresholds until the difference drops below the lower one
+        for T in [303.0, 307.0, 304.0, 302.5, 301.0, 304.0, 307.0]:
+            sensor.T_outlet = T
+            rates.append(thermostat.flow_rate(0.0, 1.0))
+        self.assertEqual(rates, [0, 5, 5, 5, 0, 0, 5])
+        restored = Thermostat(sensor, 5.0, on_difference=6.0, off_difference=2.0, reference=reference)
+        restored.set_state(thermostat.get_state())
+        self.assertTrue(restored.on)
+        self.assertRaises(ValueError, Thermostat, sensor, 5.0, 2.0, 6.0)
+
+    def test_pid(self):
+        objects = create_loop(vars(self.setup))
+        # weak heat transfer, so the outlet temperature of the panel depends on the flow rate
+        objects[0] = solar = Solar(n=10, heat_transfer=0.01, **vars(self.setup))
+        sim = Simulation(objects, **vars(self.setup))
+        setpoint = 150.0
+        sim.pump.controller = PIDController(solar, setpoint, gain=0.05, integral_time=20.0, max_flow_rate=5.0)
+        sim.simulate(verbose=False)
+        # the flow rate settles where the solar outlet is at the setpoint
+        self.assertAlmostEqual(float(solar.T_outlet), setpoint, delta=0.5)
+        self.assertGreater(sim.pump.flow_rate, 0.0)
+        self.assertLess(sim.pump.flow_rate, 5.0)
+
+    def test_pump(self):
+        sim = Simulation(create_loop(vars(self.setup), power_coefficient=2.0), **vars(self.setup))
+        sim.pump.controller = PiecewiseSchedule([0.0, 1.0], [0.5, 1.5])
+        for i in range(20):
+            sim.update(i)
+            sim.time_step()
+            # flow rates set by the controller reach all objects of the loop
+            for obj in sim.objects:
+                self.assertEqual(obj.flow_rate, 0.5 if i < 10 else 1.5)
+        self.assertAlmostEqual(sim.pump.pumping_energy, 2.0 * (0.5 ** 3 + 1.5 ** 3) * 10 * self.setup.dt)
+        # the controller would override a schedule of the flow rate
+        sim.add_schedule(sim.pump, "flow_rate", Schedule([0.0, 10.0], [1.0, 2.0]))
+        self.assertRaises(ValueError, sim.simulate, verbose=False)
+
+        sim = Simulation(create_loop(vars(self.setup), power_coefficient=2.0), **vars(self.setup))
+        sim.pump.controller = Thermostat(sim.objects[0], 1.0, 5.0, 1.0, reference=sim.objects[-1])
+        self.setup.t_max = 50
+        sim.simulate(verbose=False)
+        self.assertTrue(sim.pump.controller.on)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "checkpoint.npz")
+            sim.save_checkpoint(path)
+            restarted = Simulation(create_loop(vars(self.setup), power_coefficient=2.0), **vars(self.setup))
+            restarted.pump.controller = Thermostat(restarted.objects[0], 1.0, 5.0, 1.0, reference=restarted.objects[-1])
+            restarted.load_checkpoint(path)
+        self.assertTrue(restarted.pump.controller.on)
+        self.assertEqual(restarted.pump.pumping_energy, sim.pump.pumping_energy)
+        np.testing.assert_array_equal(restarted.objects[-1].temperature, sim.objects[-1].temperature)
+        # controllers read scalar temperatures
+        ensemble = vars(self.setup) | {"flow_rate": np.array([0.5, 1.0])}
+        sim = Simulation(create_loop(ensemble, members=2), **ensemble)
+        sim.pump.controller = Thermostat(sim.objects[0], 1.0, 5.0, 1.0)
+        self.assertRaises(RuntimeError, sim.simulate, verbose=False)
+
+    def setUp(self):
+        """
+        Initialize test setup environment
+        """
+        setup = SimpleNamespace()
+        setup.Cp = 1.0
+        setup.rho = 1.0
+        setup.T_env = 10.0
+        setup.port_radius = 0.1
+        setup.temp_init = 100.0
+        setup.flow_rate = 0.5
+        setup.steady_temperature = 300
+        setup.dt = 0.1
+        setup.t_max = 2000
+        self.setup = setup
+
+
+if __name__ == '__main__':
+    unittest.main()
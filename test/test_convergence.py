@@ -0,0 +1,58 @@
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from heat_transfer.convergence import ConvergenceMonitor
+from heat_transfer.pump import Pump
+from heat_transfer.simulation import Simulation
+from test.helpers import create_loop
+
+
+class ConvergenceMonitorTestCase(unittest.TestCase):
+    def test_early_termination(self):
+        reference = create_loop(vars(self.setup))
+        Simulation(reference, **vars(self.setup)).simulate(verbose=False)
+
+        objects = create_loop(vars(self.setup))
+        s = Simulation(objects, **vars(self.setup))
+        monitor = ConvergenceMonitor(tolerance=1e-8, window=50, every=5, energy_tolerance=1e-10)
+        s.add_observer(monitor)
+        s.simulate(verbose=False)
+        self.assertIsNotNone(monitor.converged_iteration)
+        self.assertLess(s.iteration, self.setup.t_max)
+        self.assertEqual(monitor.steps_saved, self.setup.t_max - s.iteration)
+        for obj, ref in zip(objects, reference):
+            if not isinstance(obj, Pump):
+                np.testing.assert_allclose(obj.temperature, ref.temperature, atol=1e-4)
+
+    def test_no_termination_before_steady_state(self):
+        self.setup.t_max = 30
+        s = Simulation(create_loop(vars(self.setup)), **vars(self.setup))
+        monitor = ConvergenceMonitor(tolerance=1e-8, window=50, every=5)
+        s.add_observer(monitor)
+        s.simulate(verbose=False)
+        self.assertIsNone(monitor.converged_iteration)
+        self.assertEqual(monitor.steps_saved, 0)
+        self.assertEqual(s.iteration, 30)
+
+    def setUp(self):
+        self.setup = SimpleNamespace()
+        # liquid parameters
+        self.setup.Cp = 1.0
+        self.setup.rho = 1.0
+        # environment
+        self.setup.T_env = 100
+        self.setup.steady_temperature = 300
+        # objects parameters
+        self.setup.port_radius = 0.1
+        self.setup.temp_init = 10.0
+        self.setup.flow_rate = 0.5
+
+        # simulation parameters
+        self.setup.dt = 0.1
+        self.setup.t_max = 3000
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from heat_transfer.pipe import Pipe
+from heat_transfer.simulation import Simulation
+from heat_transfer.stratified_tank import StratifiedTank
+from heat_transfer.tank import Tank
+from test.helpers import create_loop
+
+
+class EnergyBalanceTestCase(unittest.TestCase):
+    def test_objects(self):
+        setup = vars(self.setup)
+        objects = [Pipe(n=10, u=0.5, **setup), Pipe(n=10, u=0.5, members=2, **setup), Tank(0.5, 2, 1, 10, **setup),
+                   StratifiedTank(0.5, 2, 3, 10, **setup), Pipe(n=10, u=0.005, advection="semi_lagrangian", **setup)]
+        inlet = 100.0 + 50.0 * np.sin(np.arange(50) / 5)
+        for obj in objects:
+            obj.flow_rate = self.setup.flow_rate
+            obj.energy.reset(obj.thermal_energy(self.setup))
+            for T_inlet in inlet:
+                obj.T_inlet = T_inlet
+                obj.time_step(self.setup)
+            scale = np.abs(obj.energy.inflow)
+            residual = obj.energy.residual(obj.thermal_energy(self.setup))
+            if obj.advection == "upwind":
+                np.testing.assert_allclose(residual / scale, 0.0, atol=1e-12)
+            else:
+                # the semi-Lagrangian scheme is not exactly conservative
+                np.testing.assert_allclose(residual / scale, 0.0, atol=1e-2)
+        # pipes lose heat to the colder environment, the tanks have no heat loss
+        self.assertLess(objects[0].energy.exchange, 0.0)
+        self.assertEqual(objects[2].energy.exchange, 0.0)
+        self.assertEqual(objects[1].energy.exchange.shape, (2,))
+
+    def test_simulation(self):
+        for coupled in [False, True]:
+            objects = create_loop(vars(self.setup))
+            sim = Simulation(objects, **vars(self.setup), coupled=coupled, energy_balance=True)
+            residuals = []
+            for i in range(self.setup.t_max):
+                sim.update(i)
+                sim.time_step()
+                residuals.append(sim.energy_residual)
+            stored = sum(obj.thermal_energy(sim.setup) for obj in sim.objects if hasattr(obj, "energy"))
+            self.assertGreater(objects[0].energy.exchange, 0.0)
+            if coupled:
+                np.testing.assert_allclose(np.array(residuals) / stored, 0.0, atol=1e-9)
+            else:
+                # the lag between the objects does not accumulate, the sum is bounded by the flow of a single step
+                flow = self.setup.Cp * self.setup.flow_rate * self.setup.dt
+                self.assertLess(abs(sum(residuals)), 3 * flow * self.setup.steady_temperature)
+                self.assertGreater(max(np.abs(residuals)), 0.0)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "checkpoint.npz")
+            sim.save_checkpoint(path)
+            restarted = Simulation(create_loop(vars(self.setup)), **vars(sim.setup))
+            restarted.load_checkpoint(path)
+            for obj, expected in zip(restarted.objects, sim.objects):
+                if hasattr(obj, "energy"):
+                    self.assertEqual(obj.energy.get_state(), expected.energy.get_state())
+
+    def setUp(self):
+        """
+        Initialize test setup environment
+        """
+        setup = SimpleNamespace()
+        setup.Cp = 1.0
+        setup.rho = 1.0
+        setup.T_env = 10.0
+        setup.port_radius = 0.1
+        setup.temp_init = 100.0
+        setup.flow_rate = 0.5
+        setup.steady_temperature = 300
+        setup.dt = 0.1
+        setup.t_max = 200
+        self.setup = setup
+
+
+if __name__ == '__main__':
+    unittest.main()
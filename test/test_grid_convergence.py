@@ -0,0 +1,48 @@
+import unittest
+
+from grid_convergence import REFINED_PARAMETERS, refine, richardson, study
+from main import create_simulation
+from sweep import point_parameters
+
+
+class GridConvergenceTestCase(unittest.TestCase):
+    def test_richardson(self):
+        # second order convergence to 1 with the grid spacing h
+        values = [1.0 + 0.3 * h ** 2 for h in [0.4, 0.2, 0.1]]
+        extrapolated, order = richardson(*values, 2, 1.0)
+        self.assertAlmostEqual(extrapolated, 1.0, places=12)
+        self.assertAlmostEqual(order, 2.0, places=9)
+        # without monotone convergence the formal order is used
+        extrapolated, order = richardson(1.0, 3.0, 2.0, 2, 1.0)
+        self.assertIsNone(order)
+        self.assertEqual(extrapolated, 1.0)
+
+    def test_refine(self):
+        parameters = point_parameters({}, ["--t_max", "10"])
+        refined = refine(parameters, ["pipe_cells", "dt"], 2, 2)
+        self.assertEqual(refined["pipe_cells"], 80)
+        self.assertEqual(refined["tank_layers"], 100)
+        self.assertEqual(refined["dt"], 0.25)
+        self.assertEqual(refined["t_max"], 40)
+        self.assertRaises(ValueError, refine, parameters, ["n"], 2, 1)
+        # the solar panel is refined with the pipes and the tank
+        _, solar, tank = create_simulation(refine(parameters, REFINED_PARAMETERS, 2, 1))
+        self.assertEqual(solar.temperature.shape, (1000,))
+        self.assertEqual(tank.temperature.shape[-1], 200)
+
+    def test_study(self):
+        parameters = point_parameters({}, ["--t_max", "20"])
+        results = study(parameters, ["tank_layers", "dt"], levels=3, tolerance=1e-2, verbose=False)
+        self.assertEqual([row["parameters"]["tank_layers"] for row in results["levels"]], [100, 200, 400])
+        errors = [row["errors"]["tank_temperature"] for row in results["levels"]]
+        # the first order schemes halve the error with every refinement
+        self.assertGreater(errors[0], errors[1])
+        self.assertGreater(errors[1], errors[2])
+        self.assertAlmostEqual(results["orders"]["tank_temperature"], 1.0, delta=0.2)
+        self.assertIsNotNone(results["chosen"])
+        self.assertLessEqual(max(results["levels"][results["chosen"]]["errors"].values()), 1e-2)
+        self.assertRaises(ValueError, study, parameters, ["dt"], levels=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
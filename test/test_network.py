@@ -0,0 +1,125 @@
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from heat_transfer.manifold import Mixer, Splitter
+from heat_transfer.pipe import Pipe
+from heat_transfer.pump import Pump
+from heat_transfer.simulation import Simulation
+from heat_transfer.solar import Solar
+from heat_transfer.tank import Tank
+
+
+class NetworkTestCase(unittest.TestCase):
+    def create_manifold(self, fractions=(1.0, 3.0)):
+        """
+        Pump feeding two parallel solar panels joined by a mixer in front of the tank.
+        """
+        pump = Pump(self.setup.flow_rate, self.setup.temp_init)
+        splitter = Splitter(self.setup.temp_init, fractions)
+        panels = [Solar(n=10, u=0.5, **vars(self.setup)), Solar(n=30, u=0.5, **vars(self.setup))]
+        mixer = Mixer(self.setup.temp_init)
+        tank = Tank(0.5, 2, 1, 10, **vars(self.setup))
+        pipe = Pipe(n=5, u=0.5, **vars(self.setup))
+        pump.attach(splitter)
+        for panel in panels:
+            splitter.attach(panel)
+            panel.attach(mixer)
+        mixer.attach(tank)
+        tank.attach(pipe)
+        pipe.attach(pump)
+        return [pump, splitter, *panels, mixer, tank, pipe]
+
+    def test_loop_order(self):
+        # loop connected in advance gives the same result as the loop connected in the order of the list
+        objects = [Solar(n=10, **vars(self.setup)), Pump(self.setup.flow_rate, self.setup.temp_init),
+                   Tank(0.5, 2, 1, 10, **vars(self.setup))]
+        Simulation(objects, **vars(self.setup)).simulate(verbose=False)
+        connected = [Solar(n=10, **vars(self.setup)), Pump(self.setup.flow_rate, self.setup.temp_init),
+                     Tank(0.5, 2, 1, 10, **vars(self.setup))]
+        connected[0].attach(connected[1])
+        connected[1].attach(connected[2])
+        connected[2].attach(connected[0])
+        s = Simulation(connected[::-1], **vars(self.setup))
+        self.assertEqual(s.network.schedule, [connected[2], connected[0], connected[1]])
+        self.assertEqual(len(s.network.branches), 1)
+        s.simulate(verbose=False)
+        for obj, reference in zip(connected, objects):
+            np.testing.assert_allclose(obj.T_outlet, reference.T_outlet, rtol=1e-14)
+
+    def test_manifold(self):
+        objects = self.create_manifold()
+        s = Simulation(objects, **vars(self.setup))
+        s.simulate(verbose=False)
+        pump, splitter, panel_1, panel_2, mixer, tank, pipe = objects
+        self.assertAlmostEqual(panel_1.flow_rate, 0.25 * self.setup.flow_rate)
+        self.assertAlmostEqual(panel_2.flow_rate, 0.75 * self.setup.flow_rate)
+        self.assertAlmostEqual(tank.flow_rate, self.setup.flow_rate)
+        # the panels, the splitter and the chain from the mixer to the pump
+        self.assertEqual(len(s.network.branches), 4)
+
+        threaded = self.create_manifold()
+        Simulation(threaded, threads=4, **vars(self.setup)).simulate(verbose=False)
+        for obj, reference in zip(threaded, objects):
+            np.testing.assert_array_equal(obj.T_outlet, reference.T_outlet)
+
+        # mixer outlet is the flow weighted temperature of the panels from the last update
+        s.update(s.iteration)
+        self.assertAlmostEqual(mixer.T_outlet, 0.25 * panel_1.T_outlet + 0.75 * panel_2.T_outlet)
+
+    def test_multiple_pumps(self):
+        # each of the parallel branches has its own pump, which determines the flow split
+        splitter = Splitter(self.setup.temp_init)
+        pumps = [Pump(1.0, self.setup.temp_init), Pump(3.0, self.setup.temp_init)]
+        pipes = [Pipe(n=5, u=0.5, **vars(self.setup)), Pipe(n=5, u=0.5, **vars(self.setup))]
+        mixer = Mixer(self.setup.temp_init)
+        tank = Tank(0.5, 2, 1, 10, **vars(self.setup))
+        for pump, pipe in zip(pumps, pipes):
+            splitter.attach(pump)
+            pump.attach(pipe)
+            pipe.attach(mixer)
+        mixer.attach(tank)
+        tank.attach(splitter)
+        s = Simulation([splitter, *pumps, *pipes, mixer, tank], **vars(self.setup))
+        s.simulate(verbose=False)
+        np.testing.assert_allclose(splitter.outlet_flow_rates, [1.0, 3.0])
+        self.assertAlmostEqual(pipes[1].flow_rate, 3.0)
+        self.assertAlmostEqual(tank.flow_rate, 4.0)
+        self.assertRaises(RuntimeError, s.solve_steady_state)
+
+    def test_invalid_network(self):
+        # flow split between the branches is not determined without fractions
+        self.assertRaises(RuntimeError, Simulation, self.create_manifold(None), **vars(self.setup))
+        # pumps in series with different flow rates
+        objects = [Pump(1.0, self.setup.temp_init), Pipe(n=5, **vars(self.setup)), Pump(2.0, self.setup.temp_init),
+                   Pipe(n=5, **vars(self.setup))]
+        self.assertRaises(RuntimeError, Simulation, objects, **vars(self.setup))
+        # loop without a pump
+        pump = Pump(1.0, self.setup.temp_init)
+        pipes = [Pipe(n=5, **vars(self.setup)), Pipe(n=5, **vars(self.setup))]
+        pump.attach(pump)
+        pipes[0].attach(pipes[1])
+        pipes[1].attach(pipes[0])
+        self.assertRaises(RuntimeError, Simulation, [pump, *pipes], **vars(self.setup))
+
+    def setUp(self):
+        self.setup = SimpleNamespace()
+        # liquid parameters
+        self.setup.Cp = 1.0
+        self.setup.rho = 1.0
+        # environment
+        self.setup.T_env = 100
+        self.setup.steady_temperature = 300
+        # objects parameters
+        self.setup.port_radius = 0.1
+        self.setup.temp_init = 10.0
+        self.setup.flow_rate = 0.5
+
+        # simulation parameters
+        self.setup.dt = 0.1
+        self.setup.t_max = 50
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import tempfile
+import unittest
+
+from optimize import ScheduleEvaluator, optimize
+from sweep import point_parameters
+
+
+class OptimizeTestCase(unittest.TestCase):
+    def test_warm_start(self):
+        parameters = point_parameters({}, ["--t_max", "40", "--pump_power", "3000"])
+        schedules = [[20.0, 20.0, 20.0, 20.0], [20.0, 20.0, 5.0, 20.0], [20.0, 20.0, 5.0, 0.0], [0.0, 5.0, 5.0, 0.0]]
+        with tempfile.TemporaryDirectory() as directory:
+            evaluator = ScheduleEvaluator(parameters, 4, 8, directory)
+            values = [evaluator.evaluate(schedule) for schedule in schedules]
+            # the shared warm-up and the shared leading intervals are only simulated once
+            self.assertEqual(evaluator.simulated_steps, 8 + 32 + 16 + 8 + 32)
+            self.assertEqual(evaluator.replayed_steps, 4 * 40)
+            self.assertEqual(evaluator.evaluate(schedules[1]), values[1])
+            self.assertEqual(evaluator.evaluations, 4)
+            self.assertRaises(ValueError, evaluator.evaluate, [20.0])
+        # warm-started evaluations match the simulations from the initial temperature
+        for schedule, value in zip(schedules, values):
+            with tempfile.TemporaryDirectory() as directory:
+                cold = ScheduleEvaluator(parameters, 4, 8, directory)
+                self.assertAlmostEqual(cold.evaluate(schedule), value, delta=1e-9 * abs(value))
+
+    def test_optimize(self):
+        parameters = point_parameters({}, ["--t_max", "40", "--pump_power", "3000"])
+        with tempfile.TemporaryDirectory() as directory:
+            evaluator = ScheduleEvaluator(parameters, 2, 10, directory)
+            initial = [20.0, 20.0]
+            best, value = optimize(evaluator, [0.0, 10.0, 20.0], initial, verbose=False)
+            self.assertGreater(value, evaluator.evaluate(initial))
+            for level in [0.0, 20.0]:
+                self.assertLessEqual(evaluator.evaluate([best[0], level]), value)
+            self.assertLess(evaluator.simulated_steps, evaluator.replayed_steps)
+
+
+if __name__ == '__main__':
+    unittest.main()
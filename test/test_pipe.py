@@ -1,6 +1,8 @@
 import unittest
 from types import SimpleNamespace
 
+import numpy as np
+
 from heat_transfer import pipe
 from heat_transfer.constant_t_source import ConstantTSource
 
@@ -50,6 +52,41 @@ class PipeTestCase(unittest.TestCase):
         T_out = p3.temperature[-1]
         self.assertLess(T_out_init, T_out)
 
+    def test_time_step_matches_dense_solve(self):
+        source = ConstantTSource(temp_init=150)
+        p = pipe.Pipe(temp_init=50, length=10, port_radius=0.2, n=200, dt=0.1, t_max=100, u=0.01)
+        source.attach(p)
+        p.flow_rate = 0.5
+        T = p.temperature.copy()
+        for i in range(10):
+            if i == 5:
+                # the cached matrix has to be rebuilt after the flow rate change
+                p.flow_rate = 2.0
+            p.time_step(self.setup)
+            T = self.dense_time_step(p, T)
+            np.testing.assert_allclose(p.temperature, T, rtol=1e-12)
+
+    def dense_time_step(self, p, T):
+        """
+        Reference implementation of the implicit scheme with the dense matrix solve
+        """
+        n = T.shape[0]
+        dl = p.length / n
+        area = 2 * np.pi * p.radius * dl
+        volume = dl * np.pi * p.radius ** 2
+        a = p.flow_rate / (self.setup.rho * np.pi * p.radius ** 2)
+        b = p.dt * p._heat_transfer * area / (self.setup.rho * self.setup.Cp * volume)
+        temperature = np.zeros(n + 2)
+        temperature[1:-1] = T + self.setup.T_env * b
+        temperature[0] = p.T_inlet + self.setup.T_env * b
+        A = np.zeros((n + 2, n + 2))
+        A[0, 0] = 1.0 + b
+        for i in range(1, n + 1):
+            A[i, i - 1] = -a * p.dt / dl
+            A[i, i] = 1.0 + a * p.dt / dl + b
+        A[-1, -1] = 1.0 + b
+        return np.linalg.solve(A, temperature)[1:-1]
+
     def setUp(self):
         """
         Initialize test setup environment
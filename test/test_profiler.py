@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from heat_transfer.pipe import Pipe
+from heat_transfer.profiler import Profiler
+from heat_transfer.pump import Pump
+from heat_transfer.simulation import Simulation
+from heat_transfer.tank import Tank
+
+
+class ProfilerTestCase(unittest.TestCase):
+    def test_profile(self):
+        objects = [Pipe(n=10, u=0.5, **vars(self.setup)), Pump(self.setup.flow_rate, self.setup.temp_init),
+                   Tank(0.5, 2, 1, 10, **vars(self.setup))]
+        s = Simulation(objects, **vars(self.setup))
+        profiler = Profiler(memory=True, trace=True)
+        s.add_observer(profiler)
+        s.simulate(verbose=False)
+        timings = profiler.timings
+        self.assertEqual(timings["0:Pipe.time_step"].calls, self.setup.t_max)
+        self.assertEqual(timings["2:Storage tank.update"].calls, self.setup.t_max)
+        self.assertEqual(timings["Simulation.update"].calls, self.setup.t_max)
+        self.assertGreater(timings["Simulation.time_step"].total, timings["0:Pipe.time_step"].total)
+        self.assertEqual(profiler.steps.calls, self.setup.t_max)
+        self.assertIn("0:Pipe.time_step", profiler.summary())
+        # instrumentation is removed after the run
+        for obj in objects:
+            for method in Profiler.OBJECT_METHODS:
+                self.assertNotIn(method, vars(obj))
+        self.assertNotIn("update", vars(s))
+        self.assertTrue(s.propagate_ports)
+        # the walk over the objects timed by the profiler gives the same results as the state buffer
+        reference = [Pipe(n=10, u=0.5, **vars(self.setup)), Pump(self.setup.flow_rate, self.setup.temp_init),
+                     Tank(0.5, 2, 1, 10, **vars(self.setup))]
+        Simulation(reference, **vars(self.setup)).simulate(verbose=False)
+        for obj, expected in zip(objects, reference):
+            np.testing.assert_array_equal(obj.T_outlet, expected.T_outlet)
+        np.testing.assert_array_equal(objects[2].temperature, reference[2].temperature)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "trace.json")
+            profiler.export_trace(path)
+            with open(path) as f:
+                events = json.load(f)["traceEvents"]
+        self.assertEqual(sum(event["name"] == "1:Pump.update" for event in events), self.setup.t_max)
+        self.assertTrue(all(event["dur"] >= 0 for event in events))
+
+    def test_failed_step(self):
+        tank = Tank(0.5, 2, 1, 10, **vars(self.setup))
+        objects = [Pipe(n=10, u=0.5, **vars(self.setup)), Pump(self.setup.flow_rate, self.setup.temp_init), tank]
+        s = Simulation(objects, **vars(self.setup))
+        profiler = Profiler()
+        s.add_observer(profiler)
+
+        def failing(setup):
+            raise FloatingPointError("diverged")
+
+        tank.time_step = failing
+        self.assertRaises(FloatingPointError, lambda: s.simulate(verbose=False))
+        # instrumentation is removed also when the simulation fails
+        self.assertIs(vars(tank)["time_step"], failing)
+        self.assertNotIn("time_step", vars(objects[0]))
+        self.assertNotIn("update", vars(s))
+        self.assertTrue(s.propagate_ports)
+
+    def setUp(self):
+        self.setup = SimpleNamespace()
+        # liquid parameters
+        self.setup.Cp = 1.0
+        self.setup.rho = 1.0
+        # environment
+        self.setup.T_env = 100
+        # objects parameters
+        self.setup.port_radius = 0.1
+        self.setup.temp_init = 10.0
+        self.setup.flow_rate = 0.5
+
+        # simulation parameters
+        self.setup.dt = 0.1
+        self.setup.t_max = 20
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from heat_transfer.observer import Observer
+from heat_transfer.pipe import Pipe
+from heat_transfer.pump import Pump
+from heat_transfer.recorder import Recorder, Trajectory
+from heat_transfer.simulation import Simulation
+from heat_transfer.solar import Solar
+
+
+class RecorderTestCase(unittest.TestCase):
+    def test_record(self):
+        class History(Observer):
+            def __init__(self):
+                self.temperature = []
+                self.outlet = []
+
+            def notify(self, simulation, iteration):
+                self.temperature.append(simulation.objects[0].temperature.copy())
+                self.outlet.append(simulation.objects[2].T_outlet)
+
+        objects = [Solar(n=10, **vars(self.setup)), Pump(self.setup.flow_rate, self.setup.temp_init),
+                   Pipe(n=5, u=1.0, **vars(self.setup))]
+        sim = Simulation(objects, **vars(self.setup))
+        history = History()
+        sim.add_observer(history)
+        with tempfile.TemporaryDirectory() as directory:
+            sim.add_observer(Recorder(directory, every=2, chunk_size=3))
+            sim.simulate(verbose=False)
+            trajectory = Trajectory(directory)
+            self.assertEqual(trajectory.records, 10)
+            self.assertEqual(trajectory.titles, ["Solar panel", "Pump", "Pipe"])
+            self.assertEqual(trajectory.shapes, [(10,), None, (5,)])
+            self.assertEqual(trajectory.setup, {"T_env": 100, "temp_init": 10.0, "steady_temperature": 300})
+            np.testing.assert_array_equal(trajectory.iterations(), np.arange(0, 20, 2))
+            np.testing.assert_array_equal(trajectory.temperature(0), history.temperature[::2])
+            np.testing.assert_array_equal(trajectory.outlet_temperature(2), history.outlet[::2])
+            np.testing.assert_array_equal(trajectory.flow_rate(1), np.full(10, self.setup.flow_rate))
+            # window crossing the chunk boundary
+            np.testing.assert_array_equal(trajectory.iterations(5, 13), [6, 8, 10, 12])
+            np.testing.assert_array_equal(trajectory.temperature(0, 5, 13), history.temperature[6:13:2])
+            self.assertRaises(ValueError, trajectory.temperature, 1)
+
+    def test_restart(self):
+        def create_simulation(t_max):
+            objects = [Solar(n=10, **vars(self.setup)), Pump(self.setup.flow_rate, self.setup.temp_init),
+                       Pipe(n=5, u=1.0, **vars(self.setup))]
+            return Simulation(objects, **vars(self.setup) | {"t_max": t_max})
+
+        with tempfile.TemporaryDirectory() as reference, tempfile.TemporaryDirectory() as directory:
+            sim = create_simulation(20)
+            sim.add_observer(Recorder(reference, every=2, chunk_size=3))
+            sim.simulate(verbose=False)
+            # the interrupted run has recorded past its last checkpoint
+            checkpoint = os.path.join(directory, "checkpoint.npz")
+            sim = create_simulation(16)
+            sim.add_observer(Recorder(directory, every=2, chunk_size=3))
+            sim.simulate(verbose=False, checkpoint=checkpoint, checkpoint_every=7)
+            restarted = create_simulation(20)
+            restarted.load_checkpoint(checkpoint)
+            self.assertEqual(restarted.iteration, 14)
+            restarted.add_observer(Recorder(directory, every=2, chunk_size=3))
+            restarted.simulate(verbose=False)
+            expected, trajectory = Trajectory(reference), Trajectory(directory)
+            self.assertEqual(trajectory.records, 10)
+            np.testing.assert_array_equal(trajectory.iterations(), expected.iterations())
+            np.testing.assert_array_equal(trajectory.temperature(0), expected.temperature(0))
+
+            # recordings of other simulations are not continued
+            other = Simulation([Solar(n=4, **vars(self.setup)), Pump(self.setup.flow_rate, self.setup.temp_init)],
+                               **vars(self.setup) | {"t_max": 4})
+            other.simulate(verbose=False)
+            other.setup.t_max = 8
+            other.add_observer(Recorder(directory, every=2, chunk_size=3))
+            self.assertRaises(ValueError, other.simulate, verbose=False)
+
+    def test_main_restart(self):
+        main = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint, record = os.path.join(directory, "checkpoint.npz"), os.path.join(directory, "record")
+            options = ["--no-plot", "--record", record, "--checkpoint", checkpoint, "--checkpoint-every", "5"]
+            subprocess.run([sys.executable, main, "--t_max", "10"] + options, capture_output=True, check=True)
+            # --t_max extends the restarted run, which continues the recording
+            subprocess.run([sys.executable, main, "--restart", checkpoint, "--t_max", "15"] + options,
+                           capture_output=True, check=True)
+            np.testing.assert_array_equal(Trajectory(record).iterations(), np.arange(15))
+
+    def setUp(self):
+        self.setup = SimpleNamespace()
+        # liquid parameters
+        self.setup.Cp = 1.0
+        self.setup.rho = 1.0
+        # environment
+        self.setup.T_env = 100
+        self.setup.steady_temperature = 300
+        # objects parameters
+        self.setup.port_radius = 0.1
+        self.setup.temp_init = 10.0
+        self.setup.flow_rate = 0.1
+
+        # simulation parameters
+        self.setup.dt = 0.1
+        self.setup.t_max = 20
+
+
+if __name__ == '__main__':
+    unittest.main()
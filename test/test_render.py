@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import matplotlib.image
+
+from heat_transfer.pipe import Pipe
+from heat_transfer.pump import Pump
+from heat_transfer.recorder import Recorder
+from heat_transfer.simulation import Simulation
+from heat_transfer.solar import Solar
+from render import render
+
+
+class RenderTestCase(unittest.TestCase):
+    def test_render(self):
+        objects = [Solar(n=10, **vars(self.setup)), Pump(self.setup.flow_rate, self.setup.temp_init),
+                   Pipe(n=5, u=1.0, **vars(self.setup))]
+        sim = Simulation(objects, **vars(self.setup))
+        with tempfile.TemporaryDirectory() as directory:
+            record = os.path.join(directory, "record")
+            frames = os.path.join(directory, "frames")
+            sim.add_observer(Recorder(record, every=2, chunk_size=3))
+            sim.simulate(verbose=False)
+            # records 1, 3, ..., 9 of the iterations 2, 6, ..., 18 split between tasks of two frames
+            self.assertEqual(render(record, frames, start=1, stride=2, workers=2, frames_per_task=2, dpi=20), 5)
+            self.assertEqual(sorted(os.listdir(frames)), [f"frame_{i:06d}.png" for i in range(5)])
+            first = matplotlib.image.imread(os.path.join(frames, "frame_000000.png"))
+            last = matplotlib.image.imread(os.path.join(frames, "frame_000004.png"))
+            self.assertEqual(first.shape, last.shape)
+            self.assertFalse((first == last).all())
+
+    def setUp(self):
+        self.setup = SimpleNamespace()
+        # liquid parameters
+        self.setup.Cp = 1.0
+        self.setup.rho = 1.0
+        # environment
+        self.setup.T_env = 100
+        self.setup.steady_temperature = 300
+        # objects parameters
+        self.setup.port_radius = 0.1
+        self.setup.temp_init = 10.0
+        self.setup.flow_rate = 0.1
+
+        # simulation parameters
+        self.setup.dt = 0.1
+        self.setup.t_max = 20
+
+
+if __name__ == '__main__':
+    unittest.main()
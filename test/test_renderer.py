@@ -0,0 +1,72 @@
+import os
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+
+from heat_transfer.pipe import Pipe
+from heat_transfer.pump import Pump
+from heat_transfer.renderer import AsyncPlotter, tile
+from heat_transfer.simulation import Simulation
+from heat_transfer.tank import Tank
+
+
+class RendererTestCase(unittest.TestCase):
+    def test_async_plot(self):
+        objects = [Pipe(n=10, u=0.5, **vars(self.setup)), Pump(self.setup.flow_rate, self.setup.temp_init),
+                   Tank(0.5, 2, 1, 10, **vars(self.setup))]
+        s = Simulation(objects, **vars(self.setup))
+        plotter = AsyncPlotter(fps=1000.0, queue_size=1)
+        s.add_observer(plotter)
+        # spawned renderer inherits the environment, so it draws without a display
+        with mock.patch.dict(os.environ, {"MPLBACKEND": "Agg"}):
+            s.simulate(verbose=False)
+        self.assertGreater(plotter.sent, 0)
+        self.assertLessEqual(plotter.sent + plotter.dropped, self.setup.t_max)
+        self.assertEqual(plotter._process.exitcode, 0)
+
+    def test_renderer_died(self):
+        objects = [Pipe(n=10, u=0.5, **vars(self.setup)), Pump(self.setup.flow_rate, self.setup.temp_init),
+                   Tank(0.5, 2, 1, 10, **vars(self.setup))]
+        s = Simulation(objects, **vars(self.setup))
+        plotter = AsyncPlotter(fps=1e6, queue_size=1)
+        with mock.patch.dict(os.environ, {"MPLBACKEND": "Agg"}):
+            plotter.start(s)
+        plotter._process.terminate()
+        plotter._process.join()
+        for i in range(2):
+            plotter.notify(s, i)
+        self.assertEqual(plotter.dropped, 1)
+        # the end of the frames does not wait for the free space in the queue
+        finish = threading.Thread(target=plotter.finish, args=(s,), daemon=True)
+        finish.start()
+        finish.join(timeout=10.0)
+        self.assertFalse(finish.is_alive())
+
+    def test_tile(self):
+        self.assertEqual(tile(np.zeros(25)).shape, (2, 25))
+        self.assertEqual(tile(np.zeros(5)).shape, (1, 5))
+        self.assertEqual(tile(np.zeros((3, 5))).shape, (3, 5))
+
+    def setUp(self):
+        self.setup = SimpleNamespace()
+        # liquid parameters
+        self.setup.Cp = 1.0
+        self.setup.rho = 1.0
+        # environment
+        self.setup.T_env = 100
+        self.setup.steady_temperature = 100
+        # objects parameters
+        self.setup.port_radius = 0.1
+        self.setup.temp_init = 10.0
+        self.setup.flow_rate = 0.5
+
+        # simulation parameters
+        self.setup.dt = 0.1
+        self.setup.t_max = 2000
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from heat_transfer.scenario import load_scenario
+from main import DEFAULT_SCENARIO, create_objects, create_simulation
+from sweep import point_parameters
+
+
+class ScenarioTestCase(unittest.TestCase):
+    def test_load(self):
+        scenario = load_scenario(DEFAULT_SCENARIO)
+        self.assertEqual([definition["type"] for definition in scenario],
+                         ["Solar", "Pipe", "Pump", "Pipe", "Tank", "Pipe"])
+        # parsed scenario is cached and read-only
+        self.assertIs(load_scenario(DEFAULT_SCENARIO), scenario)
+        with self.assertRaises(TypeError):
+            scenario[1]["u"] = 1.0
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "scenario.json")
+            self.write(path, [{"type": "Pump"}, {"type": "Pipe", "n": 5}])
+            self.assertEqual(load_scenario(path)[1]["n"], 5)
+            # the cache follows the changes of the file
+            self.write(path, [{"type": "Pump"}, {"type": "Pipe", "n": 50}])
+            self.assertEqual(load_scenario(path)[1]["n"], 50)
+            for objects in [[], [{"type": "Valve"}], [{"type": "Pump"}, {"type": "Pipe", "cells": 5}],
+                            [{"type": "Pump"}, {"type": "Pipe", "n": "5"}], [{"type": "Pump"}, {"type": "Pump"}],
+                            [{"type": "Pump"}, {"type": "Pipe", "subcycled": 1}], [{"type": "Pipe"}],
+                            [{"type": "Pump"}, {"type": "Pipe", "n": 20.5}],
+                            [{"type": "Pump"}, {"type": "Tank", "nx": True}]]:
+                self.write(path, objects)
+                self.assertRaises(ValueError, load_scenario, path)
+
+    def test_create_objects(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "scenario.json")
+            self.write(path, [{"type": "Pump"}, {"type": "Pipe", "length": 0.3, "u": 1000},
+                              {"type": "Tank", "tank_radius": 0.2, "tank_length": 50, "nx": 30, "ny": 10},
+                              {"type": "Pipe", "length": 0.3, "u": 1000, "n": 7, "subcycled": False}])
+            v = point_parameters({}, ["--scenario", path, "--pipe_cells", "4", "--substeps", "2"])
+            pump, pipe_1, tank, pipe_2 = create_objects(v)
+            self.assertEqual(pipe_1.temperature.shape, (4,))
+            self.assertEqual(pipe_1.dt, v["dt"] / 2)
+            self.assertEqual(pipe_2.temperature.shape, (7,))
+            self.assertEqual(pipe_2.dt, v["dt"])
+            self.assertEqual(tank.temperature.shape[-1], 10)
+            # the thermostat and the schedule of the panel temperature need a solar panel
+            self.assertRaises(ValueError, create_objects, v | {"thermostat": [5.0, 2.0]})
+            with self.assertRaisesRegex(ValueError, "steady_temperature"):
+                create_simulation(v | {"schedule": [f"steady_temperature={path}"]})
+
+    def test_startup_imports(self):
+        # the command line help and the headless runs do not load the unused libraries
+        code = ("import sys; sys.argv = ['main.py'] + sys.argv[1:]; import main; {}; "
+                "print(' '.join(m for m in ['numpy', 'scipy.sparse', 'matplotlib'] if m in sys.modules))")
+        help_run = subprocess.run([sys.executable, "-c", code.format("main.create_parser()")], capture_output=True,
+                                  text=True, check=True)
+        self.assertEqual(help_run.stdout.strip(), "")
+        headless = subprocess.run([sys.executable, "-c", code.format("main.main()"), "--no-plot", "--t_max", "2"],
+                                  capture_output=True, text=True, check=True)
+        self.assertEqual(headless.stdout.strip().splitlines()[-1], "numpy")
+
+    @staticmethod
+    def write(path: str, objects: list):
+        with open(path, "w") as f:
+            json.dump({"objects": objects}, f)
+
+
+if __name__ == '__main__':
+    unittest.main()
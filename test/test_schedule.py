@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from heat_transfer.pipe import Pipe
+from heat_transfer.pump import Pump
+from heat_transfer.schedule import Schedule
+from heat_transfer.simulation import Simulation
+from heat_transfer.solar import Solar
+
+
+class ScheduleTestCase(unittest.TestCase):
+    def test_interpolation(self):
+        schedule = Schedule([0.0, 1.0, 3.0], [10.0, 20.0, 0.0])
+        schedule.prepare(0.5, 10)
+        np.testing.assert_allclose([schedule.value(i) for i in range(10)], [10, 15, 20, 15, 10, 5, 0, 0, 0, 0])
+        self.assertEqual(schedule.value(100), 0.0)
+        self.assertEqual([schedule.changed(i) for i in [0, 1, 6, 7, 100]], [False, True, True, False, False])
+
+    def test_periodic(self):
+        schedule = Schedule([0.0, 2.0], [0.0, 4.0], period=4.0)
+        schedule.prepare(1.0, 1000)
+        np.testing.assert_allclose([schedule.value(i) for i in range(9)], [0, 2, 4, 2, 0, 2, 4, 2, 0])
+        self.assertTrue(schedule.changed(4))
+
+    def test_csv(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "weather.csv")
+            with open(path, "w") as f:
+                f.write("time, T_env, irradiance\n0, 280, 0\n3600, 290, 800\n")
+            schedule = Schedule.from_csv(path, "T_env")
+            self.assertRaises(ValueError, Schedule.from_csv, path, "flow_rate")
+        schedule.prepare(1800.0, 3)
+        np.testing.assert_allclose([schedule.value(i) for i in range(3)], [280, 285, 290])
+
+    def test_simulation(self):
+        # simulation with schedules matches the one with values set manually before every step
+        times = np.arange(0.0, 3.0, 0.5)
+        objects = [Solar(n=10, **vars(self.setup)), Pump(self.setup.flow_rate, self.setup.temp_init),
+                   Pipe(n=5, u=1.0, **vars(self.setup))]
+        s = Simulation(objects, **vars(self.setup))
+        s.add_schedule(s.setup, "T_env", Schedule(times, 100 + 10 * times))
+        s.add_schedule(objects[0], "steady_temperature", Schedule(times, 300 - 20 * times))
+        s.add_schedule(s.pump, "flow_rate", Schedule(times, 0.1 + 0.1 * times))
+        s.simulate(verbose=False)
+
+        reference = [Solar(n=10, **vars(self.setup)), Pump(self.setup.flow_rate, self.setup.temp_init),
+                     Pipe(n=5, u=1.0, **vars(self.setup))]
+        r = Simulation(reference, **vars(self.setup))
+        for i in range(self.setup.t_max):
+            t = min(i * self.setup.dt, times[-1])
+            r.setup.T_env = 100 + 10 * t
+            reference[0].steady_temperature = 300 - 20 * t
+            r.pump.flow_rate = 0.1 + 0.1 * t
+            r.update(i)
+            r.time_step()
+        for obj, ref in zip(objects, reference):
+            np.testing.assert_allclose(obj.T_outlet, ref.T_outlet, rtol=1e-12)
+        np.testing.assert_allclose(objects[2].temperature, reference[2].temperature, rtol=1e-12)
+
+    def setUp(self):
+        self.setup = SimpleNamespace()
+        # liquid parameters
+        self.setup.Cp = 1.0
+        self.setup.rho = 1.0
+        # environment
+        self.setup.T_env = 100
+        self.setup.steady_temperature = 300
+        # objects parameters
+        self.setup.port_radius = 0.1
+        self.setup.temp_init = 10.0
+        self.setup.flow_rate = 0.1
+
+        # simulation parameters
+        self.setup.dt = 0.1
+        self.setup.t_max = 40
+
+
+if __name__ == '__main__':
+    unittest.main()
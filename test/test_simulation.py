@@ -1,9 +1,19 @@
+import os
+import subprocess
+import sys
+import tempfile
 import unittest
 from types import SimpleNamespace
 
+import numpy as np
+
+from heat_transfer.observer import Observer
 from heat_transfer.pipe import Pipe
 from heat_transfer.pump import Pump
 from heat_transfer.simulation import Simulation
+from heat_transfer.solar import Solar
+from heat_transfer.tank import Tank
+from test.helpers import create_loop
 
 
 class MyTestCase(unittest.TestCase):
@@ -18,6 +28,201 @@ class MyTestCase(unittest.TestCase):
         objects = [Pipe(**vars(self.setup)), Pipe(**vars(self.setup))]
         self.assertRaises(RuntimeError, lambda: Simulation(objects, **vars(self.setup)))
 
+    def test_simulation_headless(self):
+        class Counter(Observer):
+            def __init__(self):
+                self.started = self.finished = False
+                self.iterations = []
+
+            def start(self, simulation):
+                self.started = True
+
+            def notify(self, simulation, iteration):
+                self.iterations.append(iteration)
+
+            def finish(self, simulation):
+                self.finished = True
+
+        self.setup.t_max = 5
+        objects = [Pipe(**vars(self.setup)), Pump(self.setup.flow_rate, self.setup.temp_init), Pipe(**vars(self.setup))]
+        s = Simulation(objects, **vars(self.setup))
+        counter = Counter()
+        s.add_observer(counter)
+        s.simulate()
+        self.assertTrue(counter.started)
+        self.assertTrue(counter.finished)
+        self.assertEqual(counter.iterations, list(range(5)))
+
+    def test_simulation_does_not_import_matplotlib(self):
+        code = "import sys, heat_transfer.simulation; sys.exit('matplotlib' in sys.modules)"
+        self.assertEqual(subprocess.run([sys.executable, "-c", code]).returncode, 0)
+
+    def test_ensemble_simulation(self):
+        self.setup.t_max = 20
+        flow_rate = np.array([5.0, 10.0, 20.0])
+        T_env = np.array([50.0, 100.0, 150.0])
+        u = np.array([0.0, 0.1, 1.0])
+        ensemble = vars(self.setup) | {"flow_rate": flow_rate, "T_env": T_env}
+        objects = [Solar(n=10, members=3, **ensemble), Pipe(n=10, u=u, members=3, **ensemble),
+                   Pump(flow_rate, self.setup.temp_init), Tank(0.5, 2, 1, 10, members=3, **ensemble)]
+        Simulation(objects, **ensemble).simulate()
+        for m in range(3):
+            member = vars(self.setup) | {"flow_rate": flow_rate[m], "T_env": T_env[m]}
+            reference = [Solar(n=10, **member), Pipe(n=10, u=u[m], **member),
+                         Pump(flow_rate[m], self.setup.temp_init), Tank(0.5, 2, 1, 10, **member)]
+            Simulation(reference, **member).simulate()
+            for obj, ref in zip(objects, reference):
+                if not isinstance(obj, Pump):
+                    np.testing.assert_allclose(obj.temperature[m], ref.temperature, rtol=1e-12)
+
+    def test_scalar_simulation_baseline(self):
+        class Outlets(Observer):
+            def __init__(self):
+                self.history = []
+
+            def notify(self, simulation, iteration):
+                if iteration % 4 == 3:
+                    self.history.append([float(obj.T_outlet) for obj in simulation.objects])
+
+        # trajectory of the simulation before the ensembles were introduced
+        baseline = [[300.0, 105.5221213082018, 105.5221213082018, 20.46116430548622],
+                    [300.0, 123.0293123104219, 123.0293123104219, 103.96681433569714],
+                    [300.0, 123.24629600688017, 123.24629600688017, 122.49948801002444],
+                    [300.0, 123.24703052460421, 123.24703052460421, 123.23666773910739],
+                    [300.0, 123.24703178852833, 123.24703178852833, 123.24695948685655]]
+        tank_temperature = [123.24703176588189, 123.24703172538584, 123.24703163088509, 123.2470314247294,
+                            123.24703100004929, 123.24703016752972, 123.24702860491307, 123.24702578269991,
+                            123.24702085796046, 123.24701252651101]
+        self.setup.t_max = 20
+        self.setup.steady_temperature = 300
+        setup = vars(self.setup)
+        objects = [Solar(n=10, **setup), Pipe(n=10, u=0.5, **setup), Pump(self.setup.flow_rate, self.setup.temp_init),
+                   Tank(0.5, 2, 1, 10, **setup)]
+        s = Simulation(objects, **setup)
+        outlets = Outlets()
+        s.add_observer(outlets)
+        s.simulate()
+        np.testing.assert_allclose(outlets.history, baseline, rtol=1e-12)
+        np.testing.assert_allclose(np.ravel(objects[-1].temperature), tank_temperature, rtol=1e-12)
+
+    def test_checkpoint_restart(self):
+        scalar = vars(self.setup) | {"t_max": 30}
+        ensemble = scalar | {"flow_rate": np.array([5.0, 10.0]), "T_env": np.array([50.0, 150.0])}
+        for setup, members in [(scalar, None), (ensemble, 2)]:
+            reference = create_loop(setup, members)
+            Simulation(reference, **setup).simulate(verbose=False)
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "checkpoint.npz")
+                # interrupted run
+                Simulation(create_loop(setup, members), **setup | {"t_max": 17}).simulate(
+                    verbose=False, checkpoint=path, checkpoint_every=5)
+                restored_setup = Simulation.read_setup(path)
+                self.assertEqual(restored_setup["t_max"], 17)
+                restored = create_loop(setup, members)
+                s = Simulation(restored, **setup)
+                s.load_checkpoint(path)
+                self.assertEqual(s.iteration, 15)
+                s.simulate(verbose=False)
+            for obj, ref in zip(restored, reference):
+                np.testing.assert_array_equal(obj.T_outlet, ref.T_outlet)
+                if not isinstance(obj, Pump):
+                    np.testing.assert_array_equal(obj.temperature, ref.temperature)
+
+    def test_steady_state(self):
+        scalar = vars(self.setup) | {"t_max": 5000}
+        ensemble = scalar | {"flow_rate": np.array([0.5, 1.0]), "T_env": np.array([50.0, 150.0])}
+        for setup, members in [(scalar, None), (ensemble, 2)]:
+            reference = create_loop(setup, members)
+            Simulation(reference, **setup).simulate(verbose=False)
+            objects = create_loop(setup, members)
+            T = Simulation(objects, **setup).solve_steady_state()
+            np.testing.assert_allclose(T, reference[2].T_outlet, rtol=1e-9)
+            for obj, ref in zip(objects, reference):
+                if not isinstance(obj, Pump):
+                    np.testing.assert_allclose(obj.temperature, ref.temperature, rtol=1e-9)
+
+    def test_steady_state_without_heat_exchange(self):
+        objects = [Pipe(n=10, **vars(self.setup)), Pump(self.setup.flow_rate, self.setup.temp_init),
+                   Tank(0.5, 2, 1, 10, **vars(self.setup))]
+        s = Simulation(objects, **vars(self.setup))
+        self.assertRaises(RuntimeError, s.solve_steady_state)
+
+    def test_coupled_time_step(self):
+        def simulate(dt, coupled):
+            setup = vars(self.setup) | {"dt": dt, "t_max": round(2 / dt), "coupled": coupled}
+            objects = create_loop(setup)
+            Simulation(objects, **setup).simulate(verbose=False)
+            return objects
+
+        reference = simulate(0.002, True)
+        lagged = simulate(0.5, False)
+        coupled = simulate(0.5, True)
+        for i in [0, 1, 3]:
+            lagged_error = np.max(np.abs(lagged[i].temperature - reference[i].temperature))
+            coupled_error = np.max(np.abs(coupled[i].temperature - reference[i].temperature))
+            self.assertLess(coupled_error, lagged_error)
+
+        # coupled time marching converges to the steady state of the loop
+        setup = vars(self.setup) | {"t_max": 5000, "coupled": True}
+        objects = create_loop(setup)
+        Simulation(objects, **setup).simulate(verbose=False)
+        steady = create_loop(setup)
+        Simulation(steady, **setup).solve_steady_state()
+        for obj, ref in zip(objects, steady):
+            np.testing.assert_allclose(obj.T_outlet, ref.T_outlet, rtol=1e-9)
+
+        setup = vars(self.setup) | {"coupled": True}
+        self.assertRaises(RuntimeError, Simulation, create_loop(setup, 2), **setup)
+
+    def test_sub_cycling(self):
+        def create_objects(setup, substeps=1):
+            # pipe without heat exchange behind the tank
+            return create_loop(setup, substeps=substeps) + [Pipe(n=10, **setup | {"dt": setup["dt"] / substeps})]
+
+        def simulate(dt, substeps=1, **parameters):
+            setup = vars(self.setup) | {"dt": dt, "t_max": round(1 / dt), "T_env": 50.0} | parameters
+            objects = create_objects(setup, substeps)
+            Simulation(objects, **setup).simulate(verbose=False)
+            return objects
+
+        reference = simulate(0.005)
+        single = simulate(0.5)
+        sub_cycled = simulate(0.5, 10)
+        # the solar panel is at its steady temperature, the pipe behind it is resolved by the short steps
+        single_error = np.max(np.abs(single[1].temperature - reference[1].temperature))
+        sub_cycled_error = np.max(np.abs(sub_cycled[1].temperature - reference[1].temperature))
+        self.assertLess(sub_cycled_error, 0.5 * single_error)
+
+        # slow objects take a single step per simulation step
+        setup = vars(self.setup) | {"t_max": 6}
+        objects = create_objects(setup, 4)
+        steps = {id(obj): 0 for obj in objects}
+        for obj in objects:
+            def counted(setup, obj=obj, time_step=obj.time_step):
+                steps[id(obj)] += 1
+                time_step(setup)
+            obj.time_step = counted
+        Simulation(objects, **setup).simulate(verbose=False)
+        self.assertEqual([steps[id(obj)] for obj in objects], [24, 24, 6, 6, 24])
+
+        # restart from a checkpoint keeps the interpolation of the inlet temperatures
+        reference = simulate(0.5, 4, t_max=8)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "checkpoint.npz")
+            setup = vars(self.setup) | {"dt": 0.5, "t_max": 5, "T_env": 50.0}
+            Simulation(create_objects(setup, 4), **setup).simulate(verbose=False, checkpoint=path, checkpoint_every=5)
+            restored = create_objects(setup | {"t_max": 8}, 4)
+            s = Simulation(restored, **setup | {"t_max": 8})
+            s.load_checkpoint(path)
+            s.simulate(verbose=False)
+        for obj, ref in zip(restored, reference):
+            np.testing.assert_array_equal(obj.T_outlet, ref.T_outlet)
+
+        setup = vars(self.setup)
+        self.assertRaises(ValueError, Simulation, [Pipe(**setup | {"dt": 0.03}), Pump(10.0, 10.0)], **setup)
+        self.assertRaises(RuntimeError, Simulation, create_objects(setup | {"coupled": True}, 2),
+                          **setup | {"coupled": True})
+
     def setUp(self):
         self.setup = SimpleNamespace()
         # liquid parameters
@@ -0,0 +1,148 @@
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from heat_transfer.manifold import Mixer, Splitter
+from heat_transfer.network import FlowNetwork
+from heat_transfer.observer import Observer
+from heat_transfer.pipe import Pipe
+from heat_transfer.pump import Pump
+from heat_transfer.simulation import Simulation
+from test.helpers import create_loop
+
+
+class LoopStateTestCase(unittest.TestCase):
+    def create_objects(self, members=None):
+        setup = vars(self.setup)
+        if members is not None:
+            setup = setup | {"flow_rate": np.array([0.5, 1.0])}
+        solar, pipe, pump, tank = create_loop(setup, members)
+        # pumps next to each other, the first one takes the outlet of the second one from the previous update
+        return [solar, pump, Pump(setup["flow_rate"], self.setup.temp_init), pipe, tank,
+                Pipe(n=5, u=0.5, members=members, advection="semi_lagrangian", **setup)]
+
+    def test_propagate(self):
+        for members in [None, 2]:
+            objects = self.create_objects(members)
+            sim = Simulation(objects, **vars(self.setup))
+            self.assertTrue(sim.state.propagates)
+            reference = self.create_objects(members)
+            for current, following in zip(reference, reference[1:] + reference[:1]):
+                current.attach(following)
+            schedule = FlowNetwork(reference).schedule
+            for obj in schedule:
+                if not isinstance(obj, Pump):
+                    obj.update()
+            for i in range(30):
+                if i == 10:
+                    # flow rates are passed along the loop when the pumps change
+                    for obj in [objects[1], objects[2], reference[1], reference[2]]:
+                        obj.flow_rate = obj.flow_rate * 2
+                sim.update(i)
+                sim.time_step()
+                for obj in schedule:
+                    obj.update()
+                for obj in reference:
+                    obj.time_step(sim.setup)
+                for obj, expected in zip(objects, reference):
+                    np.testing.assert_array_equal(obj.T_inlet, expected.T_inlet)
+                    np.testing.assert_array_equal(obj.T_outlet, expected.T_outlet)
+                    np.testing.assert_array_equal(obj.flow_rate, expected.flow_rate)
+                    if hasattr(obj, "temperature"):
+                        np.testing.assert_array_equal(obj.temperature, expected.temperature)
+
+    def test_views(self):
+        objects = self.create_objects()
+        sim = Simulation(objects, **vars(self.setup))
+        fields = [obj for obj in objects if hasattr(obj, "temperature")]
+        self.assertEqual(sim.state.temperatures.size, sum(obj.temperature.size for obj in fields))
+        for obj in fields:
+            self.assertTrue(np.shares_memory(obj.temperature, sim.state.temperatures))
+        sim.simulate(verbose=False)
+        np.testing.assert_array_equal(sim.state.temperatures, np.concatenate([obj.temperature for obj in fields]))
+        # port temperatures are returned as copies, the buffer is overwritten by the next update
+        outlet = objects[0].T_outlet
+        self.assertFalse(np.shares_memory(outlet, sim.state.data))
+        objects[0].T_outlet = 0.0
+        self.assertEqual(outlet, objects[1].T_inlet)
+        self.assertEqual(objects[0].T_outlet, 0.0)
+
+    def test_snapshot(self):
+        objects = self.create_objects()
+        # short pipe replaced by the transport delay, its history is kept outside of the state buffer
+        objects[3].lump()
+        sim = Simulation(objects, **vars(self.setup), energy_balance=True)
+
+        class Record(Observer):
+            def __init__(self):
+                self.states = []
+
+            def notify(self, simulation, iteration):
+                if iteration == 15:
+                    # flow rates after the snapshot are restored as well
+                    for pump in objects[1:3]:
+                        pump.flow_rate = pump.flow_rate * 2
+                # the buffer holds only the last cell of the lumped pipe, the objects reconstruct the rest
+                temperatures = [np.array(obj.temperature) for obj in objects if hasattr(obj, "temperature")]
+                self.states.append((temperatures, simulation.energy_residual, [obj.flow_rate for obj in objects],
+                                    [obj.energy.get_state() for obj in objects if hasattr(obj, "energy")]))
+
+        def run(steps):
+            record = Record()
+            sim.observers[:] = [record]
+            sim.setup.t_max = sim.iteration + steps
+            sim.simulate(verbose=False)
+            return record.states
+
+        run(10)
+        snapshot = sim.snapshot()
+        flow_rate = sim.pump.flow_rate
+        expected = run(10)
+        sim.restore(snapshot)
+        self.assertEqual(sim.iteration, 10)
+        self.assertEqual(sim.pump.flow_rate, flow_rate)
+        for (temperatures, residual, flow_rates, energy), reference in zip(run(10), expected):
+            for T, T_reference in zip(temperatures, reference[0]):
+                np.testing.assert_array_equal(T, T_reference)
+            self.assertEqual(residual, reference[1])
+            self.assertEqual(flow_rates, reference[2])
+            self.assertEqual(energy, reference[3])
+
+    def test_network(self):
+        # outlet of the mixer is not one of the cells, the objects are walked along the flow
+        pump = Pump(self.setup.flow_rate, self.setup.temp_init)
+        splitter = Splitter(self.setup.temp_init, [1.0, 1.0])
+        branches = [Pipe(n=5, u=0.5, **vars(self.setup)) for _ in range(2)]
+        mixer = Mixer(self.setup.temp_init)
+        pump.attach(splitter)
+        for pipe in branches:
+            splitter.attach(pipe)
+            pipe.attach(mixer)
+        mixer.attach(pump)
+        sim = Simulation([pump, splitter, *branches, mixer], **vars(self.setup))
+        self.assertFalse(sim.state.propagates)
+        sim.simulate(verbose=False)
+        for pipe in branches:
+            self.assertTrue(np.shares_memory(pipe.temperature, sim.state.temperatures))
+        np.testing.assert_allclose(mixer.T_outlet, branches[0].T_outlet)
+
+    def setUp(self):
+        """
+        Initialize test setup environment
+        """
+        setup = SimpleNamespace()
+        setup.Cp = 1.0
+        setup.rho = 1.0
+        setup.T_env = 100
+        setup.port_radius = 0.1
+        setup.temp_init = 10.0
+        setup.flow_rate = 0.5
+        setup.steady_temperature = 300
+        setup.dt = 0.1
+        setup.t_max = 20
+        self.setup = setup
+
+
+if __name__ == '__main__':
+    unittest.main()
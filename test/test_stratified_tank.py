@@ -0,0 +1,63 @@
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from heat_transfer.constant_t_source import ConstantTSource
+from heat_transfer.stratified_tank import StratifiedTank
+from heat_transfer.tank import Tank
+
+
+class StratifiedTankTestCase(unittest.TestCase):
+    def test_uniform_flow_matches_tank(self):
+        # without the jet and the conduction every ring is the one-dimensional tank
+        t = StratifiedTank(0.5, 10, 4, 50, port_radius=0.5, diffusivity=0.0, temp_init=100, dt=0.1, t_max=100)
+        reference = Tank(0.5, 10, 4, 50, temp_init=100, dt=0.1, t_max=100)
+        for tank in [t, reference]:
+            ConstantTSource(temp_init=500, source_flow_rate=0.3).attach(tank)
+        for i in range(10):
+            t.time_step(self.setup)
+            reference.time_step(self.setup)
+        for ring in t.temperature:
+            np.testing.assert_allclose(ring, reference.temperature, rtol=1e-12)
+        t.update()
+        reference.update()
+        self.assertAlmostEqual(t.T_outlet, reference.T_outlet)
+
+    def test_energy_conservation(self):
+        t = StratifiedTank(0.5, 2, 10, 20, port_radius=0.1, jet_length=0.2, diffusivity=1e-3, temp_init=100,
+                           dt=0.1, t_max=100)
+        s = ConstantTSource(temp_init=500, source_flow_rate=0.3)
+        s.attach(t)
+        for i in range(20):
+            t.update()
+            energy = t.thermal_energy(self.setup)
+            t.time_step(self.setup)
+            t.update()
+            # implicit scheme: the outlet carries the temperature of the new time level
+            expected = energy + self.setup.Cp * 0.3 * (500 - t.T_outlet) * self.setup.dt
+            self.assertAlmostEqual(t.thermal_energy(self.setup), expected, delta=1e-9 * expected)
+
+    def test_inlet_jet(self):
+        t = StratifiedTank(0.5, 2, 10, 20, port_radius=0.1, jet_length=0.2, temp_init=100, dt=0.1, t_max=100)
+        s = ConstantTSource(temp_init=500, source_flow_rate=0.3)
+        s.attach(t)
+        for i in range(10):
+            t.time_step(self.setup)
+        # hot liquid enters under the port in the center of the tank and the hot layer is on the top
+        self.assertGreater(t.temperature[0, 1], t.temperature[-1, 1])
+        self.assertGreater(t.temperature[:, 0].mean(), t.temperature[:, -1].mean())
+
+    def setUp(self):
+        self.setup = SimpleNamespace()
+        # liquid parameters
+        self.setup.Cp = 1.0
+        self.setup.rho = 1.0
+
+        # simulation parameters
+        self.setup.dt = 0.1
+        self.setup.t_max = 100
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import json
+import os
+import tempfile
+import unittest
+
+from sweep import grid_points, point_parameters, run_point, run_sweep
+
+
+class SweepTestCase(unittest.TestCase):
+    def test_grid_points(self):
+        points = list(grid_points(["flow_rate=10,20", "T_env=270,280,290"]))
+        self.assertEqual(len(points), 6)
+        self.assertEqual(points[0], {"flow_rate": "10", "T_env": "270"})
+        self.assertEqual(points[-1], {"flow_rate": "20", "T_env": "290"})
+        self.assertRaises(ValueError, list, grid_points(["flow_rate"]))
+
+    def test_run_sweep(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "sweep.jsonl")
+            finished = run_sweep(grid_points(["flow_rate=10,20", "T_env=270,290"]), ["--t_max", "10"], output, 2)
+            self.assertEqual(finished, 4)
+            with open(output) as f:
+                rows = sorted((json.loads(line) for line in f), key=lambda row: row["index"])
+        self.assertEqual([row["index"] for row in rows], [0, 1, 2, 3])
+        self.assertEqual(rows[3]["parameters"], {"flow_rate": 20.0, "T_env": 290.0})
+        self.assertEqual(len(rows[0]["tank_temperature"]), 100)
+        self.assertEqual(len(rows[0]["outlet_temperature"]), 10)
+        # hot solar panel heats the liquid
+        self.assertGreater(rows[0]["collected_energy"], 0.0)
+
+    def test_failed_run(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "sweep.jsonl")
+            run_sweep(grid_points(["flow_rate=10"]), ["--t_max", "5"], output, 1)
+            finished = run_sweep(grid_points(["port_radius=0,0.1"]), ["--t_max", "5"], output, 1)
+            self.assertEqual(finished, 2)
+            with open(output) as f:
+                rows = [json.loads(line) for line in f]
+        # rows of the earlier sweep are kept
+        self.assertEqual(len(rows), 3)
+        failed = next(row for row in rows[1:] if row["index"] == 0)
+        self.assertEqual(failed["parameters"], {"port_radius": 0.0})
+        self.assertIn("ZeroDivisionError", failed["error"])
+        self.assertIn("collected_energy", next(row for row in rows[1:] if row["index"] == 1))
+
+    def test_substeps(self):
+        # energy is collected over the simulation steps, the sub-steps of the panel do not change it much
+        energy = [run_point(0, {"substeps": substeps}, point_parameters({"substeps": substeps}, ["--t_max", "20"]))
+                  ["collected_energy"] for substeps in [1, 4]]
+        self.assertAlmostEqual(energy[1] / energy[0], 1.0, delta=0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
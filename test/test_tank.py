@@ -1,6 +1,8 @@
 import unittest
 from types import SimpleNamespace
 
+import numpy as np
+
 from heat_transfer.constant_t_source import ConstantTSource
 from heat_transfer.tank import Tank
 
@@ -14,6 +16,22 @@ class TankTestCase(unittest.TestCase):
         t.update()
         self.assertGreater(t.temperature[0], t.temperature[1])
 
+    def test_time_step_matches_dense_solve(self):
+        t = Tank(0.5, 10, 10, 50, temp_init=100, **vars(self.setup))
+        s = ConstantTSource(temp_init=500, source_flow_rate=0.3)
+        s.attach(t)
+        T = t.temperature.copy()
+        for i in range(10):
+            if i == 5:
+                t.flow_rate = 0.1
+            t.time_step(self.setup)
+            a = t.flow_rate / (self.setup.rho * np.pi * t.tank_radius ** 2)
+            c = a * self.setup.dt / (t.tank_length / 50)
+            A = np.diag(np.full(51, 1.0 + c)) + np.diag(np.full(50, -c), -1)
+            A[0, 0] = 1.0
+            T = np.linalg.solve(A, np.concatenate(([500], T)))[1:]
+            np.testing.assert_allclose(t.temperature, T, rtol=1e-12)
+
     def setUp(self):
         self.setup = SimpleNamespace()
         # liquid parameters